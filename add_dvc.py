@@ -2,9 +2,23 @@ import yaml
 import json
 import os
 
-# Читаем dvc.lock
+# Читаем dvc.lock и dvc.yaml
 with open('dvc.lock', 'r', encoding='utf-8') as f:
     lock_data = yaml.safe_load(f)
+with open('dvc.yaml', 'r', encoding='utf-8') as f:
+    stages = yaml.safe_load(f)['stages']
+
+
+def entry_path(entry):
+    return next(iter(entry)) if isinstance(entry, dict) else entry
+
+
+# Выходы стадий DVC отслеживает через dvc.lock, а их актуальность проверяет
+# `courier index --dvc-file dvc.yaml --check`; .dvc-файл для них
+# конфликтует со стадией. Указатели нужны только исходным данным.
+stage_outs = {entry_path(entry)
+              for stage in stages.values()
+              for entry in stage.get('outs', [])}
 
 
 # Функция для создания .dvc файла
@@ -26,14 +40,14 @@ def create_dvc_file(filepath, md5_hash, size):
     print(f"✓ Created: {dvc_filename}")
 
 
-# Создаем .dvc файлы для всех outs
+# Создаем .dvc файлы для исходных данных из deps стадий
+created = set()
 for stage_name, stage_data in lock_data['stages'].items():
-    if 'outs' in stage_data:
-        for out_file in stage_data['outs']:
-            create_dvc_file(
-                out_file['path'],
-                out_file['md5'],
-                out_file['size']
-            )
-
-print("\n✅ Все .dvc файлы созданы!")
\ No newline at end of file
+    for dep in stage_data.get('deps', []):
+        path = dep['path']
+        if (path.startswith('data/') and path not in stage_outs
+                and path not in created and 'md5' in dep):
+            create_dvc_file(path, dep['md5'], dep['size'])
+            created.add(path)
+
+print("\n✅ Все .dvc файлы созданы!")
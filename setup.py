@@ -7,4 +7,7 @@ setup(
     description='A short description of the project.',
     author='w0drs',
     license='MIT',
+    entry_points={
+        'console_scripts': ['courier=src.cli:main'],
+    },
 )
@@ -1,5 +1,24 @@
-from .data.merge_data import merge_data
-from .data.drop_features import drop_features
-from .data.nan_filler import NanFiller
-from .features import build_features
-from.models.train_model import train_lgbm_model
\ No newline at end of file
+import importlib
+
+# Этапы импортируются лениво: `python -m src.data.<stage>` не тянет за собой
+# lightgbm и остальные этапы пайплайна
+_EXPORTS = {
+    'merge_data': ('.data.merge_data', 'merge_data'),
+    'drop_features': ('.data.drop_features', 'drop_features'),
+    'NanFiller': ('.data.nan_filler', 'NanFiller'),
+    'build_features': ('.features.build_features', None),
+    'train_lgbm_model': ('.models.train_model', 'train_lgbm_model'),
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module_name, attr = _EXPORTS[name]
+    value = importlib.import_module(module_name, __name__)
+    if attr is not None:
+        value = getattr(value, attr)
+    globals()[name] = value
+    return value
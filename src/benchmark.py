@@ -0,0 +1,235 @@
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import click
+import numpy as np
+import pandas as pd
+
+from src.data.synthetic import forecast_week, write_synthetic
+
+PROJECT_DIR = Path(__file__).resolve().parents[1]
+
+# Этапы в порядке запуска; train и predict можно отключить --no-model
+STAGES = ('merge-data', 'fill-nan', 'build-features', 'drop-features',
+          'train', 'predict')
+MODEL_STAGES = ('train', 'predict')
+
+
+def parse_scale(value) -> tuple:
+    """'1000x52' -> (1000, 52): число магазинов и недель."""
+    try:
+        stores, weeks = (int(part) for part in value.lower().split('x'))
+    except ValueError:
+        raise click.BadParameter(f"ожидается МАГАЗИНЫxНЕДЕЛИ, например "
+                                 f"1000x52, получено '{value}'")
+    if stores < 1 or weeks < 2:
+        raise click.BadParameter(f"нужен хотя бы 1 магазин и 2 недели, "
+                                 f"получено '{value}'")
+    return stores, weeks
+
+
+def stage_commands(raw, work_dir, params_file, model_config,
+                   test_date) -> dict:
+    """
+    Аргументы `courier <этап>` для каждого этапа из STAGES на данных raw.
+    """
+    interim = Path(work_dir) / 'interim'
+    processed = Path(work_dir) / 'processed'
+    models = Path(work_dir) / 'models'
+    for path in (interim, processed, models):
+        path.mkdir(parents=True, exist_ok=True)
+
+    return {
+        'merge-data': [raw['facts'], raw['shifts_prediction'], raw['train'],
+                       raw['test'], interim / 'train_merged.parquet',
+                       interim / 'test_merged.parquet',
+                       '--params-file', params_file,
+                       '--test-date', test_date],
+        'fill-nan': [interim / 'train_merged.parquet',
+                     interim / 'test_merged.parquet',
+                     interim / 'train_filled.parquet',
+                     interim / 'test_filled.parquet',
+                     '', models / 'nan_filler.json', params_file],
+        'build-features': [interim / 'train_filled.parquet',
+                           interim / 'test_filled.parquet',
+                           interim / 'train_features.parquet',
+                           interim / 'test_features.parquet',
+                           '--params-file', params_file],
+        'drop-features': [interim / 'train_features.parquet',
+                          interim / 'test_features.parquet',
+                          processed / 'train_final.csv',
+                          processed / 'test_final.csv', params_file],
+        'train': [processed / 'train_final.csv', models / 'model.joblib',
+                  model_config],
+        'predict': [models / 'model.joblib', processed / 'test_final.csv',
+                    processed / 'predictions.csv'],
+    }
+
+
+def run_stage(stage, args, metrics_path) -> dict:
+    """
+    Запускает `courier <stage>` отдельным процессом с --metrics.
+
+    Отдельный процесс нужен, чтобы пиковый RSS относился только к этому
+    этапу.
+
+    Returns:
+        Метрики этапа без списков файлов
+    """
+    python_path = [str(PROJECT_DIR), os.environ.get('PYTHONPATH')]
+    env = dict(os.environ,
+               PYTHONPATH=os.pathsep.join(filter(None, python_path)))
+    command = [sys.executable, '-m', 'src.cli', stage, *map(str, args),
+               '--metrics', str(metrics_path)]
+    completed = subprocess.run(command, cwd=PROJECT_DIR, env=env,
+                               capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise click.ClickException(f"Этап {stage} завершился с ошибкой:\n"
+                                   f"{completed.stderr[-2000:]}")
+
+    with open(metrics_path, 'r', encoding='utf-8') as f:
+        metrics = json.load(f)
+    for key in ('inputs', 'outputs'):
+        metrics.pop(key, None)
+    return metrics
+
+
+def scaling_exponents(runs, size_key='train_rows') -> dict:
+    """
+    Показатель степени зависимости времени этапа от размера данных.
+
+    Наклон прямой МНК для log(wall_seconds) от
+    log(runs[i]['rows'][size_key]): 1 — время растет линейно, 2 —
+    квадратично.
+
+    Returns:
+        {этап: показатель}; пусто, если различных размеров меньше двух
+    """
+    sizes = np.array([run['rows'][size_key] for run in runs],
+                     dtype=np.float64)
+    if len(np.unique(sizes)) < 2:
+        return {}
+    exponents = {}
+    for stage in runs[0]['stages']:
+        wall = np.array([max(run['stages'][stage]['wall_seconds'], 1e-3)
+                         for run in runs])
+        slope = np.polyfit(np.log(sizes), np.log(wall), 1)[0]
+        exponents[stage] = round(float(slope), 3)
+    return exponents
+
+
+def _environment() -> dict:
+    import lightgbm
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'lightgbm': lightgbm.__version__,
+    }
+
+
+@click.command()
+@click.option('--scale', 'scales', multiple=True,
+              default=('100x26', '400x52', '1600x52'),
+              help='Data size as STORESxWEEKS, can be repeated.')
+@click.option('--cities', type=click.IntRange(min=1), default=5,
+              help='Number of cities in the synthetic data.')
+@click.option('--seed', type=int, default=0,
+              help='Random seed of the synthetic data.')
+@click.option('--params-file', type=click.Path(exists=True),
+              default=str(PROJECT_DIR / 'references' / 'params.yaml'),
+              help='Params of the pipeline stages.')
+@click.option('--model-config', type=click.Path(exists=True),
+              default=str(PROJECT_DIR / 'configs' / 'lgbm_parameters.yaml'),
+              help='LightGBM config for the train stage.')
+@click.option('--no-model', is_flag=True,
+              help='Benchmark only the data stages, '
+                   'without train and predict.')
+@click.option('--work-dir', type=click.Path(file_okay=False), default=None,
+              help='Keep the generated data and artifacts in this directory.')
+@click.option('--output', type=click.Path(dir_okay=False),
+              default='reports/benchmarks.json',
+              help='Where to save the results.')
+def run_benchmarks(scales=('100x26', '400x52', '1600x52'),
+                   cities=5,
+                   seed=0,
+                   params_file='references/params.yaml',
+                   model_config='configs/lgbm_parameters.yaml',
+                   no_model=False,
+                   work_dir=None,
+                   output='reports/benchmarks.json') -> None:
+    """
+    Time every pipeline stage on synthetic data of several sizes.
+
+    For each scale synthetic raw tables are generated (src/data/synthetic.py)
+    and merge-data, fill-nan, build-features, drop-features, train and
+    predict are run one after another, each in its own process with
+    --metrics. The results (wall and CPU time, peak RSS, rows and bytes per
+    stage) and the scaling exponent of every stage are saved to JSON.
+
+    Args:
+        scales: data sizes as STORESxWEEKS
+        cities: number of cities
+        seed: random seed of the synthetic data
+        params_file: params of the pipeline stages
+        model_config: LightGBM config for the train stage
+        no_model: skip train and predict
+        work_dir: directory to keep the generated data and artifacts
+        output: path of the JSON report
+    """
+    stages = [stage for stage in STAGES
+              if not (no_model and stage in MODEL_STAGES)]
+    # Этапы запускаются из корня проекта, поэтому все пути абсолютные
+    params_file = Path(params_file).resolve()
+    model_config = Path(model_config).resolve()
+    runs = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for value in scales:
+            n_stores, n_weeks = parse_scale(value)
+            scale_dir = (Path(work_dir or tmp_dir).resolve()
+                         / f'{n_stores}x{n_weeks}')
+            raw = write_synthetic(scale_dir / 'raw', n_stores=n_stores,
+                                  n_weeks=n_weeks, n_cities=cities,
+                                  seed=seed)
+            commands = stage_commands(raw, scale_dir, params_file,
+                                      model_config,
+                                      f'{forecast_week(n_weeks):%Y-%m-%d}')
+
+            run = {
+                'stores': n_stores,
+                'weeks': n_weeks,
+                'cities': cities,
+                'rows': {f'{name}_rows': len(pd.read_csv(path, usecols=[0]))
+                         for name, path in raw.items()},
+                'stages': {},
+            }
+            for stage in stages:
+                metrics = run_stage(stage, commands[stage],
+                                    scale_dir / f'{stage}.json')
+                run['stages'][stage] = metrics
+                click.echo(f"{value:>10} {stage:<15} "
+                           f"{metrics['wall_seconds']:8.2f} s "
+                           f"{metrics['peak_rss_mb'] or 0:8.1f} MB")
+            runs.append(run)
+
+    report = {
+        'created': pd.Timestamp.now().isoformat(timespec='seconds'),
+        'environment': _environment(),
+        'runs': runs,
+        'scaling': scaling_exponents(runs),
+    }
+    Path(output).parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    click.echo(f'Результаты: {output}')
+
+
+if __name__ == "__main__":
+    run_benchmarks()
@@ -0,0 +1,80 @@
+import importlib
+
+import click
+
+# Подкоманды: имя -> (модуль, click-команда, краткая справка). Модуль этапа
+# импортируется только при вызове его подкоманды, поэтому `courier --help`
+# не загружает pandas, а lightgbm грузится только в train и predict
+COMMANDS = {
+    'merge-data': ('src.data.merge_data', 'merge_data',
+                   'Merge facts, shifts forecast and target.'),
+    'fill-nan': ('src.data.nan_filling', 'fill_nan',
+                 'Fill empty values with NanFiller.'),
+    'build-features': ('src.features.build_features', 'build_features',
+                       'Add model features.'),
+    'drop-features': ('src.data.drop_features', 'drop_features',
+                      'Delete columns that are not model features.'),
+    'pipeline': ('src.pipeline', 'run_pipeline',
+                 'Run merge-data .. drop-features in one process.'),
+    'train': ('src.models.train_model', 'train_lgbm_model',
+              'Train the LightGBM model.'),
+    'predict': ('src.models.predict_model', 'predict_model',
+                'Predict with a trained model.'),
+    'synthetic': ('src.data.synthetic', 'make_synthetic',
+                  'Generate synthetic raw tables.'),
+    'benchmark': ('src.benchmark', 'run_benchmarks',
+                  'Time every stage on synthetic data.'),
+    'index': ('src.data.artifact_index', 'index_artifacts',
+              'Hash artifacts into the artifact index.'),
+    'search': ('src.models.search', 'run_search',
+               'Tune LightGBM params with successive halving.'),
+}
+
+
+class LazyGroup(click.Group):
+    """
+    Группа click, которая импортирует модуль подкоманды только при ее вызове.
+
+    Список команд и краткая справка берутся из COMMANDS, поэтому для
+    `--help` группы модули этапов не загружаются.
+    """
+    def __init__(self, *args, lazy_commands=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lazy_commands = dict(lazy_commands or {})
+
+    def list_commands(self, ctx) -> list:
+        commands = set(super().list_commands(ctx)) | set(self.lazy_commands)
+        return sorted(commands)
+
+    def get_command(self, ctx, cmd_name):
+        if cmd_name in self.commands or cmd_name not in self.lazy_commands:
+            return super().get_command(ctx, cmd_name)
+        module_name, attr, _ = self.lazy_commands[cmd_name]
+        command = getattr(importlib.import_module(module_name), attr)
+        self.add_command(command, cmd_name)
+        return command
+
+    def format_commands(self, ctx, formatter) -> None:
+        rows = []
+        for name in self.list_commands(ctx):
+            if name in self.lazy_commands:
+                rows.append((name, self.lazy_commands[name][2]))
+            else:
+                rows.append((name, self.commands[name].get_short_help_str()))
+        if rows:
+            with formatter.section('Commands'):
+                formatter.write_dl(rows)
+
+
+@click.group(cls=LazyGroup, lazy_commands=COMMANDS)
+def main() -> None:
+    """
+    Courier deficit prediction: pipeline stages, training and benchmarks.
+
+    Every stage of dvc.yaml is a subcommand, run `courier <command> --help`
+    for its arguments.
+    """
+
+
+if __name__ == "__main__":
+    main()
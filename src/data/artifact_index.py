@@ -0,0 +1,289 @@
+import functools
+import hashlib
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import click
+
+FORMAT = 'artifact_index'
+FORMAT_VERSION = 1
+
+# Файлы читаются и хешируются кусками такого размера, куски большого
+# файла — параллельно
+CHUNK_SIZE = 8 * 2 ** 20
+
+_SRC_DIR = Path(__file__).resolve().parents[1]
+
+
+def _chunk_digest(path, offset, size) -> bytes:
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        return hashlib.blake2b(f.read(size), digest_size=32).digest()
+
+
+def hash_files(paths, workers=None, chunk_size=CHUNK_SIZE) -> dict:
+    """
+    Хеши содержимого файлов.
+
+    Каждый файл делится на куски по chunk_size байт, куски всех файлов
+    хешируются blake2b в пуле потоков (hashlib отпускает GIL), хеш файла —
+    blake2b от хешей его кусков по порядку. Поэтому большой файл хешируется
+    параллельно, а результат не зависит от числа потоков.
+
+    Args:
+        paths: пути к существующим файлам
+        workers: число потоков, по умолчанию os.cpu_count()
+        chunk_size: размер куска в байтах
+
+    Returns:
+        {путь: hex-хеш}
+    """
+    chunks = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for path in paths:
+            size = os.path.getsize(path)
+            offsets = range(0, size, chunk_size) if size else [0]
+            chunks[path] = [pool.submit(_chunk_digest, path, offset,
+                                        chunk_size)
+                            for offset in offsets]
+
+        result = {}
+        for path, futures in chunks.items():
+            digest = hashlib.blake2b(digest_size=32)
+            for future in futures:
+                digest.update(future.result())
+            result[path] = digest.hexdigest()
+    return result
+
+
+def _key(path) -> str:
+    return os.path.normpath(str(path))
+
+
+def _loaded_sources() -> list:
+    """Загруженные файлы модулей пакета src: код, от которого зависит этап."""
+    files = set()
+    for module in list(sys.modules.values()):
+        source = getattr(module, '__file__', None)
+        if (source and source.endswith('.py')
+                and Path(source).resolve().is_relative_to(_SRC_DIR)):
+            files.add(_key(os.path.relpath(source)))
+    return sorted(files)
+
+
+class ArtifactIndex:
+    """
+    Индекс артефактов пайплайна: размер, mtime и хеш содержимого файлов,
+    а также входы и выходы последнего успешного запуска каждого этапа.
+
+    Хеш файла пересчитывается, только если изменились его размер или
+    mtime, поэтому проверка неизмененных артефактов не читает их.
+    Индекс хранится в JSON и записывается атомарно.
+
+    Attributes:
+        path (Path): файл индекса
+        files (dict): {путь: {'size', 'mtime_ns', 'hash'}}
+        stages (dict): {этап: {'config', 'inputs', 'outputs'}} с хешами файлов
+        workers (int): число потоков хеширования
+        hashed (list): файлы, которые пришлось прочитать последними вызовами
+    """
+    def __init__(self, path, workers=None):
+        self.path = Path(path)
+        self.workers = workers
+        self.files = {}
+        self.stages = {}
+        self.hashed = []
+        if self.path.exists():
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if (data.get('format') != FORMAT
+                    or data.get('version', 0) > FORMAT_VERSION):
+                raise ValueError(f"{self.path} не индекс артефактов версии "
+                                 f"<= {FORMAT_VERSION}")
+            self.files = data.get('files', {})
+            self.stages = data.get('stages', {})
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'format': FORMAT, 'version': FORMAT_VERSION,
+                       'files': self.files, 'stages': self.stages},
+                      f, indent=2, sort_keys=True)
+        tmp_path.replace(self.path)
+
+    def hashes(self, paths) -> dict:
+        """
+        Хеши файлов; несуществующим файлам соответствует None.
+
+        Файлы с теми же размером и mtime, что в индексе, не читаются.
+        """
+        result, stale = {}, {}
+        for path in paths:
+            key = _key(path)
+            try:
+                stat = os.stat(key)
+            except OSError:
+                result[key] = None
+                self.files.pop(key, None)
+                continue
+            entry = self.files.get(key)
+            if (entry and entry['size'] == stat.st_size
+                    and entry['mtime_ns'] == stat.st_mtime_ns):
+                result[key] = entry['hash']
+            else:
+                stale[key] = stat
+
+        if stale:
+            self.hashed.extend(stale)
+            hashed = hash_files(list(stale), self.workers)
+            for key, file_hash in hashed.items():
+                stat = stale[key]
+                self.files[key] = {'size': stat.st_size,
+                                   'mtime_ns': stat.st_mtime_ns,
+                                   'hash': file_hash}
+                result[key] = file_hash
+        return {_key(path): result[_key(path)] for path in paths}
+
+    def is_up_to_date(self, stage, config, inputs, outputs) -> bool:
+        """
+        True, если последний успешный запуск stage был с тем же config,
+        его входы (среди них все inputs) и выходы outputs не изменились.
+
+        Проверяются все входы, записанные при запуске: в их числе модули,
+        которые этап импортировал уже во время работы.
+        """
+        record = self.stages.get(stage)
+        if not record or record['config'] != config:
+            return False
+        if not {_key(path) for path in inputs} <= set(record['inputs']):
+            return False
+        if record['inputs'] != self.hashes(list(record['inputs'])):
+            return False
+        current = self.hashes(outputs)
+        return record['outputs'] == current and all(current.values())
+
+    def record(self, stage, config, inputs, outputs) -> None:
+        """Запоминает успешный запуск stage."""
+        self.stages[stage] = {'config': config,
+                              'inputs': self.hashes(inputs),
+                              'outputs': self.hashes(outputs)}
+
+
+def _paths(kwargs, names) -> list:
+    return [kwargs[name] for name in names if kwargs.get(name)]
+
+
+def index_option(stage, inputs=(), outputs=()):
+    """
+    Добавляет click-команде опцию --artifact-index.
+
+    С ней команда пропускает работу, если с последнего успешного запуска
+    не изменились хеши входных файлов, код пакета src, загруженный этапом,
+    и остальные аргументы, а выходы на месте и не менялись. После
+    успешного запуска входы и выходы записываются в индекс.
+
+    Args:
+        stage: имя этапа в индексе
+        inputs: имена аргументов команды с путями входных файлов
+        outputs: имена аргументов команды с путями выходных файлов
+    """
+    def decorator(command):
+        @functools.wraps(command)
+        def wrapper(*args, artifact_index=None, **kwargs):
+            if not artifact_index:
+                return command(*args, **kwargs)
+
+            index = ArtifactIndex(artifact_index)
+            options = {name: value for name, value in kwargs.items()
+                       if name not in inputs and name not in outputs}
+            config = json.dumps(options, sort_keys=True, default=str)
+            input_paths = _paths(kwargs, inputs) + _loaded_sources()
+            output_paths = _paths(kwargs, outputs)
+
+            if index.is_up_to_date(stage, config, input_paths, output_paths):
+                click.echo(f'{stage}: входы не изменились, выходы актуальны '
+                           '— этап пропущен')
+                index.save()
+                return None
+
+            result = command(*args, **kwargs)
+            index.record(stage, config, input_paths + _loaded_sources(),
+                         output_paths)
+            index.save()
+            return result
+
+        option = click.option(
+            '--artifact-index', type=click.Path(dir_okay=False), default=None,
+            help='Skip the stage if its inputs, code and options match the '
+                 'last run recorded in this index file; record the run '
+                 'otherwise.')
+        return option(wrapper)
+    return decorator
+
+
+@click.command()
+@click.argument('paths', nargs=-1, type=click.Path())
+@click.option('--index', 'index_path', type=click.Path(dir_okay=False),
+              default='.artifact_index.json', help='Index file.')
+@click.option('--dvc-file', type=click.Path(exists=True, dir_okay=False),
+              default=None,
+              help='Also index every dependency and output of the stages '
+                   'in this dvc.yaml.')
+@click.option('--workers', type=click.IntRange(min=1), default=None,
+              help='Hashing threads, the number of CPUs by default.')
+@click.option('--check', is_flag=True,
+              help='Do not update the index, exit with code 1 if any file '
+                   'differs from it.')
+def index_artifacts(paths=(), index_path='.artifact_index.json', dvc_file=None,
+                    workers=None, check=False) -> None:
+    """
+    Hash pipeline artifacts into the artifact index.
+
+    Files whose size and mtime match the index are not read again, new and
+    changed files are hashed in parallel in chunks. With --check the index is
+    only compared with the files on disk.
+
+    Args:
+        paths: files to index
+        index_path: index file
+        dvc_file: dvc.yaml whose stage deps and outs are indexed as well
+        workers: number of hashing threads
+        check: compare with the index instead of updating it
+    """
+    paths = list(paths)
+    if dvc_file:
+        import yaml
+        with open(dvc_file, 'r', encoding='utf-8') as f:
+            stages = (yaml.safe_load(f) or {}).get('stages', {})
+        for stage in stages.values():
+            entries = (stage.get('deps', []) + stage.get('outs', [])
+                       + stage.get('metrics', []))
+            for entry in entries:
+                paths.append(next(iter(entry)) if isinstance(entry, dict)
+                             else entry)
+    paths = [path for path in dict.fromkeys(_key(p) for p in paths)
+             if os.path.isfile(path)]
+
+    index = ArtifactIndex(index_path, workers)
+    before = {path: index.files.get(path, {}).get('hash') for path in paths}
+    current = index.hashes(paths)
+
+    changed = [path for path in paths if before[path] != current[path]]
+    for path in paths:
+        state = 'changed' if path in changed else 'ok'
+        click.echo(f"{current[path][:16]}  {index.files[path]['size']:>12}  "
+                   f"{state:<7}  {path}")
+
+    if check:
+        if changed:
+            raise SystemExit(1)
+        return
+    index.save()
+
+
+if __name__ == "__main__":
+    index_artifacts()
@@ -1,8 +1,13 @@
-import pandas as pd
 import click
 import yaml
 from pathlib import Path
 
+from src.data.artifact_index import index_option
+from src.data.feature_matrix import matrix_categories, write_matrix
+from src.data.schema import load_schema
+from src.data.storage import FORMATS, read_frame, write_frame
+from src.stage_metrics import metrics_option
+
 
 @click.command()
 @click.argument('train_filepath', type=click.Path(exists=True))
@@ -10,11 +15,28 @@ from pathlib import Path
 @click.argument('train_output_path', type=click.Path())
 @click.argument('test_output_path', type=click.Path())
 @click.argument('params_file', type=click.Path())
+@click.option('--format', 'fmt', type=click.Choice(FORMATS), default=None,
+              help='Output format. '
+                   'By default it is taken from the file extension.')
+@click.option('--train-matrix', type=click.Path(dir_okay=False), default=None,
+              help='Also save the train features as a memory-mapped '
+                   'float32 .npy matrix.')
+@click.option('--test-matrix', type=click.Path(dir_okay=False), default=None,
+              help='Also save the test features as a .npy matrix with the '
+                   'train categories.')
+@metrics_option('drop-features')
+@index_option('drop-features',
+              inputs=('train_filepath', 'test_filepath', 'params_file'),
+              outputs=('train_output_path', 'test_output_path',
+                       'train_matrix', 'test_matrix'))
 def drop_features(train_filepath,
                   test_filepath,
                   train_output_path,
                   test_output_path,
-                  params_file='params.yaml'):
+                  params_file='params.yaml',
+                  fmt=None,
+                  train_matrix=None,
+                  test_matrix=None):
     """Deleting unnecessary columns.
        Args:
            train_filepath: path to train data
@@ -22,24 +44,58 @@ def drop_features(train_filepath,
            train_output_path: the path where train data will be saved
            test_output_path: the path where test data will be saved
            params_file: path to yaml file with parameters for this function
-       The final train and test data will be saved in csv files.
+           fmt: output format (csv, parquet or feather)
+           train_matrix: path to save the train features as a .npy matrix
+           test_matrix: path to save the test features as a .npy matrix
+       The final train and test data will be saved in csv or columnar files,
+       the matrices are used by train_model and predict_model without parsing.
     """
     with open(params_file, 'r', encoding='utf-8') as f:
         params = yaml.safe_load(f)
 
     drop_cols = params['drop_features']['cols']
+    # Неделя строки нужна только матрице train: по ней делятся фолды
+    # кросс-валидации
+    time_col = (params['drop_features'].get('time_col') if train_matrix
+                else None)
+    schema = load_schema(params)
 
-    train_df = pd.read_csv(train_filepath)
-    train_df.drop(columns=drop_cols, inplace=True)
+    # Удаляемые колонки не читаются; если их уже убрали прежние этапы,
+    # их нет и во входе
+    skip = [col for col in drop_cols if col != time_col]
+    train_df = read_frame(train_filepath, schema=schema, exclude=skip)
+    train_time = row_time(train_df, time_col)
+    drop_columns(train_df, drop_cols)
 
     if train_output_path:
-        train_df.to_csv(train_output_path, index=False)
+        write_frame(train_df, train_output_path, fmt)
+    # Коды категорий test берутся из train, как у модели, обученной на train
+    categories = (matrix_categories(train_df)
+                  if train_matrix or test_matrix else None)
+    if train_matrix:
+        write_matrix(train_df, train_matrix, categories=categories,
+                     time=train_time)
 
     if test_filepath and Path(test_filepath).exists():
-        test_df = pd.read_csv(test_filepath)
-        test_df.drop(columns=drop_cols, inplace=True)
+        test_df = read_frame(test_filepath, schema=schema, exclude=drop_cols)
+        drop_columns(test_df, drop_cols)
         if test_output_path:
-            test_df.to_csv(test_output_path, index=False)
+            write_frame(test_df, test_output_path, fmt)
+        if test_matrix:
+            write_matrix(test_df, test_matrix, categories=categories)
+
+
+def row_time(df, time_col):
+    """Колонка недели строк df для матрицы признаков или None, если ее нет."""
+    if time_col and time_col in df.columns:
+        return df[time_col]
+    return None
+
+
+def drop_columns(df, drop_cols):
+    """Drops unnecessary columns in place, skips missing ones; returns df."""
+    df.drop(columns=drop_cols, inplace=True, errors='ignore')
+    return df
 
 
 if __name__ == "__main__":
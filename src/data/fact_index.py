@@ -0,0 +1,154 @@
+import numpy as np
+import pandas as pd
+
+WEEK = pd.Timedelta(days=7)
+
+
+class FactIndex:
+    """
+    Отсортированный по (store_id, calendar_dt) индекс над facts.
+
+    Позволяет одним векторизованным поиском (np.searchsorted) получить для
+    каждой строки факты за любую предыдущую неделю или ближайшую более раннюю
+    неделю, если нужной нет. Заменяет отдельный hash-merge на каждый лаг.
+
+    Attributes:
+        facts (pd.DataFrame): facts, отсортированные по магазину и дате
+        key_col (str): колонка магазина
+        time_col (str): колонка даты
+    """
+    def __init__(self, facts_df, key_col='store_id', time_col='calendar_dt'):
+        """
+        Строит индекс.
+
+        Args:
+            facts_df: DataFrame с фактами, по строке на магазин и неделю
+            key_col: колонка магазина
+            time_col: колонка даты
+        """
+        self.key_col = key_col
+        self.time_col = time_col
+
+        facts = facts_df.copy()
+        facts[time_col] = pd.to_datetime(facts[time_col])
+
+        codes, self._stores = pd.factorize(facts[key_col], sort=True)
+        days = (facts[time_col].to_numpy().astype('datetime64[D]')
+                .astype(np.int64))
+
+        order = np.lexsort((days, codes))
+        self.facts = facts.take(order).reset_index(drop=True)
+        self._codes = codes[order]
+        self._days = days[order]
+
+        self._min_day = int(self._days.min()) if len(self._days) else 0
+        self._span = (int(self._days.max()) - self._min_day + 1
+                      if len(self._days) else 1)
+        self._keys = (self._codes.astype(np.int64) * self._span
+                      + (self._days - self._min_day))
+
+        if len(self._keys) and (np.diff(self._keys) == 0).any():
+            raise ValueError(
+                f"В facts несколько строк на одну пару ({key_col}, {time_col})"
+            )
+
+    def lookup(self, store_ids, dates, tolerance_weeks=0) -> np.ndarray:
+        """
+        Находит строку facts с датой <= date для каждого магазина.
+
+        Args:
+            store_ids: магазины
+            dates: искомые даты
+            tolerance_weeks: насколько более ранняя неделя допустима,
+                если искомой нет (0 — только точное совпадение)
+
+        Returns:
+            Позиции строк в self.facts, -1 если подходящего факта нет
+        """
+        codes = self._stores.get_indexer(pd.Index(store_ids))
+        days = (pd.to_datetime(pd.Series(dates)).to_numpy()
+                .astype('datetime64[D]').astype(np.int64))
+        if not len(self._keys):
+            return np.full(len(codes), -1, dtype=np.intp)
+
+        # Смещение внутри диапазона магазина: за правой границей берем
+        # последний факт магазина, до левой — гарантированно промахиваемся
+        offset = np.clip(days - self._min_day, -1, self._span - 1)
+        pos = np.searchsorted(self._keys,
+                              codes.astype(np.int64) * self._span + offset,
+                              side='right') - 1
+
+        safe_pos = np.clip(pos, 0, None)
+        found = (
+            (codes >= 0)
+            & (pos >= 0)
+            & (self._codes[safe_pos] == codes)
+            & (self._days[safe_pos] >= days - 7 * tolerance_weeks)
+        )
+        return np.where(found, pos, -1)
+
+    def take(self, positions, columns=None) -> pd.DataFrame:
+        """
+        Возвращает строки facts по позициям из lookup().
+
+        Отсутствующие позиции (-1) дают строку из NaN с тем же приведением
+        типов, что и у left merge.
+        """
+        facts = self.facts if columns is None else self.facts[columns]
+        return facts.reindex(positions).reset_index(drop=True)
+
+
+def lag_suffix(col, lag) -> str:
+    """
+    Имя колонки facts для лага `lag` (колонки facts уже названы как лаг 1).
+    """
+    if col.endswith('_lag_1'):
+        return f'{col[:-len("_lag_1")]}_lag_{lag}'
+    return f'{col}_lag_{lag}'
+
+
+def attach_fact_lags(df, fact_index, lags=(1,), tolerance_weeks=0,
+                     lag_cols=None, exclude=None) -> pd.DataFrame:
+    """
+    Добавляет к df факты за предыдущие недели.
+
+    Лаг 1 повторяет прежний merge по предыдущей неделе: те же имена колонок,
+    совпадающие с df колонки получают суффикс '_facts'. Для лагов > 1
+    колонки переименовываются в *_lag_k.
+
+    Args:
+        df: DataFrame с колонками магазина и даты
+        fact_index: FactIndex над facts
+        lags: номера недель назад
+        tolerance_weeks: допуск для as-of поиска ближайшей более ранней недели
+        lag_cols: колонки facts для лагов > 1 (по умолчанию все)
+        exclude: имена колонок результата, которые не нужно добавлять
+
+    Returns:
+        Новый DataFrame в порядке строк df
+    """
+    key_col, time_col = fact_index.key_col, fact_index.time_col
+    value_cols = [c for c in fact_index.facts.columns if c != key_col]
+    if lag_cols is None:
+        lag_cols = [c for c in value_cols if c != time_col]
+
+    exclude = set(exclude or ())
+
+    parts = [df.reset_index(drop=True)]
+    for lag in lags:
+        if lag == 1:
+            names = {c: c + '_facts' if c in df.columns else c
+                     for c in value_cols}
+        else:
+            names = {c: lag_suffix(c, lag) for c in lag_cols}
+        names = {c: name for c, name in names.items() if name not in exclude}
+        if not names:
+            continue
+
+        positions = fact_index.lookup(df[key_col], df[time_col] - lag * WEEK,
+                                      tolerance_weeks)
+        lagged = fact_index.take(positions, list(names))
+        lagged.columns = list(names.values())
+        parts.append(lagged)
+
+    return pd.concat(parts, axis=1)
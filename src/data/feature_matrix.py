@@ -0,0 +1,200 @@
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.stage_metrics import record_read, record_write
+
+FORMAT = 'feature_matrix'
+FORMAT_VERSION = 1
+
+DTYPE = np.float32
+TARGET_COL = 'target'
+
+# Матрица пишется блоками по столько строк, чтобы не держать в памяти
+# ее float-копию целиком
+BLOCK_ROWS = 2 ** 16
+
+
+def is_matrix(path) -> bool:
+    """True, если path — матрица признаков (.npy), а не таблица."""
+    return Path(path).suffix.lower() == '.npy'
+
+
+def metadata_path(path) -> Path:
+    """Файл метаданных матрицы: train_final.npy -> train_final.json."""
+    return Path(path).with_suffix('.json')
+
+
+def target_path(path) -> Path:
+    """Файл таргета матрицы: train_final.npy -> train_final.target.npy."""
+    path = Path(path)
+    return path.with_name(f'{path.stem}.target.npy')
+
+
+def time_path(path) -> Path:
+    """Файл недель строк матрицы: train_final.npy -> train_final.time.npy."""
+    path = Path(path)
+    return path.with_name(f'{path.stem}.time.npy')
+
+
+def matrix_categories(df, target_col=TARGET_COL) -> dict:
+    """
+    Категории нечисловых колонок df: {колонка: отсортированные значения}.
+
+    Порядок тот же, что у astype('category') для прочитанного CSV, поэтому
+    коды матрицы совпадают с кодами, которые LightGBM берет из pandas.
+    """
+    categories = {}
+    for col in df.columns:
+        if (col == target_col or pd.api.types.is_numeric_dtype(df[col])
+                or pd.api.types.is_bool_dtype(df[col])):
+            continue
+        categories[col] = sorted(pd.unique(df[col].dropna()).tolist())
+    return categories
+
+
+def _column_values(series, categories) -> np.ndarray:
+    if categories is None:
+        return series.to_numpy(dtype=DTYPE, na_value=np.nan)
+    codes = pd.Categorical(series, categories=categories).codes.astype(DTYPE)
+    # Пропуски и значения, которых не было в train, — пропуски и для LightGBM
+    codes[codes < 0] = np.nan
+    return codes
+
+
+def write_matrix(df, path, target_col=TARGET_COL, categories=None,
+                 time=None) -> dict:
+    """
+    Сохраняет признаки df как непрерывную float32-матрицу .npy
+    для np.load(mmap_mode='r').
+
+    Рядом пишутся метаданные (<имя>.json: колонки, категории, размер) и,
+    если в df есть target_col, таргет (<имя>.target.npy). Категориальные
+    колонки хранятся кодами в categories; для test нужно передать
+    категории train, чтобы коды совпали. Недели строк time (для
+    кросс-валидации по времени) пишутся в <имя>.time.npy.
+
+    Args:
+        df: итоговый датасет
+        path: путь к .npy
+        target_col: колонка таргета, в матрицу не входит
+        categories: {колонка: значения}, по умолчанию matrix_categories(df)
+        time: даты строк df или None
+
+    Returns:
+        Метаданные матрицы
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if categories is None:
+        categories = matrix_categories(df, target_col)
+    columns = [col for col in df.columns if col != target_col]
+    has_target = target_col in df.columns
+
+    matrix = np.lib.format.open_memmap(path, mode='w+', dtype=DTYPE,
+                                       shape=(len(df), len(columns)))
+    for start in range(0, len(df), BLOCK_ROWS):
+        block = df.iloc[start:start + BLOCK_ROWS]
+        for j, col in enumerate(columns):
+            matrix[start:start + len(block), j] = _column_values(
+                block[col], categories.get(col))
+    matrix.flush()
+    del matrix
+    record_write(path, len(df))
+
+    if has_target:
+        target = df[target_col].to_numpy(dtype=np.float64, na_value=np.nan)
+        np.save(target_path(path), target)
+    if time is not None:
+        weeks = pd.to_datetime(pd.Series(time)).to_numpy(dtype='datetime64[D]')
+        np.save(time_path(path), weeks)
+
+    metadata = {
+        'format': FORMAT,
+        'version': FORMAT_VERSION,
+        'dtype': np.dtype(DTYPE).name,
+        'shape': [len(df), len(columns)],
+        'columns': columns,
+        'categories': {col: values for col, values in categories.items()
+                       if col in columns},
+        'target': target_col if has_target else None,
+        'time': time is not None,
+    }
+    with open(metadata_path(path), 'w', encoding='utf-8') as f:
+        json.dump(metadata, f, indent=2, ensure_ascii=False)
+    return metadata
+
+
+class FeatureMatrix:
+    """
+    Матрица признаков, отображенная в память только для чтения.
+
+    Страницы файла читаются по мере обращения и делятся между процессами
+    через page cache, поэтому несколько экспериментов на одних данных не
+    копируют их. Матрицу можно передать в lgb.Dataset и Booster.predict
+    как есть: она непрерывная и уже float32.
+
+    Attributes:
+        path (Path): файл .npy
+        X (np.memmap): признаки, shape (строки, колонки)
+        target (np.ndarray): таргет или None, если его нет (test)
+        columns (list): имена колонок X
+        categories (dict): {колонка: значения}, коды в X — индексы в этих
+            списках
+        time (np.ndarray): недели строк (datetime64[D]) или None
+    """
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(metadata_path(self.path), 'r', encoding='utf-8') as f:
+            metadata = json.load(f)
+        if (metadata.get('format') != FORMAT
+                or metadata.get('version', 0) > FORMAT_VERSION):
+            raise ValueError(f"{metadata_path(self.path)} не описание матрицы "
+                             f"признаков версии <= {FORMAT_VERSION}")
+
+        self.X = np.load(self.path, mmap_mode='r')
+        if list(self.X.shape) != metadata['shape']:
+            raise ValueError(f"Размер {self.path} {self.X.shape} не совпадает "
+                             f"с метаданными {metadata['shape']}")
+        self.columns = metadata['columns']
+        self.categories = metadata['categories']
+        self.target_col = metadata['target']
+        self.target = None
+        if self.target_col:
+            self.target = np.load(target_path(self.path), mmap_mode='r')
+        self.time = None
+        if metadata.get('time'):
+            self.time = np.load(time_path(self.path), mmap_mode='r')
+        record_read(self.path, len(self.X))
+
+    def __len__(self) -> int:
+        return len(self.X)
+
+    def categorical_features(self, names=None) -> list:
+        """Категориальные колонки матрицы; с names — те из names, что есть."""
+        if names is None:
+            return list(self.categories)
+        return [name for name in names if name in self.columns]
+
+    def pandas_categorical(self) -> list:
+        """
+        Категории в формате Booster.pandas_categorical: списки значений
+        по порядку колонок.
+
+        С ними модель, обученная на матрице, кодирует категории DataFrame
+        при predict так же, как они закодированы в матрице.
+        """
+        return [self.categories[col] for col in self.columns
+                if col in self.categories]
+
+    def to_frame(self) -> pd.DataFrame:
+        """DataFrame с исходными значениями категорий для отладки."""
+        df = pd.DataFrame(np.asarray(self.X), columns=self.columns)
+        for col, values in self.categories.items():
+            codes = df[col].fillna(-1).astype(np.int64)
+            df[col] = pd.Categorical.from_codes(codes, categories=values)
+        if self.target is not None:
+            df.insert(0, self.target_col, np.asarray(self.target))
+        return df
@@ -0,0 +1,225 @@
+import hashlib
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.data.fact_index import WEEK, FactIndex
+from src.data.merge_data import merge_train
+
+CACHE_VERSION = 2
+MANIFEST = 'manifest.json'
+
+
+def week_hashes(df, time_col='calendar_dt') -> dict:
+    """
+    Хеш содержимого каждой недели df.
+
+    Хешируется последовательность хешей строк недели в порядке df, поэтому
+    перестановка строк внутри недели меняет хеш: по этому порядку _assemble
+    восстанавливает строки недели из партиции.
+
+    Returns:
+        {неделя: hex-хеш строк недели}
+    """
+    if not len(df):
+        return {}
+    row_hash = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    weeks = df[time_col].to_numpy()
+
+    # Устойчивая сортировка сохраняет порядок строк внутри недели
+    order = np.argsort(weeks, kind='stable')
+    uniq, starts = np.unique(weeks[order], return_index=True)
+    ends = np.append(starts[1:], len(weeks))
+    row_hash = row_hash[order]
+    return {pd.Timestamp(w): _digest(row_hash[start:end].tobytes())
+            for w, start, end in zip(uniq, starts, ends)}
+
+
+def _digest(data) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _schema(df) -> list:
+    return [[col, str(dtype)] for col, dtype in df.dtypes.items()]
+
+
+def _partition_path(cache_dir, week) -> Path:
+    return Path(cache_dir) / f'calendar_dt={week:%Y-%m-%d}.parquet'
+
+
+def _file_state(path) -> list:
+    stat = Path(path).stat()
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+class IncrementalMerge:
+    """
+    Инкрементальный merge train с кешем по неделям.
+
+    Результат merge_train хранится в cache_dir по файлу на каждую неделю
+    calendar_dt. Для каждой недели запоминается хеш всех входов, от которых
+    она зависит: строки train и shifts этой недели и строки facts за недели
+    лагов (с учетом as-of допуска). При следующем запуске пересчитываются
+    только недели, у которых хеш изменился или которых еще нет в кеше, и
+    на диск пишутся только их партиции. Если ни одна неделя не изменилась,
+    а выход, записанный прошлым запуском (record_output), не трогали,
+    merge() не читает партиции и возвращает None: выход уже актуален.
+
+    Attributes:
+        cache_dir (Path): каталог с недельными партициями и manifest.json
+        lags (tuple): номера недель назад, как в merge_train
+        tolerance_weeks (int): as-of допуск, как в merge_train
+        lag_cols (list): колонки facts для лагов > 1
+        updated_weeks (list): недели, пересчитанные последним вызовом merge()
+    """
+    def __init__(self, cache_dir, lags=(1,), tolerance_weeks=0, lag_cols=None):
+        self.cache_dir = Path(cache_dir)
+        self.lags = tuple(lags)
+        self.tolerance_weeks = tolerance_weeks
+        self.lag_cols = lag_cols
+        self.updated_weeks = []
+        self._layout = None
+
+    def _load_manifest(self) -> dict:
+        path = self.cache_dir / MANIFEST
+        if not path.exists():
+            return {}
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _save_manifest(self, manifest) -> None:
+        with open(self.cache_dir / MANIFEST, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+
+    def _config_hash(self, train_df, facts_df, shifts_df) -> str:
+        config = {
+            'version': CACHE_VERSION,
+            'lags': list(self.lags),
+            'tolerance_weeks': self.tolerance_weeks,
+            'lag_cols': self.lag_cols,
+            'schemas': [_schema(train_df), _schema(facts_df),
+                        _schema(shifts_df)],
+        }
+        text = json.dumps(config, sort_keys=True)
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def _fact_weeks(self, week) -> list:
+        # Недели facts, которые может прочитать as-of поиск для недели week
+        return [week - (lag + back) * WEEK
+                for lag in self.lags
+                for back in range(self.tolerance_weeks + 1)]
+
+    def _week_keys(self, train_df, facts_df, shifts_df) -> dict:
+        train_h = week_hashes(train_df)
+        facts_h = week_hashes(facts_df)
+        shifts_h = week_hashes(shifts_df)
+        keys = {}
+        for week, train_hash in train_h.items():
+            parts = [train_hash, shifts_h.get(week)] + [
+                facts_h.get(w) for w in self._fact_weeks(week)]
+            keys[week] = hashlib.sha256(repr(parts).encode()).hexdigest()
+        return keys
+
+    def merge(self, train_df, facts_df, shifts_df, output=None,
+              output_options=None):
+        """
+        Обновляет кеш и возвращает полный результат merge_train.
+
+        Args:
+            train_df, facts_df, shifts_df: полные входы, как для merge_train
+            output: файл, куда вызывающий запишет результат
+            output_options: настройки записи output (формат, удаленные
+                колонки)
+
+        Returns:
+            DataFrame, совпадающий с merge_train(train_df, facts_df,
+            shifts_df), или None, если output уже содержит этот результат
+        """
+        for df in (train_df, facts_df, shifts_df):
+            df['calendar_dt'] = pd.to_datetime(df['calendar_dt'])
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        manifest = self._load_manifest()
+        config = self._config_hash(train_df, facts_df, shifts_df)
+        cached = (manifest.get('weeks', {})
+                  if manifest.get('config') == config else {})
+
+        keys = self._week_keys(train_df, facts_df, shifts_df)
+        if not keys:
+            return merge_train(train_df, facts_df, shifts_df, self.lags,
+                               self.tolerance_weeks, self.lag_cols)
+        changed = [w for w, key in keys.items()
+                   if cached.get(f'{w:%Y-%m-%d}') != key
+                   or not _partition_path(self.cache_dir, w).exists()]
+        self.updated_weeks = sorted(changed)
+        # Порядок недель по строкам train: от него зависит порядок строк
+        # результата
+        layout = _digest(train_df['calendar_dt'].to_numpy().tobytes())
+        weeks = {f'{w:%Y-%m-%d}': key for w, key in keys.items()}
+        if (not changed and output
+                and self._output_is_current(manifest, output,
+                                            output_options, layout)):
+            self._save_manifest({**manifest, 'config': config, 'weeks': weeks})
+            return None
+
+        if changed:
+            needed_facts = {w for week in changed
+                            for w in self._fact_weeks(week)}
+            fact_index = FactIndex(
+                facts_df[facts_df['calendar_dt'].isin(needed_facts)])
+            train_part = train_df[train_df['calendar_dt'].isin(changed)].copy()
+            shifts_part = shifts_df[
+                shifts_df['calendar_dt'].isin(changed)].copy()
+            merged = merge_train(train_part, fact_index, shifts_part,
+                                 self.lags, self.tolerance_weeks,
+                                 self.lag_cols)
+            for week, week_df in merged.groupby('calendar_dt', sort=False):
+                week_df.to_parquet(_partition_path(self.cache_dir, week),
+                                   index=False)
+
+        # Недели, которых больше нет в train, удаляются из кеша
+        for path in self.cache_dir.glob('calendar_dt=*.parquet'):
+            if pd.Timestamp(path.stem.split('=', 1)[1]) not in keys:
+                path.unlink()
+
+        # Прошлая запись выхода больше не соответствует кешу до record_output
+        self._layout = layout
+        self._save_manifest({'config': config, 'weeks': weeks})
+        return self._assemble(train_df, sorted(keys))
+
+    @staticmethod
+    def _output_is_current(manifest, output, output_options, layout) -> bool:
+        recorded = manifest.get('output')
+        return (recorded is not None and Path(output).exists()
+                and recorded == {'path': str(output),
+                                 'options': output_options,
+                                 'layout': layout,
+                                 'state': _file_state(output)})
+
+    def record_output(self, output, output_options=None) -> None:
+        """
+        Запоминает, что результат последнего merge() записан в output с
+        output_options.
+        """
+        manifest = self._load_manifest()
+        manifest['output'] = {'path': str(output), 'options': output_options,
+                              'layout': self._layout,
+                              'state': _file_state(output)}
+        self._save_manifest(manifest)
+
+    def _assemble(self, train_df, weeks) -> pd.DataFrame:
+        """Склеивает недельные партиции в порядке строк train_df."""
+        parts = [pd.read_parquet(_partition_path(self.cache_dir, w))
+                 for w in weeks]
+        merged = pd.concat(parts, ignore_index=True)
+
+        # Строка train = (смещение ее недели) + (номер строки внутри недели)
+        sizes = np.array([len(p) for p in parts])
+        offsets = pd.Series(np.concatenate(([0], np.cumsum(sizes)[:-1])),
+                            index=pd.DatetimeIndex(weeks))
+        row_week = train_df['calendar_dt']
+        positions = (offsets.reindex(row_week).to_numpy()
+                     + row_week.groupby(row_week).cumcount().to_numpy())
+        return merged.take(positions).reset_index(drop=True)
@@ -1,5 +1,16 @@
 import click
+import numpy as np
 import pandas as pd
+import yaml
+
+from src.data.artifact_index import index_option
+from src.data.fact_index import FactIndex, attach_fact_lags
+from src.data.projection import dead_columns, prune, read_exclude
+from src.data.schema import load_schema
+from src.data.storage import FORMATS, infer_format, read_frame, write_frame
+from src.stage_metrics import metrics_option
+
+TEST_DATE = '2025-11-24'
 
 
 @click.command()
@@ -9,42 +20,207 @@ import pandas as pd
 @click.argument('test_filepath', type=click.Path())
 @click.argument('train_output', type=click.Path())
 @click.argument('test_output', type=click.Path())
+@click.option('--format', 'fmt', type=click.Choice(FORMATS), default=None,
+              help='Output format. '
+                   'By default it is taken from the file extension.')
+@click.option('--params-file', type=click.Path(exists=True), default=None,
+              help='Yaml file with the merge_data and schema sections.')
+@click.option('--test-date', 'test_dates', multiple=True,
+              help='Forecast week for the test set, can be repeated. '
+                   'Overrides merge_data.test_date from the params file.')
+@click.option('--cache-dir', type=click.Path(file_okay=False), default=None,
+              help='Merge train incrementally: keep merged weeks in this '
+                   'directory and recompute only the weeks whose inputs '
+                   'changed.')
+@click.option('--partitions', type=click.IntRange(min=0), default=0,
+              help='Merge out-of-core in this many store_id buckets '
+                   '(0 - in memory).')
+@click.option('--chunksize', type=click.IntRange(min=1), default=100_000,
+              help='Rows per chunk in the out-of-core mode.')
+@click.option('--tmp-dir', type=click.Path(file_okay=False), default=None,
+              help='Directory for the on-disk buckets.')
+@metrics_option('merge-data')
+@index_option('merge-data',
+              inputs=('facts_filepath', 'shifts_filepath', 'train_filepath',
+                      'test_filepath', 'params_file'),
+              outputs=('train_output', 'test_output'))
 def merge_data(facts_filepath,
                shifts_filepath,
                train_filepath,
                test_filepath=None,
                train_output=None,
-               test_output=None) -> None:
+               test_output=None,
+               fmt=None,
+               params_file=None,
+               test_dates=(),
+               cache_dir=None,
+               partitions=0,
+               chunksize=100_000,
+               tmp_dir=None) -> None:
     """
     Merge datasets for courier deficit prediction.
     Args:
         facts_filepath: real data for the PREVIOUS week
         shifts_filepath: forecast for the CURRENT week
         train_filepath: target - shortage of couriers for the CURRENT week
-        test_filepath: We need to forecast for a week 2025-11-24
+        test_filepath: stores we need to forecast for the test weeks
         train_output: path where we will save the processed file with train data
         test_output: way to save test processed data
-    The final train and test data will be saved in csv files.
+        fmt: output format (csv, parquet or feather)
+        params_file: path to yaml file with parameters for this function
+        test_dates: forecast weeks, 2025-11-24 if neither the option
+            nor merge_data.test_date in params_file is given
+        cache_dir: directory of the per-week cache for the incremental mode
+        partitions: number of store_id buckets for the out-of-core mode
+        chunksize: rows per chunk in the out-of-core mode
+        tmp_dir: directory for the on-disk buckets
+    The final train and test data will be saved in csv or columnar files.
+    """
+    params = {}
+    if params_file:
+        with open(params_file, 'r', encoding='utf-8') as f:
+            params = yaml.safe_load(f)
+    lag_params = lag_options(params)
+    schema = load_schema(params)
+    test_date = (list(test_dates)
+                 or params.get('merge_data', {}).get('test_date', TEST_DATE))
+    # Колонки, которые удалит drop-features и не прочитает ни один этап до него
+    dead = dead_columns(params, 'merge_data')
+    skip = read_exclude(params, 'merge_data')
+
+    if partitions and cache_dir:
+        raise click.UsageError(
+            '--partitions and --cache-dir cannot be used together')
+
+    if partitions:
+        # Импорт здесь: partitioned_merge сам использует merge_train/merge_test
+        from src.data.partitioned_merge import merge_data_partitioned
+        merge_data_partitioned(facts_filepath, shifts_filepath, train_filepath,
+                               test_filepath, train_output, test_output,
+                               n_buckets=partitions, chunksize=chunksize,
+                               tmp_dir=tmp_dir, fmt=fmt, test_date=test_date,
+                               schema=schema, exclude=dead,
+                               read_exclude=skip, **lag_params)
+        return
+
+    train_df = read_frame(train_filepath, schema=schema, exclude=skip)
+    shifts_df = read_frame(shifts_filepath, schema=schema, exclude=skip)
+    # Один индекс по facts на train и test
+    fact_index = FactIndex(
+        read_frame(facts_filepath, schema=schema, exclude=skip))
+
+    if cache_dir:
+        merge_train_cached(train_df, fact_index, shifts_df, cache_dir,
+                           train_output, fmt, dead, lag_params)
+    else:
+        train_merged = merge_train(train_df, fact_index, shifts_df,
+                                   exclude=dead, **lag_params)
+        if train_output:
+            write_frame(train_merged, train_output, fmt)
+
+    # Делаем merge для тестовых данных
+    if test_filepath:
+        test_df = read_frame(test_filepath, schema=schema, exclude=skip)
+        test_merged = merge_test(test_df, fact_index, shifts_df, test_date,
+                                 exclude=dead, **lag_params)
+
+        if test_output:
+            write_frame(test_merged, test_output, fmt)
+
+
+def merge_train_cached(train_df, fact_index, shifts_df, cache_dir,
+                       train_output, fmt, dead, lag_params) -> None:
+    """
+    Incremental train merge: only the weeks whose inputs changed are merged.
+
+    Args:
+        train_df, fact_index, shifts_df: inputs of merge_train
+        cache_dir: directory of the per-week cache
+        train_output: path of the merged train data (optional)
+        fmt: output format
+        dead: output columns to leave out
+        lag_params: lag settings from lag_options
+    """
+    from src.data.incremental_merge import IncrementalMerge
+    merger = IncrementalMerge(cache_dir, **lag_params)
+    output_options = None
+    if train_output:
+        output_options = {'format': infer_format(train_output, fmt),
+                          'exclude': sorted(dead)}
+    train_merged = merger.merge(train_df, fact_index.facts, shifts_df,
+                                train_output, output_options)
+    if train_merged is None:
+        click.echo(f'{train_output}: недели train не изменились, '
+                   'файл не перезаписан')
+    elif train_output:
+        # Кеш по неделям хранит calendar_dt, поэтому колонки удаляются
+        # после сборки
+        write_frame(prune(train_merged, dead), train_output, fmt)
+        merger.record_output(train_output, output_options)
+
+
+def lag_options(params) -> dict:
+    """
+    Extracts lag settings for merge_train/merge_test from parsed params.yaml.
+    """
+    merge_params = params.get('merge_data', {})
+    return {
+        'lags': tuple(merge_params.get('lags', (1,))),
+        'tolerance_weeks': merge_params.get('asof_tolerance_weeks', 0),
+        'lag_cols': merge_params.get('lag_cols'),
+    }
+
+
+def forecast_weeks(test_date) -> pd.DatetimeIndex:
+    """
+    Parses the forecast weeks specification.
+
+    Args:
+        test_date: one date, a list of dates or a range as a dict with
+            'start' and either 'end' or 'periods' (weekly steps)
+    Returns:
+        Sorted unique forecast weeks.
     """
-    train_df = pd.read_csv(train_filepath)
-    facts_df = pd.read_csv(facts_filepath)
-    shifts_df = pd.read_csv(shifts_filepath)
+    if isinstance(test_date, dict):
+        weeks = pd.date_range(start=test_date['start'],
+                              end=test_date.get('end'),
+                              periods=test_date.get('periods'), freq='7D')
+    else:
+        weeks = pd.DatetimeIndex(pd.to_datetime(pd.Series(test_date)))
+    return weeks.unique().sort_values()
 
-    for df in [train_df, facts_df, shifts_df]:
+
+def _parse_dates(*frames) -> None:
+    for df in frames:
         df['calendar_dt'] = pd.to_datetime(df['calendar_dt'])
 
-    # Создаем колонку с датой неделю назад
-    train_data = train_df.copy()
-    train_data['prev_week'] = train_data['calendar_dt'] - pd.Timedelta(days=7)
 
-    # Соединение с facts по предыдущей неделе
-    train_merged = train_data.merge(
-        facts_df,
-        left_on=['store_id', 'prev_week'],
-        right_on=['store_id', 'calendar_dt'],
-        how='left',
-        suffixes=('', '_facts')
-    )
+def _as_index(facts) -> FactIndex:
+    return facts if isinstance(facts, FactIndex) else FactIndex(facts)
+
+
+def merge_train(train_df, facts, shifts_df, lags=(1,), tolerance_weeks=0,
+                lag_cols=None, exclude=None) -> pd.DataFrame:
+    """
+    Attach previous weeks' facts and this week's shifts forecast to train rows.
+
+    Args:
+        train_df: target for the CURRENT week
+        facts: real data (DataFrame or a prebuilt FactIndex)
+        shifts_df: forecast for the CURRENT week
+        lags: which previous weeks to attach, 1 is the previous week
+        tolerance_weeks: take the nearest earlier week up to this many weeks
+            back when the exact one is missing
+        lag_cols: facts columns for lags > 1 (all by default)
+        exclude: output columns to leave out, lagged ones are not built at all
+    Returns:
+        Merged train DataFrame in the order of train_df rows.
+    """
+    _parse_dates(train_df, shifts_df)
+
+    # Факты за предыдущие недели одним as-of поиском по индексу
+    train_merged = attach_fact_lags(train_df, _as_index(facts), lags,
+                                    tolerance_weeks, lag_cols, exclude)
 
     # Соединение с shifts по текущей неделе
     train_merged = train_merged.merge(
@@ -53,46 +229,46 @@ def merge_data(facts_filepath,
         how='left',
         suffixes=('', '_shifts')
     )
+    return prune(train_merged, exclude or ())
 
-    train_merged = train_merged.drop(columns=['prev_week'])
 
-    if train_output:
-        train_merged.to_csv(train_output, index=False)
+def merge_test(test_df, facts, shifts_df, test_date=TEST_DATE,
+               lags=(1,), tolerance_weeks=0, lag_cols=None,
+               exclude=None) -> pd.DataFrame:
+    """
+    Build test rows for one or several forecast weeks in one pass.
 
-    # Делаем merge для тестовых данных
-    if test_filepath:
-        test_df = pd.read_csv(test_filepath)
-
-        test_date = pd.to_datetime('2025-11-24')
-        prev_week = test_date - pd.Timedelta(days=7)
-
-        test_data = test_df.copy()
-        test_data['calendar_dt'] = test_date
-        test_data['prev_week'] = prev_week
-
-        test_merged = test_data.merge(
-            facts_df[facts_df['calendar_dt'] == prev_week],
-            left_on=['store_id', 'prev_week'],
-            right_on=['store_id', 'calendar_dt'],
-            how='left',
-            suffixes=('', '_facts')
-        )
-
-        test_merged = test_merged.merge(
-            shifts_df[shifts_df['calendar_dt'] == test_date],
-            left_on=['store_id', 'calendar_dt'],
-            right_on=['store_id', 'calendar_dt'],
-            how='left',
-            suffixes=('', '_shifts')
-        )
-
-        test_merged = test_merged.drop(columns=['prev_week'])
-        if test_output:
-            test_merged.to_csv(test_output, index=False)
+    Args:
+        test_df: stores to forecast
+        facts: real data (DataFrame or a prebuilt FactIndex)
+        shifts_df: forecast, the test weeks are used
+        test_date: the weeks we need to forecast, see forecast_weeks
+        lags, tolerance_weeks, lag_cols, exclude: same as in merge_train
+    Returns:
+        Merged test DataFrame: test_df rows for the first week, then for
+        the second one and so on.
+    """
+    _parse_dates(shifts_df)
 
+    test_dates = forecast_weeks(test_date)
 
-if __name__ == "__main__":
-    merge_data()
+    # Все магазины × все недели прогноза одним блоком
+    rows = np.tile(np.arange(len(test_df)), len(test_dates))
+    test_data = test_df.take(rows).reset_index(drop=True)
+    test_data['calendar_dt'] = np.repeat(test_dates.to_numpy(), len(test_df))
 
+    test_merged = attach_fact_lags(test_data, _as_index(facts), lags,
+                                   tolerance_weeks, lag_cols, exclude)
 
+    test_merged = test_merged.merge(
+        shifts_df[shifts_df['calendar_dt'].isin(test_dates)],
+        left_on=['store_id', 'calendar_dt'],
+        right_on=['store_id', 'calendar_dt'],
+        how='left',
+        suffixes=('', '_shifts')
+    )
+    return prune(test_merged, exclude or ())
 
+
+if __name__ == "__main__":
+    merge_data()
@@ -1,5 +1,56 @@
+import copy
+import json
+from itertools import chain
+
+import numpy as np
 import pandas as pd
 
+from src.data.sketches import FrequencySketch, QuantileSketch
+
+
+def _as_column_type(value, column):
+    """
+    Приводит значение заполнения к типу float-колонки, чтобы не повышать
+    float32 до float64.
+    """
+    if pd.api.types.is_float_dtype(column.dtype):
+        return np.asarray(value).astype(column.dtype)[()]
+    return value
+
+
+def _holds_as_int(value):
+    """Можно ли записать значение в целую колонку без потерь."""
+    return pd.notna(value) and float(value).is_integer()
+
+
+# Версия формата, который пишет NanFiller.save()
+FORMAT_VERSION = 1
+
+
+def _to_json(value):
+    """
+    Приводит numpy-скаляры и массивы к типам json; NaN сохраняется как null.
+    """
+    if isinstance(value, np.ndarray):
+        return [_to_json(v) for v in value.tolist()]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    return value
+
+
+def _from_json(value):
+    return np.nan if value is None else value
+
+
+def _first_notna(values):
+    """
+    Первое непустое значение: результат последовательного заполнения
+    несколькими значениями.
+    """
+    return next((value for value in values if pd.notna(value)), values[0])
+
 
 class NanFiller:
     """
@@ -10,24 +61,57 @@ class NanFiller:
     - Для старых магазинов используются медианы из обучающей выборки
     - Флаги (бинарные признаки) заполняются модой или 0 для новых магазинов
     - Категориальные признаки заполняются константным значением
+    - Обучение возможно по кускам (partial_fit) и по шардам (merge)
+    - Медианы и моды можно обучать по группам (город, интервал времени жизни
+      магазина); для групп, не встреченных при fit, берется глобальное значение
 
     Attributes:
         medians (dict): Медианы числовых колонок, вычисленные при fit()
         modes (dict): Моды бинарных колонок (0 или 1)
         cat_fill (dict): Значения для заполнения категориальных колонок
         lifetime_col (str): Название колонки с временем жизни магазина
+        median_sketches (dict): Скетчи квантилей числовых колонок (partial_fit)
+        mode_sketches (dict): Скетчи частот бинарных колонок (partial_fit)
+        group_col (str): Колонка группы или None для глобальных значений
+        group_bins (list): Границы интервалов group_col [a, b), если группа
+            числовая
+        group_keys (list): Группы, встреченные при fit()
+        group_medians (dict): {колонка: медианы по group_keys}
+        group_modes (dict): {колонка: моды по group_keys}
+        group_median_sketches (dict): {группа: {колонка: QuantileSketch}}
+            (partial_fit)
+        group_mode_sketches (dict): {группа: {колонка: FrequencySketch}}
+            (partial_fit)
     """
-    def __init__(self, lifetime_col='store_lifetime_in_days'):
+    # Значения по умолчанию для filler, сохраненных до появления групп
+    group_col = None
+    group_bins = None
+    group_keys = ()
+
+    def __init__(self, lifetime_col='store_lifetime_in_days', group_col=None,
+                 group_bins=None):
         """
         Инициализация NanFiller.
 
         Args:
             lifetime_col: Колонка для определения новых магазинов (<7 дней)
+            group_col: Колонка, по которой медианы и моды считаются отдельно
+            group_bins: Границы интервалов для числовой group_col
         """
         self.medians = {}  # Сохранение медиан для числовых колонок
         self.modes = {}  # для флагов
         self.cat_fill = {}  # Для категорий
         self.lifetime_col = lifetime_col
+        self.median_sketches = {}  # Состояние потокового обучения
+        self.mode_sketches = {}
+        self.group_col = group_col
+        self.group_bins = (list(group_bins) if group_bins is not None
+                           else None)
+        self.group_keys = []
+        self.group_medians = {}
+        self.group_modes = {}
+        self.group_median_sketches = {}
+        self.group_mode_sketches = {}
 
     def fit(self, df, nan_cols=None, flag_cols=None, cat_cols=None):
         """
@@ -42,68 +126,404 @@ class NanFiller:
         Returns:
             self: Обученный объект NanFiller
         """
-
-        if nan_cols is None: nan_cols = []
-        if flag_cols is None: flag_cols = []
-        if cat_cols is None: cat_cols = []
+        nan_cols = [col for col in nan_cols or [] if col in df.columns]
+        flag_cols = [col for col in flag_cols or [] if col in df.columns]
+        cat_cols = [col for col in cat_cols or [] if col in df.columns]
 
         # Числовые (не флаги)
         for col in nan_cols:
-            if col in df.columns:
-                self.medians[col] = df[col].median()
+            self.medians[col] = df[col].median()
 
         # Флаги (бинарные)
         for col in flag_cols:
-            if col in df.columns:
-                # Мода для флагов (0 или 1)
-                mode_val = df[col].mode()
-                self.modes[col] = mode_val[0] if not mode_val.empty else 0
+            # Мода для флагов (0 или 1)
+            mode_val = df[col].mode()
+            self.modes[col] = mode_val[0] if not mode_val.empty else 0
 
         # Категориальные
         for col in cat_cols:
+            self.cat_fill[col] = 'пусто'
+
+        if self.group_col is not None:
+            self._fit_groups(df, nan_cols, flag_cols)
+
+        return self
+
+    def _group_key(self, df) -> pd.Series:
+        """
+        Группа каждой строки: значение group_col или номер интервала
+        group_bins.
+        """
+        values = df[self.group_col]
+        if self.group_bins is not None:
+            bins = pd.cut(values, self.group_bins, right=False, labels=False)
+            return pd.Series(bins, index=df.index)
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            return values.astype(object)
+        return values
+
+    def _fit_groups(self, df, nan_cols, flag_cols) -> None:
+        """
+        Медианы и моды по группам: один groupby на все числовые колонки и
+        один на все флаги.
+        """
+        keys = self._group_key(df)
+        nan_cols, flag_cols = self._group_cols(df, nan_cols, flag_cols)
+
+        medians = df[nan_cols].groupby(keys, dropna=True).median()
+
+        # Мода по группам: частоты пар (группа, колонка, значение) в длинном
+        # формате, при равенстве частот берется меньшее значение, как в pandas
+        long = (df[flag_cols].assign(_group=keys.to_numpy())
+                .melt(id_vars='_group', var_name='_col', value_name='_value')
+                .dropna())
+        sizes = (long.groupby(['_group', '_col', '_value']).size()
+                 .reset_index(name='_n'))
+        best = (sizes.sort_values(['_group', '_col', '_n', '_value'],
+                                  ascending=[True, True, False, True])
+                .drop_duplicates(['_group', '_col']))
+        modes = best.pivot(index='_group', columns='_col', values='_value')
+
+        groups = medians.index.union(modes.index)
+        self.group_keys = groups.tolist()
+        self.group_medians = {
+            col: medians[col].reindex(groups).to_numpy(dtype=np.float64)
+            for col in nan_cols}
+        self.group_modes = {
+            col: (modes[col].reindex(groups).to_numpy(dtype=np.float64)
+                  if col in modes.columns else np.full(len(groups), np.nan))
+            for col in flag_cols}
+
+    @staticmethod
+    def _group_cols(df, nan_cols, flag_cols) -> tuple:
+        """Числовые колонки и флаги df, для которых считаются группы."""
+        nan_cols = [col for col in nan_cols
+                    if col in df.columns
+                    and pd.api.types.is_numeric_dtype(df[col].dtype)]
+        flag_cols = [col for col in flag_cols if col in df.columns]
+        return nan_cols, flag_cols
+
+    def _group_codes(self, df) -> np.ndarray:
+        """
+        Номер группы каждой строки в group_keys; неизвестные группы —
+        последняя, глобальная строка.
+        """
+        codes = pd.Index(self.group_keys).get_indexer(self._group_key(df))
+        codes[codes < 0] = len(self.group_keys)
+        return codes
+
+    def _fill_table(self, col, values, dtype) -> np.ndarray:
+        """
+        Таблица значений для старых магазинов: строка на группу и
+        последняя — глобальная.
+
+        Пустые значения групп заменяются глобальным значением.
+        """
+        global_value = _first_notna(values)
+        group_values = None
+        if self.group_keys:
+            group_values = self.group_medians.get(
+                col, self.group_modes.get(col))
+        if group_values is None:
+            group_values = np.full(len(self.group_keys), np.nan)
+        table = np.append(group_values, global_value)
+        table[np.isnan(table)] = global_value
+        return table.astype(dtype)
+
+    def partial_fit(self, df, nan_cols=None, flag_cols=None, cat_cols=None):
+        """
+        Дообучает filler на очередном куске данных.
+
+        Медианы и моды оцениваются по скетчам (см. src.data.sketches),
+        накопленным по всем кускам, и пересчитываются после каждого вызова,
+        так что filler сразу готов к transform(). Пока в колонке немного
+        различных значений, результат совпадает с fit() на всех данных,
+        иначе медиана имеет относительную ошибку не больше 0.1%. С group_col
+        скетчи ведутся отдельно для каждой группы (ключи — как в _group_key).
+
+        Args:
+            df: очередной кусок обучающих данных
+            nan_cols, flag_cols, cat_cols: как в fit()
+
+        Returns:
+            self: Обновленный объект NanFiller
+        """
+        for col in nan_cols or []:
+            if col in df.columns:
+                sketch = self.median_sketches.setdefault(col, QuantileSketch())
+                sketch.update(df[col])
+
+        for col in flag_cols or []:
+            if col in df.columns:
+                sketch = self.mode_sketches.setdefault(col, FrequencySketch())
+                sketch.update(df[col])
+
+        for col in cat_cols or []:
             if col in df.columns:
                 self.cat_fill[col] = 'пусто'
 
+        if self.group_col is not None:
+            self._partial_fit_groups(df, nan_cols or [], flag_cols or [])
+
+        return self._update_from_sketches()
+
+    def _partial_fit_groups(self, df, nan_cols, flag_cols) -> None:
+        """
+        Обновляет скетчи каждой группы куска: те же колонки, что и в
+        _fit_groups.
+        """
+        nan_cols, flag_cols = self._group_cols(df, nan_cols, flag_cols)
+        for key, group in df.groupby(self._group_key(df), dropna=True):
+            key = key.item() if isinstance(key, np.generic) else key
+            medians = self.group_median_sketches.setdefault(key, {})
+            for col in nan_cols:
+                medians.setdefault(col, QuantileSketch()).update(group[col])
+            modes = self.group_mode_sketches.setdefault(key, {})
+            for col in flag_cols:
+                modes.setdefault(col, FrequencySketch()).update(group[col])
+
+    def merge(self, other):
+        """
+        Объединяет состояние другого filler, обученного через partial_fit
+        на другом шарде данных.
+
+        Args:
+            other: NanFiller с тем же lifetime_col
+
+        Returns:
+            self: Объединенный объект NanFiller
+        """
+        pairs = [(self.median_sketches, other.median_sketches),
+                 (self.mode_sketches, other.mode_sketches)]
+        # Скетчи групп сливаются по ключу группы
+        group_pairs = (
+            (self.group_median_sketches, other.group_median_sketches),
+            (self.group_mode_sketches, other.group_mode_sketches))
+        for groups, other_groups in group_pairs:
+            pairs += [(groups.setdefault(key, {}), sketches)
+                      for key, sketches in other_groups.items()]
+        for sketches, other_sketches in pairs:
+            for col, sketch in other_sketches.items():
+                if col in sketches:
+                    sketches[col].merge(sketch)
+                else:
+                    sketches[col] = copy.deepcopy(sketch)
+        self.cat_fill.update(other.cat_fill)
+        return self._update_from_sketches()
+
+    def _update_from_sketches(self):
+        for col, sketch in self.median_sketches.items():
+            self.medians[col] = sketch.median()
+        for col, sketch in self.mode_sketches.items():
+            self.modes[col] = sketch.mode(default=0)
+        if self.group_median_sketches or self.group_mode_sketches:
+            self._update_groups_from_sketches()
         return self
 
-    def transform(self, df) -> pd.DataFrame:
+    def _update_groups_from_sketches(self) -> None:
+        """
+        Таблицы групп в том же виде, что строит _fit_groups; у группы без
+        значений — NaN.
+        """
+        self.group_keys = sorted(set(self.group_median_sketches)
+                                 | set(self.group_mode_sketches))
+        self.group_medians = self._group_table(
+            self.group_median_sketches, lambda sketch: sketch.median())
+        self.group_modes = self._group_table(
+            self.group_mode_sketches,
+            lambda sketch: sketch.mode(default=np.nan))
+
+    def _group_table(self, groups, estimate) -> dict:
+        cols = sorted({col for sketches in groups.values()
+                       for col in sketches})
+        return {col: np.array([estimate(groups[key][col])
+                               if col in groups.get(key, {}) else np.nan
+                               for key in self.group_keys], dtype=np.float64)
+                for col in cols}
+
+    def transform(self, df, inplace=False) -> pd.DataFrame:
         """
         Заполняет пропуски в данных согласно обученной логике.
 
+        Числовые колонки и флаги одного float-типа заполняются одним блоком:
+        маска пропусков считается один раз, значения подставляются векторно
+        по маске новых магазинов и вектору медиан/мод. Колонки без пропусков
+        не перезаписываются.
+
         Args:
             df: DataFrame для заполнения пропусков
+            inplace: заполнить df на месте, не копируя его
 
         Returns:
-            DataFrame с заполненными пропусками
+            DataFrame с заполненными пропусками (сам df при inplace=True)
 
         Принцип:
             - Новые магазины (<7 дней): числовые → 0, флаги → 0
             - Старые магазины: числовые → медиана, флаги → мода
             - Категориальные → 'пусто' для всех
         """
-        df_transformed = df.copy()
+        df_transformed = df if inplace else df.copy()
         is_new = df_transformed[self.lifetime_col].fillna(0) < 7
 
-        # Числовые колонки
-        for col, median in self.medians.items():
-            if col in df_transformed.columns:
-                df_transformed.loc[is_new & df_transformed[col].isna(), col] = 0
-                df_transformed.loc[~is_new & df_transformed[col].isna(), col] = median
+        fills = self._fill_values(df_transformed)
+        float_blocks = {}
+        for col, values in fills.items():
+            dtype = df_transformed[col].dtype
+            if isinstance(dtype, np.dtype) and dtype.kind == 'f':
+                float_blocks.setdefault(dtype, []).append(col)
+            elif isinstance(dtype, np.dtype) and dtype.kind in 'iu':
+                self._fill_int_column(df_transformed, col, values)
+            else:
+                self._fill_column(df_transformed, col, values, is_new)
 
-        # Флаги
-        for col, mode_val in self.modes.items():
-            if col in df_transformed.columns:
-                # Новые магазины: флаг = 0 (не было высокой нагрузки)
-                df_transformed.loc[is_new & df_transformed[col].isna(), col] = 0
-                # Старые магазины: флаг = мода (чаще всего было 0 или 1)
-                df_transformed.loc[~is_new & df_transformed[col].isna(), col] = mode_val
+        is_new_values = is_new.to_numpy()
+        codes = (self._group_codes(df_transformed) if self.group_keys
+                 else None)
+        for dtype, cols in float_blocks.items():
+            self._fill_float_block(df_transformed, cols, dtype, fills,
+                                   is_new_values, codes)
 
-        # Категориальные
+        self._fill_categories(df_transformed)
+        return df_transformed
+
+    def _fill_values(self, df) -> dict:
+        """
+        Значения для старых магазинов: {колонка: [значения]}.
+
+        Если колонка есть и в медианах, и в модах, пропуски заполняет
+        медиана, а мода — только если медиана пустая.
+        """
+        fills = {}
+        for col, value in chain(self.medians.items(), self.modes.items()):
+            if col in df.columns:
+                fills.setdefault(col, []).append(value)
+        return fills
+
+    @staticmethod
+    def _fill_int_column(df, col, values) -> None:
+        """
+        В целых колонках пропусков нет, но дробное значение заполнения
+        раньше все равно повышало непустую колонку до float64.
+        """
+        if len(df) and not all(_holds_as_int(value) for value in values):
+            df[col] = df[col].astype(np.float64)
+
+    def _fill_float_block(self, df, cols, dtype, fills, is_new, codes):
+        """
+        Заполняет float-колонки cols одного типа одним блоком.
+
+        Блок (колонка x строка) заполняется одним np.where по матрице
+        значений заполнения; значения по группам собираются из таблицы
+        (колонка x группа) по номерам групп строк codes.
+        """
+        block = np.stack([df[col].to_numpy(dtype=dtype) for col in cols])
+        na = np.isnan(block)
+        with_na = na.any(axis=1)
+        if not with_na.any():
+            return
+
+        old_fill = self._old_fill(cols, dtype, fills, codes)
+        fill = np.where(is_new, dtype.type(0), old_fill)
+        block = np.where(na, fill, block)
+        for col, values, has_na in zip(cols, block, with_na):
+            if has_na:
+                df[col] = values
+
+    def _old_fill(self, cols, dtype, fills, codes) -> np.ndarray:
+        """
+        Значения заполнения старых магазинов: таблица (колонка x группа)
+        по номерам групп строк codes или столбец глобальных значений.
+        """
+        table = np.stack([self._fill_table(col, fills[col], dtype)
+                          for col in cols])
+        return table[:, codes] if codes is not None else table
+
+    def _fill_categories(self, df) -> None:
+        """Заполняет категориальные колонки значением из cat_fill."""
         for col, fill_val in self.cat_fill.items():
-            if col in df_transformed.columns:
-                df_transformed[col] = df_transformed[col].fillna(fill_val).astype('category')
+            if col in df.columns:
+                values = df[col]
+                # Колонка уже может быть категориальной (схема из params.yaml)
+                if (isinstance(values.dtype, pd.CategoricalDtype)
+                        and fill_val not in values.cat.categories):
+                    values = values.cat.add_categories([fill_val])
+                df[col] = values.fillna(fill_val).astype('category')
 
-        return df_transformed
+    @staticmethod
+    def _fill_column(df, col, values, is_new):
+        """
+        Поколоночное заполнение для нечисловых типов (object, bool, nullable).
+        """
+        for value in values:
+            na = df[col].isna()
+            df.loc[is_new & na, col] = 0
+            df.loc[~is_new & na, col] = _as_column_type(value, df[col])
+
+    def save(self, path) -> None:
+        """
+        Сохраняет обученный filler в json без pickle.
+
+        Сохраняются только значения заполнения (медианы, моды, категории
+        и таблицы групп); состояние partial_fit не сохраняется.
+
+        Args:
+            path: путь к .json файлу
+        """
+        state = {
+            'format': 'nan_filler',
+            'version': FORMAT_VERSION,
+            'lifetime_col': self.lifetime_col,
+            'medians': {col: _to_json(v) for col, v in self.medians.items()},
+            'modes': {col: _to_json(v) for col, v in self.modes.items()},
+            'cat_fill': dict(self.cat_fill),
+            'group_col': self.group_col,
+            'group_bins': self.group_bins,
+            'group_keys': _to_json(np.asarray(self.group_keys,
+                                              dtype=object)),
+            'group_medians': {
+                col: _to_json(v)
+                for col, v in getattr(self, 'group_medians', {}).items()},
+            'group_modes': {
+                col: _to_json(v)
+                for col, v in getattr(self, 'group_modes', {}).items()},
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path) -> 'NanFiller':
+        """
+        Загружает filler, сохраненный save().
+
+        Args:
+            path: путь к .json файлу
+
+        Returns:
+            NanFiller, готовый к transform()
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        if (state.get('format') != 'nan_filler'
+                or state.get('version') != FORMAT_VERSION):
+            raise ValueError(f"{path}: неподдерживаемый формат filler "
+                             f"({state.get('format')}, "
+                             f"версия {state.get('version')})")
+
+        filler = cls(state['lifetime_col'], state['group_col'],
+                     state['group_bins'])
+        filler.medians = {col: _from_json(v)
+                          for col, v in state['medians'].items()}
+        filler.modes = {col: _from_json(v)
+                        for col, v in state['modes'].items()}
+        filler.cat_fill = state['cat_fill']
+        filler.group_keys = [_from_json(v) for v in state['group_keys']]
+        filler.group_medians = {
+            col: np.array([_from_json(v) for v in values], dtype=np.float64)
+            for col, values in state['group_medians'].items()}
+        filler.group_modes = {
+            col: np.array([_from_json(v) for v in values], dtype=np.float64)
+            for col, values in state['group_modes'].items()}
+        return filler
 
     def fit_transform(self, df, nan_cols, flag_cols, cat_cols):
         """
@@ -1,10 +1,18 @@
-import pandas as pd
 import click
+import pandas as pd
 import joblib
 import yaml
-from nan_filler import NanFiller
 from pathlib import Path
 
+from src.data.artifact_index import index_option
+from src.data.nan_filler import NanFiller
+from src.data.projection import (FORECAST_COLS, dead_columns, prune,
+                                 read_exclude)
+from src.data.schema import load_schema
+from src.data.storage import (FORMATS, FrameWriter, iter_frames, read_frame,
+                              write_frame)
+from src.stage_metrics import metrics_option
+
 
 @click.command()
 @click.argument('train_filepath', type=click.Path(exists=True))
@@ -14,58 +22,151 @@ from pathlib import Path
 @click.argument('filler_filepath', type=click.Path())
 @click.argument('filler_output_path', type=click.Path())
 @click.argument('params_file', type=click.Path())
+@click.option('--format', 'fmt', type=click.Choice(FORMATS), default=None,
+              help='Output format. '
+                   'By default it is taken from the file extension.')
+@click.option('--chunksize', type=int, default=None,
+              help='Fit and fill the data in chunks of this many rows '
+                   '(out-of-core).')
+@metrics_option('fill-nan')
+@index_option('fill-nan',
+              inputs=('train_filepath', 'test_filepath', 'filler_filepath',
+                      'params_file'),
+              outputs=('train_output_path', 'test_output_path',
+                       'filler_output_path'))
 def fill_nan(train_filepath,
              test_filepath,
              train_output_path,
              test_output_path,
              filler_filepath=None,
              filler_output_path=None,
-             params_file='params.yaml') -> None:
+             params_file='params.yaml',
+             fmt=None,
+             chunksize=None) -> None:
     """Replaces empty values in the data by NanFiller
        Args:
            train_filepath: path to train data
            test_filepath: path to test data
            train_output_path: path where train data will be saved
            test_output_path: path where test data will be saved
-           filler_filepath: path to empty values filler
+           filler_filepath: path to empty values filler (.json, legacy
+               .joblib is also accepted)
            filler_output_path: path where filler will be saved if filler_filepath is empty or doesn't exist
            params_file: path to yaml file with parameters for this function (numeric, flag and cat columns)
-        The final train and test data will be saved in csv files.
+           fmt: output format (csv, parquet or feather)
+           chunksize: read, fit and write the data in chunks of this many rows;
+               the filler is then fitted with NanFiller.partial_fit
+        The final train and test data will be saved in csv or columnar files.
     """
-    filler = None
     with open(params_file, 'r', encoding='utf-8') as f:
         params = yaml.safe_load(f)
 
-    numeric_cols = params['nan_filling']['numeric_cols']
-    flag_cols = params['nan_filling']['flag_cols']
-    cat_cols = params['nan_filling']['cat_cols']
-
     # Дальше ваш код без изменений
-    train_df = pd.read_csv(train_filepath)
+    schema = load_schema(params)
+    # Колонки, которые удалит drop-features и не прочитают следующие этапы
+    dead = dead_columns(params, 'fill_nan')
+    skip = read_exclude(params, 'fill_nan')
+    if chunksize:
+        train_chunks = iter_frames(train_filepath, chunksize, schema=schema,
+                                   exclude=skip)
+        filler = load_or_fit_filler(train_chunks, params, filler_filepath,
+                                    filler_output_path)
 
-    if filler_filepath and Path(filler_filepath).exists():
-        filler = joblib.load(filler_filepath)
-        filled_df = filler.transform(train_df)
-    else:
-        filler = NanFiller()
-        filler.fit(train_df, numeric_cols, flag_cols, cat_cols)
-        filled_df = filler.transform(train_df)
-        joblib.dump(filler, filler_output_path)
+        if train_output_path:
+            with FrameWriter(train_output_path, fmt) as writer:
+                for chunk in iter_frames(train_filepath, chunksize,
+                                         schema=schema, exclude=skip):
+                    chunk = fill_train(filler, chunk, inplace=True)
+                    writer.write(prune(chunk, dead))
 
-    # В датасете есть один объект, где 3 колонки с предсказаниями пусты. Этот один объект можем убрать
-    cols_to_check = ['predicted_staff_value', 'predicted_num_orders', 'predicted_load_factor']
-    filled_df = filled_df.dropna(subset=cols_to_check)
+        if test_filepath and test_output_path:
+            with FrameWriter(test_output_path, fmt) as writer:
+                for chunk in iter_frames(test_filepath, chunksize,
+                                         schema=schema, exclude=skip):
+                    chunk = filler.transform(chunk, inplace=True)
+                    writer.write(prune(chunk, dead))
+        return
+
+    train_df = read_frame(train_filepath, schema=schema, exclude=skip)
+
+    filler = load_or_fit_filler(train_df, params, filler_filepath,
+                                filler_output_path)
+    filled_df = prune(fill_train(filler, train_df, inplace=True), dead)
 
     if train_output_path:
-        filled_df.to_csv(train_output_path, index=False)
+        write_frame(filled_df, train_output_path, fmt)
 
     # Заполняем пропуски в test данных
     if test_filepath:
-        test_df = pd.read_csv(test_filepath)
-        test_filled = filler.transform(test_df)
+        test_df = read_frame(test_filepath, schema=schema, exclude=skip)
+        test_filled = prune(filler.transform(test_df, inplace=True), dead)
 
         if test_output_path:
-            test_filled.to_csv(test_output_path, index=False)
+            write_frame(test_filled, test_output_path, fmt)
+
+
+def load_or_fit_filler(train_df, params, filler_filepath=None,
+                       filler_output_path=None) -> NanFiller:
+    """Loads a saved NanFiller or fits a new one on train data and saves it.
+       Args:
+           train_df: train data to fit the filler on, or an iterable of its
+               chunks
+           params: parsed params.yaml with the nan_filling section
+           filler_filepath: path to an already fitted filler
+           filler_output_path: path where a newly fitted filler will be saved
+    """
+    if filler_filepath and Path(filler_filepath).exists():
+        return load_filler(filler_filepath)
+
+    numeric_cols = params['nan_filling']['numeric_cols']
+    flag_cols = params['nan_filling']['flag_cols']
+    cat_cols = params['nan_filling']['cat_cols']
+
+    filler = NanFiller(group_col=params['nan_filling'].get('group_col'),
+                       group_bins=params['nan_filling'].get('group_bins'))
+    if isinstance(train_df, pd.DataFrame):
+        filler.fit(train_df, numeric_cols, flag_cols, cat_cols)
+    else:
+        for chunk in train_df:
+            filler.partial_fit(chunk, numeric_cols, flag_cols, cat_cols)
+    if filler_output_path:
+        save_filler(filler, filler_output_path)
+    return filler
+
+
+def load_filler(path) -> NanFiller:
+    """
+    Loads a NanFiller from .json (NanFiller.save) or from a legacy joblib
+    pickle.
+    """
+    if Path(path).suffix.lower() == '.json':
+        return NanFiller.load(path)
+    return joblib.load(path)
+
+
+def save_filler(filler, path) -> None:
+    """
+    Saves a NanFiller as .json, other extensions are written with joblib for
+    compatibility.
+    """
+    if Path(path).suffix.lower() == '.json':
+        filler.save(path)
+    else:
+        joblib.dump(filler, path)
+
+
+def fill_train(filler, train_df, inplace=False) -> pd.DataFrame:
+    """Fills empty values in train data and drops rows without a forecast.
+       Args:
+           filler: fitted NanFiller
+           train_df: train data
+           inplace: fill train_df itself instead of a copy
+    """
+    filled_df = filler.transform(train_df, inplace=inplace)
+
+    # В датасете есть один объект, где 3 колонки с предсказаниями пусты.
+    # Этот один объект можем убрать
+    return filled_df.dropna(subset=list(FORECAST_COLS))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,254 @@
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from src.data.fact_index import FactIndex
+from src.data.merge_data import (TEST_DATE, forecast_weeks, merge_test,
+                                 merge_train)
+from src.data.projection import prune
+from src.data.storage import FrameWriter, iter_frames, read_frame, write_frame
+
+ROW_COL = '_row'
+
+
+def bucket_of(store_ids, n_buckets) -> np.ndarray:
+    """
+    Номер бакета для каждого магазина: стабильный хеш store_id по модулю
+    n_buckets.
+    """
+    values = pd.Series(store_ids).astype(str).to_numpy()
+    return (pd.util.hash_array(values) % np.uint64(n_buckets)).astype(np.int64)
+
+
+def partition_file(path, out_dir, name, n_buckets, chunksize, with_row=False,
+                   schema=None, exclude=None) -> tuple:
+    """
+    Раскладывает файл по бакетам, читая его кусками.
+
+    Каждый кусок каждого бакета сохраняется отдельным parquet-файлом
+    out_dir/<bucket>/<name>_<chunk>.parquet.
+
+    Args:
+        path: входной файл
+        out_dir: каталог бакетов
+        name: имя входа (facts, shifts, train, test)
+        n_buckets: число бакетов
+        chunksize: размер куска в строках
+        with_row: добавить колонку с номером строки во входном файле,
+            чтобы потом восстановить исходный порядок
+        schema: типы колонок, применяемые к каждому куску
+        exclude: колонки, которые не нужно читать
+
+    Returns:
+        Пустой DataFrame со схемой первого куска — шаблон для бакетов,
+        в которые не попало ни одной строки, и число строк во входе
+    """
+    template = None
+    offset = 0
+    chunks = iter_frames(path, chunksize, schema=schema, exclude=exclude)
+    for chunk_no, chunk in enumerate(chunks):
+        if with_row:
+            chunk.insert(0, ROW_COL, np.arange(offset, offset + len(chunk)))
+        offset += len(chunk)
+        if template is None:
+            template = chunk.iloc[:0]
+
+        buckets = bucket_of(chunk['store_id'], n_buckets)
+        for bucket in np.unique(buckets):
+            part = chunk[buckets == bucket]
+            bucket_dir = Path(out_dir) / str(bucket)
+            bucket_dir.mkdir(parents=True, exist_ok=True)
+            part.to_parquet(bucket_dir / f'{name}_{chunk_no}.parquet',
+                            index=False)
+
+    if template is None:
+        template = read_frame(path, schema=schema, exclude=exclude).iloc[:0]
+    return template, offset
+
+
+def _read_bucket(out_dir, bucket, name, template) -> pd.DataFrame:
+    parts = sorted((Path(out_dir) / str(bucket)).glob(f'{name}_*.parquet'),
+                   key=lambda p: int(p.stem.rsplit('_', 1)[1]))
+    if not parts:
+        return template.copy()
+    return pd.concat([pd.read_parquet(p) for p in parts], ignore_index=True)
+
+
+def _common_dtype(dtypes):
+    dtypes = list(dict.fromkeys(dtypes))
+    if len(dtypes) == 1:
+        return dtypes[0]
+    try:
+        return np.result_type(*dtypes)
+    except TypeError:
+        return np.dtype(object)
+
+
+def _ordered_chunks(paths, chunksize):
+    """
+    Сливает файлы, каждый отсортирован по ROW_COL, в один поток по ROW_COL.
+
+    В памяти одновременно не больше одного куска на файл.
+    """
+    readers = {i: iter_frames(p, chunksize) for i, p in enumerate(paths)}
+    buffers = {}
+    for i, reader in readers.items():
+        chunk = next(reader, None)
+        if chunk is not None and len(chunk):
+            buffers[i] = chunk
+
+    while buffers:
+        # Все строки не дальше минимального «последнего номера» уже прочитаны
+        frontier = min(buf[ROW_COL].iloc[-1] for buf in buffers.values())
+        ready = []
+        for i in list(buffers):
+            buf = buffers[i]
+            mask = buf[ROW_COL].to_numpy() <= frontier
+            ready.append(buf[mask])
+            rest = buf[~mask]
+            if len(rest):
+                buffers[i] = rest
+                continue
+            chunk = next(readers[i], None)
+            if chunk is not None and len(chunk):
+                buffers[i] = chunk
+            else:
+                del buffers[i]
+        yield pd.concat(ready).sort_values(ROW_COL, kind='stable')
+
+
+def _merge_buckets(tmp_dir, n_buckets, templates, merge_bucket, name):
+    """
+    Сливает бакеты по одному и сохраняет результат каждого,
+    отсортированный по ROW_COL.
+    """
+    paths, dtypes, schemas = [], {}, []
+    for bucket in range(n_buckets):
+        frames = {key: _read_bucket(tmp_dir, bucket, key, templates[key])
+                  for key in templates}
+        merged = merge_bucket(frames).sort_values(ROW_COL, kind='stable')
+        if not len(merged):
+            continue
+
+        path = Path(tmp_dir) / f'{name}_merged_{bucket}.parquet'
+        merged.to_parquet(path, index=False)
+        paths.append(path)
+        schemas.append(pa.Schema.from_pandas(merged, preserve_index=False))
+        for col, dtype in merged.dtypes.items():
+            dtypes.setdefault(col, []).append(dtype)
+        columns = list(merged.columns)
+
+    if not paths:
+        return [], None, None, None
+    dtypes = {col: _common_dtype(dtypes[col]) for col in columns}
+    # Общая arrow-схема: колонка, пустая в одном бакете, не ломает запись
+    # остальных
+    schema = pa.unify_schemas(schemas,
+                              promote_options='permissive').remove_metadata()
+    schema = schema.remove(schema.get_field_index(ROW_COL))
+    return paths, dtypes, columns, schema
+
+
+def _write_ordered(paths, dtypes, columns, schema, output, fmt, chunksize,
+                   empty) -> None:
+    if not paths:
+        write_frame(empty.drop(columns=[ROW_COL], errors='ignore'), output,
+                    fmt)
+        return
+
+    with FrameWriter(output, fmt, schema) as writer:
+        for chunk in _ordered_chunks(paths, chunksize):
+            chunk = chunk[columns].astype(dtypes).drop(columns=[ROW_COL])
+            writer.write(chunk.reset_index(drop=True))
+
+
+def merge_data_partitioned(facts_filepath,
+                           shifts_filepath,
+                           train_filepath,
+                           test_filepath=None,
+                           train_output=None,
+                           test_output=None,
+                           n_buckets=16,
+                           chunksize=100_000,
+                           tmp_dir=None,
+                           fmt=None,
+                           test_date=TEST_DATE,
+                           schema=None,
+                           lags=(1,),
+                           tolerance_weeks=0,
+                           lag_cols=None,
+                           exclude=None,
+                           read_exclude=None) -> None:
+    """
+    Out-of-core version of merge_data with bounded memory.
+
+    All inputs are read in chunks and hash-partitioned by store_id into
+    on-disk buckets. Every bucket is merged separately with merge_train /
+    merge_test (all facts of a store land in one bucket, so lags stay
+    exact), then bucket results are streamed into the outputs in the
+    original row order. Outputs match the in-memory merge_data.
+
+    Args:
+        facts_filepath, shifts_filepath, train_filepath, test_filepath,
+        train_output, test_output, fmt, test_date: same as in merge_data
+        n_buckets: number of store_id partitions
+        chunksize: rows per chunk when reading inputs and writing outputs
+        tmp_dir: where to place the buckets (system temp dir by default)
+        schema: {column: dtype} mapping applied to every input chunk
+        lags, tolerance_weeks, lag_cols, exclude: same as in merge_train
+        read_exclude: input columns not to read at all
+    """
+    lag_params = {'lags': lags, 'tolerance_weeks': tolerance_weeks,
+                  'lag_cols': lag_cols}
+
+    with tempfile.TemporaryDirectory(dir=tmp_dir) as work_dir:
+        templates, n_rows = {}, {}
+        inputs = [('facts', facts_filepath, False),
+                  ('shifts', shifts_filepath, False),
+                  ('train', train_filepath, True)]
+        if test_filepath:
+            inputs.append(('test', test_filepath, True))
+        for name, path, with_row in inputs:
+            templates[name], n_rows[name] = partition_file(
+                path, work_dir, name, n_buckets, chunksize, with_row, schema,
+                read_exclude)
+
+        def merge_train_bucket(frames):
+            return merge_train(frames['train'], FactIndex(frames['facts']),
+                               frames['shifts'], exclude=exclude,
+                               **lag_params)
+
+        test_weeks = forecast_weeks(test_date)
+        # calendar_dt нужна для порядка строк теста и удаляется после него
+        test_exclude = set(exclude or ()) - {'calendar_dt'}
+
+        def merge_test_bucket(frames):
+            merged = merge_test(frames['test'], FactIndex(frames['facts']),
+                                frames['shifts'], test_weeks,
+                                exclude=test_exclude, **lag_params)
+            # Порядок как в merge_test: сначала все магазины первой недели,
+            # потом второй
+            week_no = test_weeks.get_indexer(merged['calendar_dt'])
+            merged[ROW_COL] = week_no * n_rows['test'] + merged[ROW_COL]
+            return prune(merged, exclude or ())
+
+        if train_output:
+            train_templates = {k: templates[k]
+                               for k in ('facts', 'shifts', 'train')}
+            result = _merge_buckets(work_dir, n_buckets, train_templates,
+                                    merge_train_bucket, 'train')
+            empty = merge_train_bucket({k: t.copy()
+                                        for k, t in train_templates.items()})
+            _write_ordered(*result, train_output, fmt, chunksize, empty)
+
+        if test_filepath and test_output:
+            test_templates = {k: templates[k]
+                              for k in ('facts', 'shifts', 'test')}
+            result = _merge_buckets(work_dir, n_buckets, test_templates,
+                                    merge_test_bucket, 'test')
+            empty = merge_test_bucket({k: t.copy()
+                                       for k, t in test_templates.items()})
+            _write_ordered(*result, test_output, fmt, chunksize, empty)
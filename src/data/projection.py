@@ -0,0 +1,80 @@
+import pandas as pd
+
+from src.data.nan_filler import NanFiller
+from src.features.registry import FeaturePlan, requested_features
+from src.features.rolling import RollingFeatures
+
+# Этапы пайплайна в порядке выполнения
+STAGES = ('merge_data', 'fill_nan', 'build_features', 'drop_features')
+
+# Ключи, по которым merge-data соединяет входы
+KEY_COLS = ('store_id', 'calendar_dt')
+
+# fill-nan убирает из train строки, где пуст хотя бы один из этих прогнозов
+FORECAST_COLS = ('predicted_staff_value', 'predicted_num_orders',
+                 'predicted_load_factor')
+
+
+def stage_uses(params) -> dict:
+    """
+    Колонки, которые читает каждый этап, по params.yaml и реестру фич.
+
+    Returns:
+        {этап: множество колонок}
+    """
+    nan_params = (params or {}).get('nan_filling') or {}
+    fill_uses = {NanFiller().lifetime_col, *FORECAST_COLS}
+    if nan_params.get('group_col'):
+        fill_uses.add(nan_params['group_col'])
+
+    feature_uses = set(FeaturePlan(requested_features(params)).columns)
+    rolling = RollingFeatures.from_params(params)
+    if rolling is not None:
+        feature_uses |= {rolling.key_col, rolling.time_col, *rolling.cols}
+
+    # Колонка недели нужна drop-features для матрицы признаков
+    time_col = ((params or {}).get('drop_features') or {}).get('time_col')
+
+    return {
+        'merge_data': set(KEY_COLS),
+        'fill_nan': fill_uses,
+        'build_features': feature_uses,
+        'drop_features': {time_col} if time_col else set(),
+    }
+
+
+def dead_columns(params, after) -> set:
+    """
+    Колонки из drop_features.cols, не нужные ни одному этапу после after.
+
+    Их можно не читать и удалить сразу на выходе этапа after. Остальные
+    колонки не проверяются: модель обучается на всех колонках, которые
+    оставляет drop-features, поэтому мертвыми могут быть только
+    колонки из drop_features.cols.
+
+    Args:
+        params: разобранный params.yaml
+        after: название этапа из STAGES
+    """
+    section = (params or {}).get('drop_features') or {}
+    drop_cols = set(section.get('cols') or [])
+    uses = stage_uses(params)
+    later = STAGES[STAGES.index(after) + 1:]
+    return drop_cols.difference(*(uses[stage] for stage in later))
+
+
+def read_exclude(params, stage) -> set:
+    """
+    Колонки, которые этап stage может не читать со входа: мертвые уже
+    после предыдущего этапа и не нужные самому stage.
+    """
+    dead = dead_columns(params, stage)
+    return dead - stage_uses(params)[stage]
+
+
+def prune(df, dead) -> pd.DataFrame:
+    """Удаляет из df на месте колонки из dead, которые в нем есть."""
+    columns = [col for col in df.columns if col in dead]
+    if columns:
+        df.drop(columns=columns, inplace=True)
+    return df
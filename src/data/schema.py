@@ -0,0 +1,41 @@
+import pandas as pd
+
+
+def load_schema(params) -> dict:
+    """
+    Returns the declared column dtypes from the `schema` section of
+    params.yaml.
+
+    Args:
+        params: parsed params.yaml (may be empty)
+    """
+    return dict((params or {}).get('schema') or {})
+
+
+def memory_mb(df) -> float:
+    """
+    Resident size of df in megabytes, including object and category payloads.
+    """
+    return df.memory_usage(deep=True).sum() / 2 ** 20
+
+
+def schema_casts(df, schema) -> dict:
+    """Declared dtypes of the columns of df that do not have them yet."""
+    return {col: dtype for col, dtype in schema.items()
+            if col in df.columns and str(df[col].dtype) != str(dtype)}
+
+
+def apply_schema(df, schema) -> pd.DataFrame:
+    """
+    Casts the columns of df that are present in schema to the declared dtypes.
+
+    Columns that are not declared keep their dtypes.
+
+    Args:
+        df: DataFrame to cast
+        schema: {column: dtype} mapping, see load_schema
+    Returns:
+        DataFrame with the declared dtypes
+    """
+    casts = schema_casts(df, schema)
+    return df.astype(casts) if casts else df
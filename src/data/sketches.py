@@ -0,0 +1,241 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+# Значения по модулю меньше этого порога считаются нулем
+MIN_INDEXED_VALUE = 1e-9
+
+
+def _add_counts(counter, keys, counts) -> None:
+    for key, count in zip(keys, counts):
+        key = key.item() if isinstance(key, np.generic) else key
+        counter[key] = counter.get(key, 0) + int(count)
+
+
+def _group_counts(keys, counts) -> tuple:
+    """Суммирует counts по одинаковым keys."""
+    uniq, inverse = np.unique(keys, return_inverse=True)
+    return uniq, np.bincount(inverse, weights=counts).astype(np.int64)
+
+
+class QuantileSketch:
+    """
+    Сливаемый скетч квантилей числовой колонки.
+
+    Пока различных значений не больше max_exact, хранятся точные частоты
+    значений, и квантили совпадают с pandas. Дальше скетч переходит
+    к логарифмическим корзинам (как в DDSketch): значение x попадает
+    в корзину ceil(log_gamma |x|), gamma = (1 + a) / (1 - a), и любая
+    квантиль оценивается с относительной ошибкой не больше
+    relative_accuracy. Два скетча с одинаковой точностью сливаются без
+    потери гарантии, поэтому скетчи кусков или шардов можно объединять
+    в любом порядке.
+
+    Attributes:
+        relative_accuracy (float): гарантированная относительная ошибка a
+        max_exact (int): сколько различных значений хранить точно
+        count (int): число учтенных непустых значений
+        exact (dict): {значение: частота} в точном режиме, иначе None
+        positive (dict): {корзина: частота} для положительных значений
+        negative (dict): {корзина: частота} для модулей отрицательных значений
+        zeros (int): число значений, неотличимых от нуля
+    """
+    def __init__(self, relative_accuracy=0.001, max_exact=4096):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError(f"relative_accuracy должна быть в (0, 1), "
+                             f"получено {relative_accuracy}")
+        self.relative_accuracy = relative_accuracy
+        self.max_exact = max_exact
+        self.count = 0
+        self.exact = {}
+        self.positive = {}
+        self.negative = {}
+        self.zeros = 0
+
+    @property
+    def _gamma(self) -> float:
+        return (1 + self.relative_accuracy) / (1 - self.relative_accuracy)
+
+    def _bucket(self, values) -> np.ndarray:
+        return np.ceil(np.log(values) / math.log(self._gamma)).astype(np.int64)
+
+    def _bucket_value(self, keys) -> np.ndarray:
+        gamma = self._gamma
+        keys = np.asarray(keys, dtype=np.float64)
+        return 2 * np.power(gamma, keys) / (gamma + 1)
+
+    def _add_to_buckets(self, values, counts) -> None:
+        values = np.asarray(values, dtype=np.float64)
+        counts = np.asarray(counts, dtype=np.int64)
+        pos = values > MIN_INDEXED_VALUE
+        neg = values < -MIN_INDEXED_VALUE
+        self.zeros += int(counts[~(pos | neg)].sum())
+        if pos.any():
+            _add_counts(self.positive,
+                        *_group_counts(self._bucket(values[pos]), counts[pos]))
+        if neg.any():
+            _add_counts(self.negative,
+                        *_group_counts(self._bucket(-values[neg]),
+                                       counts[neg]))
+
+    def _collapse(self) -> None:
+        """Переводит скетч из точного режима в корзины."""
+        if self.exact is None:
+            return
+        exact, self.exact = self.exact, None
+        if exact:
+            self._add_to_buckets(list(exact.keys()), list(exact.values()))
+
+    def update(self, values) -> 'QuantileSketch':
+        """
+        Добавляет значения в скетч, пропуски игнорируются.
+
+        Args:
+            values: массив или Series чисел
+        """
+        values = pd.Series(values).to_numpy(dtype=np.float64, na_value=np.nan)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return self
+
+        self.count += len(values)
+        uniq, counts = np.unique(values, return_counts=True)
+        if self.exact is not None:
+            _add_counts(self.exact, uniq, counts)
+            if len(self.exact) > self.max_exact:
+                self._collapse()
+        else:
+            self._add_to_buckets(uniq, counts)
+        return self
+
+    def merge(self, other) -> 'QuantileSketch':
+        """
+        Сливает other в этот скетч.
+
+        Args:
+            other: QuantileSketch с той же relative_accuracy
+        """
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Нельзя слить скетчи с разной relative_accuracy: "
+                             f"{self.relative_accuracy} и "
+                             f"{other.relative_accuracy}")
+        self.count += other.count
+        if self.exact is not None and other.exact is not None:
+            _add_counts(self.exact, list(other.exact.keys()),
+                        list(other.exact.values()))
+            if len(self.exact) > self.max_exact:
+                self._collapse()
+            return self
+
+        self._collapse()
+        if other.exact is not None:
+            if other.exact:
+                self._add_to_buckets(list(other.exact.keys()),
+                                     list(other.exact.values()))
+        else:
+            _add_counts(self.positive, list(other.positive.keys()),
+                        list(other.positive.values()))
+            _add_counts(self.negative, list(other.negative.keys()),
+                        list(other.negative.values()))
+            self.zeros += other.zeros
+        return self
+
+    def _sorted_values(self) -> tuple:
+        """Значения (или оценки корзин) по возрастанию и их частоты."""
+        if self.exact is not None:
+            keys = sorted(self.exact)
+            return (np.array(keys, dtype=np.float64),
+                    np.array([self.exact[k] for k in keys]))
+
+        neg = sorted(self.negative, reverse=True)
+        pos = sorted(self.positive)
+        values = np.concatenate([-self._bucket_value(neg), [0.0],
+                                 self._bucket_value(pos)])
+        counts = np.array([self.negative[k] for k in neg] + [self.zeros]
+                          + [self.positive[k] for k in pos])
+        return values, counts
+
+    def quantile(self, q) -> float:
+        """
+        Квантиль уровня q с линейной интерполяцией, как в pandas.
+
+        Returns:
+            Оценку квантили или NaN, если в скетче нет значений
+        """
+        if not self.count:
+            return np.nan
+        values, counts = self._sorted_values()
+        cum = np.cumsum(counts)
+        rank = q * (self.count - 1)
+        lo, hi = math.floor(rank), math.ceil(rank)
+        v_lo, v_hi = values[np.searchsorted(cum, [lo, hi], side='right')]
+        return float(v_lo + (v_hi - v_lo) * (rank - lo))
+
+    def median(self) -> float:
+        return self.quantile(0.5)
+
+
+class FrequencySketch:
+    """
+    Сливаемый скетч частот (Misra-Gries) для моды колонки.
+
+    Хранится не больше capacity счетчиков. Частота любого значения
+    занижена не больше чем на count / (capacity + 1), поэтому значение,
+    встречающееся чаще, всегда остается в скетче. Пока различных значений
+    не больше capacity (бинарные флаги), частоты точные.
+
+    Attributes:
+        capacity (int): максимальное число счетчиков
+        count (int): число учтенных непустых значений
+        counters (dict): {значение: частота}
+    """
+    def __init__(self, capacity=64):
+        self.capacity = capacity
+        self.count = 0
+        self.counters = {}
+
+    def _trim(self) -> None:
+        if len(self.counters) <= self.capacity:
+            return
+        # Вычитаем (capacity + 1)-ю по величине частоту и убираем обнулившиеся
+        threshold = sorted(self.counters.values(), reverse=True)[self.capacity]
+        self.counters = {value: count - threshold
+                         for value, count in self.counters.items()
+                         if count > threshold}
+
+    def update(self, values) -> 'FrequencySketch':
+        """
+        Добавляет значения в скетч, пропуски игнорируются.
+
+        Args:
+            values: массив или Series значений
+        """
+        counts = pd.Series(values).value_counts(dropna=True)
+        self.count += int(counts.sum())
+        _add_counts(self.counters, counts.index, counts.to_numpy())
+        self._trim()
+        return self
+
+    def merge(self, other) -> 'FrequencySketch':
+        """
+        Сливает other в этот скетч; capacity результата — меньшая из двух.
+        """
+        self.capacity = min(self.capacity, other.capacity)
+        self.count += other.count
+        _add_counts(self.counters, list(other.counters.keys()),
+                    list(other.counters.values()))
+        self._trim()
+        return self
+
+    def mode(self, default=0):
+        """
+        Самое частое значение; при равенстве частот — наименьшее, как в pandas.
+
+        Args:
+            default: значение для пустого скетча
+        """
+        if not self.counters:
+            return default
+        return min(self.counters,
+                   key=lambda value: (-self.counters[value], value))
@@ -0,0 +1,252 @@
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.data.schema import apply_schema, memory_mb, schema_casts
+from src.stage_metrics import (measuring, record_memory, record_read,
+                               record_write)
+
+FORMATS = ('csv', 'parquet', 'feather')
+
+_EXTENSIONS = {
+    '.csv': 'csv',
+    '.parquet': 'parquet',
+    '.pq': 'parquet',
+    '.feather': 'feather',
+    '.arrow': 'feather',
+}
+
+# Сигнатуры в начале файла: по ним формат определяется даже если
+# расширение файла не совпадает с его содержимым
+_MAGIC = (
+    (b'PAR1', 'parquet'),
+    (b'ARROW1', 'feather'),
+)
+
+
+def infer_format(path, fmt=None) -> str:
+    """
+    Determine the storage format of a pipeline artifact.
+
+    Args:
+        path: path to the file
+        fmt: explicit format, overrides the file extension
+    Returns:
+        One of FORMATS. Unknown extensions are treated as csv.
+    """
+    if fmt:
+        if fmt not in FORMATS:
+            raise ValueError(f"Неизвестный формат '{fmt}', "
+                             f"ожидается один из {FORMATS}")
+        return fmt
+    return _EXTENSIONS.get(Path(path).suffix.lower(), 'csv')
+
+
+def _sniff_format(path):
+    with open(path, 'rb') as f:
+        head = f.read(8)
+    for magic, fmt in _MAGIC:
+        if head.startswith(magic):
+            return fmt
+    return None
+
+
+def read_columns(path, fmt=None) -> list:
+    """
+    Column names of a pipeline artifact, without reading its data.
+
+    Args:
+        path: path to csv, parquet or feather file
+        fmt: explicit format, detected like in read_frame by default
+    """
+    fmt = fmt or _sniff_format(path) or infer_format(path)
+
+    if fmt == 'parquet':
+        return list(pq.read_schema(path).names)
+    if fmt == 'feather':
+        with pa.memory_map(str(path)) as source:
+            return list(pa.ipc.open_file(source).schema.names)
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def _projection(path, fmt, columns, exclude):
+    # Колонки без exclude; None — читать все
+    if not exclude:
+        return columns
+    names = columns if columns is not None else read_columns(path, fmt)
+    exclude = set(exclude)
+    return [c for c in names if c not in exclude]
+
+
+def read_frame(path, fmt=None, columns=None, schema=None,
+               exclude=None) -> pd.DataFrame:
+    """
+    Read a pipeline artifact into a DataFrame.
+
+    Args:
+        path: path to csv, parquet or feather file
+        fmt: explicit format; by default it is detected from the file
+             content and then from the extension
+        columns: optional list of columns to load
+        schema: optional {column: dtype} mapping applied after reading,
+             the memory footprint before and after is reported to StageMetrics
+        exclude: optional columns not to load (they are not parsed at all)
+    """
+    fmt = fmt or _sniff_format(path) or infer_format(path)
+    columns = _projection(path, fmt, columns, exclude)
+
+    if fmt == 'parquet':
+        df = pd.read_parquet(path, columns=columns)
+    elif fmt == 'feather':
+        df = pd.read_feather(path, columns=columns)
+    else:
+        df = pd.read_csv(path, usecols=columns)
+
+    record_read(path, len(df))
+    if schema:
+        df = _cast(df, schema, path)
+    return df
+
+
+def _cast(df, schema, path) -> pd.DataFrame:
+    """
+    apply_schema; размер до и после приведения сообщается открытым замерам.
+    """
+    casts = schema_casts(df, schema)
+    if not casts:
+        return df
+    if not measuring():
+        return df.astype(casts)
+    before = memory_mb(df)
+    df = df.astype(casts)
+    record_memory(path, before, memory_mb(df))
+    return df
+
+
+def write_frame(df, path, fmt=None) -> None:
+    """
+    Write a DataFrame as a pipeline artifact.
+
+    Columnar formats keep the schema (datetime and category dtypes),
+    csv is kept for the final outputs and backwards compatibility.
+
+    Args:
+        df: DataFrame to save
+        path: destination path
+        fmt: explicit format; by default it is taken from the extension
+    """
+    fmt = infer_format(path, fmt)
+
+    if fmt == 'parquet':
+        df.to_parquet(path, index=False)
+    elif fmt == 'feather':
+        # feather не хранит произвольный индекс
+        df.reset_index(drop=True).to_feather(path)
+    else:
+        df.to_csv(path, index=False)
+    record_write(path, len(df))
+
+
+def iter_frames(path, chunksize, fmt=None, schema=None, columns=None,
+                exclude=None):
+    """
+    Read a pipeline artifact in chunks of at most `chunksize` rows.
+
+    Args:
+        path: path to csv, parquet or feather file
+        chunksize: number of rows per chunk
+        fmt: explicit format, detected like in read_frame by default
+        schema: optional {column: dtype} mapping applied to every chunk
+        columns: optional list of columns to load
+        exclude: optional columns not to load
+    Yields:
+        DataFrame chunks in file order
+    """
+    if schema:
+        for chunk in iter_frames(path, chunksize, fmt, columns=columns,
+                                 exclude=exclude):
+            yield apply_schema(chunk, schema)
+        return
+
+    rows = 0
+    try:
+        for chunk in _iter_chunks(path, chunksize, fmt, columns, exclude):
+            rows += len(chunk)
+            yield chunk
+    finally:
+        record_read(path, rows)
+
+
+def _iter_chunks(path, chunksize, fmt, columns, exclude):
+    fmt = fmt or _sniff_format(path) or infer_format(path)
+    columns = _projection(path, fmt, columns, exclude)
+
+    if fmt == 'parquet':
+        batches = pq.ParquetFile(path).iter_batches(batch_size=chunksize,
+                                                    columns=columns)
+        for batch in batches:
+            yield batch.to_pandas()
+    elif fmt == 'feather':
+        with pa.memory_map(str(path)) as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                table = pa.Table.from_batches([reader.get_batch(i)])
+                if columns is not None:
+                    table = table.select(columns)
+                for start in range(0, table.num_rows, chunksize):
+                    yield table.slice(start, chunksize).to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize, usecols=columns)
+
+
+class FrameWriter:
+    """
+    Sequential writer of DataFrame chunks into one pipeline artifact.
+
+    Csv chunks are appended as text, parquet and feather chunks are written
+    as row groups / record batches of one arrow schema. The schema is taken
+    from the first chunk unless it is passed explicitly.
+    """
+    def __init__(self, path, fmt=None, schema=None):
+        self.path = path
+        self.fmt = infer_format(path, fmt)
+        self.schema = schema
+        self._writer = None
+        self._sink = None
+        self._started = False
+        self.rows = 0
+
+    def write(self, df) -> None:
+        self.rows += len(df)
+        if self.fmt == 'csv':
+            df.to_csv(self.path, index=False,
+                      mode='a' if self._started else 'w',
+                      header=not self._started)
+            self._started = True
+            return
+
+        table = pa.Table.from_pandas(df, schema=self.schema,
+                                     preserve_index=False)
+        if self._writer is None:
+            self.schema = table.schema
+            if self.fmt == 'parquet':
+                self._writer = pq.ParquetWriter(self.path, self.schema)
+            else:
+                self._sink = pa.OSFile(str(self.path), 'wb')
+                self._writer = pa.ipc.new_file(self._sink, self.schema)
+        self._writer.write_table(table)
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        if self._sink is not None:
+            self._sink.close()
+        record_write(self.path, self.rows)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
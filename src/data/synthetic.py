@@ -0,0 +1,209 @@
+import uuid
+from pathlib import Path
+
+import click
+import numpy as np
+import pandas as pd
+
+from src.data.storage import FORMATS, write_frame
+
+CITIES = ('Москва', 'Санкт-Петербург', 'Казань', 'Екатеринбург',
+          'Новосибирск', 'Нижний Новгород', 'Самара', 'Ульяновск',
+          'Краснодар', 'Пермь')
+
+START_WEEK = '2025-06-02'
+
+# Доля пропусков в колонках facts, как в реальных выгрузках
+NAN_RATES = {
+    'fact_load_factor_lag_1': 0.1,
+    'fact_percent_lateness_lag_1': 0.3,
+    'marketing_costs_lag_1': 0.3,
+    'city_nm': 0.02,
+}
+
+
+def _cities(n_cities) -> np.ndarray:
+    names = list(CITIES[:n_cities]) + [f'Город {i}'
+                                       for i in range(len(CITIES), n_cities)]
+    return np.array(names, dtype=object)
+
+
+def forecast_week(n_weeks, start=START_WEEK) -> pd.Timestamp:
+    """Неделя теста для данных из generate с теми же n_weeks и start."""
+    return pd.Timestamp(start) + pd.Timedelta(weeks=n_weeks)
+
+
+def generate(n_stores=100, n_weeks=26, n_cities=3, seed=0, start=START_WEEK,
+             missing_weeks=0.1) -> dict:
+    """
+    Синтетические facts, shifts_prediction, train и test со схемой
+    реальных данных.
+
+    У каждого магазина свой уровень заказов, город и дата открытия, заказы
+    меняются с годовой сезонностью и шумом, штат и нагрузка считаются от
+    заказов. facts недели t хранят показатели недели t-1 (колонки *_lag_1),
+    target — нехватка курьеров недели t. Часть недель магазина пропущена,
+    в колонках из NAN_RATES есть пропуски.
+
+    Args:
+        n_stores: число магазинов
+        n_weeks: число недель истории; train — недели 1..n_weeks-1,
+            test — неделя forecast_week(n_weeks, start)
+        n_cities: число городов
+        seed: зерно генератора
+        start: первая неделя facts
+        missing_weeks: доля пропущенных недель facts и train
+
+    Returns:
+        {'facts', 'shifts_prediction', 'train', 'test': DataFrame}
+    """
+    rng = np.random.default_rng(seed)
+    weeks = pd.date_range(start, periods=n_weeks + 1, freq='7D')
+    stores = np.array([str(uuid.UUID(bytes=rng.bytes(16), version=4))
+                       for _ in range(n_stores)], dtype=object)
+    cities = _cities(n_cities)
+    city_of_store = rng.integers(0, n_cities, n_stores)
+    store_city = cities[city_of_store]
+    city_scale = rng.uniform(0.7, 1.5, n_cities)[city_of_store]
+
+    # Показатели недель -1..n_weeks: facts недели t берут неделю t-1
+    t = np.arange(-1, n_weeks + 1)
+    base = rng.lognormal(5.0, 0.6, n_stores) * city_scale
+    trend = rng.normal(0.002, 0.004, n_stores)
+    season = 1 + 0.15 * np.sin(2 * np.pi * (t + rng.integers(0, 52)) / 52)
+    expected = (base[:, None] * season[None, :]
+                * (1 + trend[:, None] * t[None, :]))
+    orders = rng.poisson(np.maximum(expected, 1.0))
+
+    productivity = rng.uniform(12, 25, n_stores)[:, None]
+    needed = orders / productivity
+    staff = np.maximum(
+        np.round(needed * rng.normal(0.9, 0.15, orders.shape)), 0)
+    with_shifts = staff + rng.poisson(2, orders.shape)
+    available = with_shifts + rng.poisson(1, orders.shape)
+    load = orders / (np.maximum(staff, 1) * productivity)
+    lateness = np.clip(100 / (1 + np.exp(-4 * (load - 1.2)))
+                       + rng.normal(0, 3, orders.shape), 0, 100)
+    marketing = rng.lognormal(11, 1, orders.shape)
+    churn = rng.poisson(0.7, orders.shape)
+    opened = rng.integers(0, 1000, n_stores)
+
+    # facts: недели 0..n_weeks-1, кроме пропущенных
+    f_store, f_week = np.nonzero(
+        rng.random((n_stores, n_weeks)) >= missing_weeks)
+    # Неделя w лежит в массивах показателей под индексом w + 1, поэтому
+    # t-1 — это f_week
+    prev = f_week
+    facts = pd.DataFrame({
+        'calendar_dt': weeks[f_week].strftime('%Y-%m-%d'),
+        'store_id': stores[f_store],
+        'fact_staff_value_lag_1': staff[f_store, prev].astype(np.int64),
+        'fact_load_factor_lag_1': load[f_store, prev],
+        'num_available_couriers_lag_1':
+            available[f_store, prev].astype(np.int64),
+        'fact_num_orders_lag_1': orders[f_store, prev],
+        'fact_percent_lateness_lag_1': lateness[f_store, prev],
+        'city_nm': store_city[f_store],
+        'store_lifetime_in_days':
+            (opened[f_store] + 7 * f_week).astype(np.float64),
+        'fact_staff_churn': churn[f_store, prev].astype(np.float64),
+        'flag_high_load_lag_1': (load[f_store, prev] > 1.2).astype(np.int64),
+        'marketing_costs_lag_1': marketing[f_store, prev],
+        'fact_couriers_with_shifts_lag_1':
+            with_shifts[f_store, prev].astype(np.float64),
+    })
+    for col, rate in NAN_RATES.items():
+        facts[col] = facts[col].mask(rng.random(len(facts)) < rate)
+
+    # shifts: прогноз на каждую неделю 0..n_weeks, включая неделю теста
+    s_store, s_week = np.divmod(np.arange(n_stores * (n_weeks + 1)),
+                                n_weeks + 1)
+    cur = s_week + 1
+    predicted_orders = np.round(
+        orders[s_store, cur] * rng.lognormal(0, 0.15, len(s_store)))
+    predicted_staff = np.round(predicted_orders / productivity[s_store, 0])
+    shifts = pd.DataFrame({
+        'calendar_dt': weeks[s_week].strftime('%Y-%m-%d'),
+        'store_id': stores[s_store],
+        'predicted_staff_value': predicted_staff.astype(np.int64),
+        'predicted_num_orders': predicted_orders.astype(np.int64),
+        'predicted_load_factor':
+            predicted_orders / (np.maximum(predicted_staff, 1)
+                                * productivity[s_store, 0]),
+    })
+
+    # train: нехватка курьеров недель 1..n_weeks-1
+    t_store, t_week = np.nonzero(
+        rng.random((n_stores, n_weeks - 1)) >= missing_weeks)
+    t_week = t_week + 1
+    shortage = (needed[t_store, t_week + 1] - staff[t_store, t_week + 1]
+                + rng.normal(0, 1, len(t_store)))
+    train = pd.DataFrame({
+        'calendar_dt': weeks[t_week].strftime('%Y-%m-%d'),
+        'store_id': stores[t_store],
+        'target': np.maximum(np.round(shortage), 0),
+    })
+
+    test = pd.DataFrame({'store_id': stores})
+    return {'facts': facts, 'shifts_prediction': shifts, 'train': train,
+            'test': test}
+
+
+def write_synthetic(output_dir, fmt='csv', **kwargs) -> dict:
+    """
+    Генерирует данные и сохраняет их как data/raw: <имя>.<fmt> в
+    output_dir.
+
+    Args:
+        output_dir: каталог результата
+        fmt: формат файлов из FORMATS
+        kwargs: параметры generate
+
+    Returns:
+        {имя таблицы: путь к файлу}
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    paths = {}
+    for name, df in generate(**kwargs).items():
+        paths[name] = output_dir / f'{name}.{fmt}'
+        write_frame(df, paths[name], fmt)
+    return paths
+
+
+@click.command()
+@click.argument('output_dir', type=click.Path(file_okay=False))
+@click.option('--stores', type=click.IntRange(min=1), default=100,
+              help='Number of stores.')
+@click.option('--weeks', type=click.IntRange(min=2), default=26,
+              help='Number of weeks of history.')
+@click.option('--cities', type=click.IntRange(min=1), default=3,
+              help='Number of cities.')
+@click.option('--seed', type=int, default=0, help='Random seed.')
+@click.option('--format', 'fmt', type=click.Choice(FORMATS), default='csv',
+              help='Format of the tables.')
+def make_synthetic(output_dir, stores=100, weeks=26, cities=3, seed=0,
+                   fmt='csv') -> None:
+    """
+    Generate synthetic facts, shifts_prediction, train and test tables.
+
+    The tables have the schema of data/raw and can be passed to merge_data
+    as is; pass the forecast week printed at the end as --test-date.
+
+    Args:
+        output_dir: directory for the tables
+        stores: number of stores
+        weeks: number of weeks of history
+        cities: number of cities
+        seed: random seed
+        fmt: format of the tables (csv, parquet or feather)
+    """
+    paths = write_synthetic(output_dir, fmt, n_stores=stores, n_weeks=weeks,
+                            n_cities=cities, seed=seed)
+    for name, path in paths.items():
+        print(f'{name}: {path}')
+    print(f'forecast week: {forecast_week(weeks):%Y-%m-%d}')
+
+
+if __name__ == "__main__":
+    make_synthetic()
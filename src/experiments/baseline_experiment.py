@@ -1,22 +1,26 @@
 """
 Эксперимент: Baseline LightGBM модель с дефолтными параметрами.
-Запускать: python -m src/experiments/baseline_experiment.py
+Запускать: python -m src.experiments.baseline_experiment
 """
 import mlflow
-import pandas as pd
-import numpy as np
-import lightgbm as lgb
-from sklearn.model_selection import KFold
-from sklearn.metrics import mean_absolute_error, mean_squared_error
 from pathlib import Path
 
+from src.data.feature_matrix import FeatureMatrix
+from src.models.cv import cross_validate, log_cv_results, week_splits
+
 project_root = Path(__file__).parent.parent.parent
+# Матрица признаков из drop-features --train-matrix: отображается в память,
+# а не парсится из CSV
+matrix_path = project_root / "data" / "processed" / "train_final.npy"
+# Построенные (разбитые на бины) lgb.Dataset: повторный запуск не строит
+# бины заново
+dataset_cache = project_root / ".dataset_cache"
 mlflow_path = project_root / "mlruns"
 db_path = project_root / "mlflow.db"
 
 
-def run_baseline_experiment():
-    """Запуск baseline эксперимента"""
+def run_baseline_experiment(workers=None):
+    """Запуск baseline эксперимента; фолды обучаются в workers процессах"""
     print("Начало эксперимента")
     mlflow.set_tracking_uri(f"file:///{mlflow_path.absolute().as_posix()}")
     mlflow.set_tracking_uri(f"sqlite:///{db_path}")
@@ -26,17 +30,8 @@ def run_baseline_experiment():
         print("Запуск...")
         # Загрузка данных
         print("Загрузка данных")
-        dataset = pd.read_csv("../../data/processed/train_final.csv")
-        target_col = "target"
-        cat_features = ["city_nm"]
-
-        X = dataset.drop(columns=[target_col])
-        y = dataset[target_col]
-
-        # Преобразование категориальных признаков
-        for col in cat_features:
-            if col in X.columns:
-                X[col] = X[col].astype('category')
+        matrix = FeatureMatrix(matrix_path)
+        cat_features = matrix.categorical_features(["city_nm"])
 
         # Параметры для бейзлайн модели
         params = {
@@ -48,85 +43,17 @@ def run_baseline_experiment():
         # Логируем параметры
         mlflow.log_params(params)
 
-        # Кросс-валидация
-        kf = KFold(n_splits=5, shuffle=True, random_state=42)
-        fold_metrics = {
-            "mae": [],
-            "rmse": [],
-            "wape": []
-        }
+        # Кросс-валидация по неделям calendar_dt: валидация всегда позже train.
+        # Фолды обучаются параллельно, метрики логируются из этого процесса
         print("Кроссвалидация")
-        for fold, (train_idx, val_idx) in enumerate(kf.split(X), 1):
-            X_train, X_val = X.iloc[train_idx], X.iloc[val_idx]
-            y_train, y_val = y.iloc[train_idx], y.iloc[val_idx]
-
-            # Создание Dataset
-            train_data = lgb.Dataset(
-                X_train,
-                label=y_train,
-                categorical_feature=cat_features
-            )
-
-            val_data = lgb.Dataset(
-                X_val,
-                label=y_val,
-                reference=train_data,
-                categorical_feature=cat_features
-            )
-
-            # Обучение
-            model = lgb.train(
-                params=params,
-                train_set=train_data,
-                num_boost_round=2500,
-                valid_sets=[train_data, val_data],
-                valid_names=["train", "val"],
-                callbacks=[
-                    lgb.log_evaluation(500),
-                    lgb.early_stopping(100)
-                ]
-            )
-
-            # Предсказание и метрики
-            y_pred = model.predict(X_val, num_iteration=model.best_iteration)
-
-            mae = mean_absolute_error(y_val, y_pred)
-            rmse = np.sqrt(mean_squared_error(y_val, y_pred))
-            wape = mae / y_val.mean()
-
-            # Сохраняем метрики фолда
-            fold_metrics["mae"].append(mae)
-            fold_metrics["rmse"].append(rmse)
-            fold_metrics["wape"].append(wape)
-
-            # Логируем метрики для каждого фолда
-            mlflow.log_metric(f"fold_{fold}_mae", mae)
-            mlflow.log_metric(f"fold_{fold}_rmse", rmse)
-            mlflow.log_metric(f"fold_{fold}_wape", wape)
-            mlflow.log_metric(f"fold_{fold}_best_iteration", model.best_iteration)
-
-            print(f"Fold {fold}: MAE={mae:.3f}, RMSE={rmse:.3f}, WAPE={wape:.3f}")
+        splits = week_splits(matrix.time, n_splits=5)
+        results = cross_validate(matrix_path, params, splits,
+                                 target_col="target",
+                                 cat_features=cat_features,
+                                 cache_dir=dataset_cache, workers=workers)
 
         print("Сохранение метрик")
-
-        # Средние метрики по всем фолдам
-        mean_mae = np.mean(fold_metrics["mae"])
-        mean_rmse = np.mean(fold_metrics["rmse"])
-        mean_wape = np.mean(fold_metrics["wape"])
-
-        std_mae = np.std(fold_metrics["mae"])
-        std_rmse = np.std(fold_metrics["rmse"])
-        std_wape = np.std(fold_metrics["wape"])
-
-        # Логируем итоговые метрики
-        mlflow.log_metrics({
-            "cv_mean_mae": float(mean_mae),
-            "cv_mean_rmse": float(mean_rmse),
-            "cv_mean_wape": float(mean_wape),
-            "cv_std_mae": float(std_mae),
-            "cv_std_rmse": float(std_rmse),
-            "cv_std_wape": float(std_wape)
-        })
+        log_cv_results(results)
 
         print("Эксперимент проведен успешно!")
 
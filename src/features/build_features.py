@@ -1,5 +1,21 @@
-import pandas as pd
+import json
+from pathlib import Path
+
 import click
+import pandas as pd
+import yaml
+
+from src.data.artifact_index import index_option
+from src.data.projection import dead_columns, prune, read_exclude
+from src.data.schema import load_schema
+from src.data.storage import FORMATS, read_frame, write_frame
+from src.features.cache import (FeatureCache, feature_hash, hash_text,
+                                source_hash)
+from src.features.incremental import IncrementalFeatures, assemble_rows
+from src.features.registry import (FeaturePlan, public_features,
+                                   requested_features)
+from src.features.rolling import RollingFeatures, window_stats
+from src.stage_metrics import metrics_option
 
 
 @click.command()
@@ -7,10 +23,41 @@ import click
 @click.argument('test_filepath', type=click.Path())
 @click.argument('train_output_path', type=click.Path())
 @click.argument('test_output_path', type=click.Path())
+@click.option('--format', 'fmt', type=click.Choice(FORMATS), default=None,
+              help='Output format. '
+                   'By default it is taken from the file extension.')
+@click.option('--params-file', type=click.Path(exists=True), default=None,
+              help='Yaml file with the schema and build_features sections.')
+@click.option('--rolling-state', type=click.Path(), default=None,
+              help='Rolling history saved by a previous run. '
+                   'Ignored if it does not exist.')
+@click.option('--rolling-state-output', type=click.Path(), default=None,
+              help='Where to save the rolling history after the train data.')
+@click.option('--feature-cache', type=click.Path(file_okay=False),
+              default=None,
+              help='Directory of cached feature columns; '
+                   'only changed features are recomputed.')
+@click.option('--feature-state', type=click.Path(file_okay=False),
+              default=None,
+              help='Directory with the rolling history and train features '
+                   'of the previous run; features are computed only for '
+                   'the weeks after it.')
+@metrics_option('build-features')
+@index_option('build-features',
+              inputs=('train_filepath', 'test_filepath', 'params_file',
+                      'rolling_state'),
+              outputs=('train_output_path', 'test_output_path',
+                       'rolling_state_output'))
 def build_features(train_filepath,
                    test_filepath,
                    train_output_path,
-                   test_output_path) -> None:
+                   test_output_path,
+                   fmt=None,
+                   params_file=None,
+                   rolling_state=None,
+                   rolling_state_output=None,
+                   feature_cache=None,
+                   feature_state=None) -> None:
     """
     Feature generation for predicting courier shortages.
 
@@ -20,38 +67,124 @@ def build_features(train_filepath,
     3. past_productivity - last week's performance (orders/courier)
     4. predicted_productivity - forecast performance for current week
 
+    Features are declared in src/features/registry.py. With --params-file only
+    the features listed in the build_features section are computed, and rolling
+    per-store history features are added if build_features.rolling is set.
+
     Args:
         train_filepath: path to the training data
         test_filepath: Path to the test data (optional)
         train_output_path: path to save the enriched training data
         test_output_path: path to save the enriched test data
+        fmt: output format (csv, parquet or feather)
+        params_file: path to yaml file with parameters for this function
+        rolling_state: rolling history of the previous run to continue from
+        rolling_state_output: path to save the rolling history for the next run
+        feature_cache: directory of the per-feature cache
+        feature_state: directory of the incremental state (needs rolling
+            features)
     """
-    train_df = pd.read_csv(train_filepath)
-    # Разница между прогнозом и реальностью прошлой недели
-    train_df['staff_prediction_gap'] = train_df['predicted_staff_value'] - train_df['fact_staff_value_lag_1']
-    train_df['orders_prediction_gap'] = train_df['predicted_num_orders'] - train_df['fact_num_orders_lag_1']
-
-    # Сколько заказов на одного курьера в прошлой неделе
-    train_df['past_productivity'] = (train_df['fact_num_orders_lag_1'] /
-                                     train_df['fact_staff_value_lag_1'].replace(0, 1))
-    # Прогнозная производительность на эту неделю
-    train_df['predicted_productivity'] = (train_df['predicted_num_orders'] /
-                                          train_df['predicted_staff_value'].replace(0, 1))
+    params = {}
+    if params_file:
+        with open(params_file, 'r', encoding='utf-8') as f:
+            params = yaml.safe_load(f)
+    schema = load_schema(params)
+    plan = FeaturePlan(requested_features(params))
+    rolling = load_rolling(params, rolling_state)
+    cache = FeatureCache(feature_cache) if feature_cache else None
+    # Колонки, которые удалит drop-features и которые не нужны фичам
+    dead = dead_columns(params, 'build_features')
+    skip = read_exclude(params, 'build_features')
+
+    train_df = read_frame(train_filepath, schema=schema, exclude=skip)
+    input_cols = list(train_df.columns)
+    config = features_config(params, plan)
+    state = (IncrementalFeatures(feature_state)
+             if feature_state and rolling else None)
+    previous = state.load(train_df, rolling, config) if state else None
+    if previous is None:
+        train_df = prune(
+            add_features(train_df, plan, rolling, cache=cache), dead)
+    else:
+        # Признаки старых недель берутся из состояния, считаются только новые
+        features, new = previous
+        old = train_df[~new].reset_index(drop=True)
+        for col in features.columns:
+            old[col] = features[col]
+        added = train_df[new].reset_index(drop=True)
+        if len(added):
+            added = prune(
+                add_features(added, plan, rolling, cache=cache), dead)
+        train_df = assemble_rows(prune(old, dead), added, new)
+        click.echo(f"build-features: {int((~new).sum())} rows reused, "
+                   f"{int(new.sum())} new rows computed")
     if train_output_path:
-        train_df.to_csv(train_output_path, index=False)
+        write_frame(train_df, train_output_path, fmt)
+    if rolling and rolling_state_output:
+        rolling.save_state(rolling_state_output)
+    if state:
+        state.save(train_df, input_cols, rolling, config)
 
     if test_filepath:
-        test_df = pd.read_csv(test_filepath)
-        test_df['staff_prediction_gap'] = test_df['predicted_staff_value'] - test_df['fact_staff_value_lag_1']
-        test_df['orders_prediction_gap'] = test_df['predicted_num_orders'] - test_df['fact_num_orders_lag_1']
+        test_df = read_frame(test_filepath, schema=schema, exclude=skip)
+        test_df = add_features(test_df, plan, rolling,
+                               update_rolling=False, cache=cache)
+        prune(test_df, dead)
+        if test_output_path:
+            write_frame(test_df, test_output_path, fmt)
 
-        test_df['past_productivity'] = (test_df['fact_num_orders_lag_1'] /
-                                         test_df['fact_staff_value_lag_1'].replace(0, 1))
-        test_df['predicted_productivity'] = (test_df['predicted_num_orders'] /
-                                              test_df['predicted_staff_value'].replace(0, 1))
 
-        if test_output_path:
-            test_df.to_csv(test_output_path, index=False)
+def load_rolling(params, state_path=None):
+    """
+    RollingFeatures configured in params.yaml, continued from a saved state.
+
+    Args:
+        params: parsed params.yaml
+        state_path: rolling history of a previous run (used if it exists)
+    Returns:
+        RollingFeatures or None if rolling features are not configured
+    """
+    rolling = RollingFeatures.from_params(params)
+    if rolling and state_path and Path(state_path).exists():
+        rolling.load_state(state_path)
+    return rolling
+
+
+def features_config(params, plan) -> str:
+    """Hash of everything the output columns depend on but the input data."""
+    sections = {name: params.get(name)
+                for name in ('schema', 'build_features', 'drop_features')}
+    return hash_text(json.dumps(sections, sort_keys=True, default=str),
+                     *[feature_hash(name, plan.registry)
+                       for name in plan.features],
+                     source_hash(add_features),
+                     source_hash(RollingFeatures.transform),
+                     source_hash(window_stats))
+
+
+def add_features(df, plan=None, rolling=None, update_rolling=True,
+                 cache=None) -> pd.DataFrame:
+    """
+    Adds the generated features to df in place and returns it.
+
+    Args:
+        df: DataFrame with the merged and filled data
+        plan: FeaturePlan with the features to compute, all registered
+            features by default
+        rolling: RollingFeatures for the per-store history features (optional)
+        update_rolling: append df to the rolling history (False for the test
+            data)
+        cache: FeatureCache to load unchanged feature columns from (optional)
+    """
+    if plan is None:
+        plan = FeaturePlan(public_features())
+    values = (cache.evaluate(plan, df) if cache is not None
+              else plan.evaluate(df))
+    for name, column in values.items():
+        df[name] = column
+    if rolling is not None:
+        rolling.transform(df, update=update_rolling, cache=cache)
+    return df
 
 
 if __name__ == "__main__":
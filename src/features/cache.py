@@ -0,0 +1,124 @@
+import hashlib
+import inspect
+from pathlib import Path
+
+import pandas as pd
+
+from src.features.registry import FeaturePlan
+
+
+def hash_text(*parts) -> str:
+    """Короткий хеш набора строк."""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(str(part).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def hash_frame(df) -> str:
+    """Хеш содержимого, порядка строк, имен и типов колонок df."""
+    digest = hashlib.blake2b(digest_size=16)
+    for col in df.columns:
+        digest.update(f'{col}:{df[col].dtype}'.encode('utf-8'))
+        values = pd.util.hash_pandas_object(df[col], index=False)
+        digest.update(values.to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def source_hash(func) -> str:
+    """Хеш исходного кода функции (байткода, если исходник недоступен)."""
+    try:
+        return hash_text(inspect.getsource(func))
+    except (OSError, TypeError):
+        code = func.__code__
+        return hash_text(code.co_code.hex(), code.co_consts)
+
+
+def feature_hash(name, registry, memo=None) -> str:
+    """Хеш определения фичи вместе с ее промежуточными значениями."""
+    memo = {} if memo is None else memo
+    if name not in memo:
+        feature = registry[name]
+        inputs = [feature_hash(dep, registry, memo) if dep in registry
+                  else f'column:{dep}'
+                  for dep in feature.inputs]
+        memo[name] = hash_text(name, source_hash(feature.func), *inputs)
+    return memo[name]
+
+
+class FeatureCache:
+    """
+    Дисковый кеш колонок фич.
+
+    Каждая фича хранится отдельным parquet-файлом
+    cache_dir/<фича>/<ключ>.parquet. Ключ — хеш определения фичи
+    (исходный код ее функции и всех промежуточных значений) и хеш
+    содержимого ее входных колонок, поэтому при изменении одной фичи
+    пересчитывается только она, а остальные читаются из кеша. Старые
+    версии не удаляются: каталог можно очистить в любой момент.
+
+    Attributes:
+        cache_dir (Path): каталог кеша
+        hits (list): фичи, прочитанные из кеша последними вызовами
+        misses (list): фичи, вычисленные заново
+    """
+    def __init__(self, cache_dir):
+        self.cache_dir = Path(cache_dir)
+        self.hits = []
+        self.misses = []
+
+    def _path(self, name, key) -> Path:
+        return self.cache_dir / name / f'{key}.parquet'
+
+    def get(self, name, key):
+        """DataFrame из кеша или None."""
+        path = self._path(name, key)
+        if not path.exists():
+            return None
+        self.hits.append(name)
+        return pd.read_parquet(path)
+
+    def put(self, name, key, df) -> None:
+        self.misses.append(name)
+        path = self._path(name, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Запись через временный файл: прерванный запуск не оставит битый кеш
+        tmp_path = path.with_suffix('.tmp')
+        df.to_parquet(tmp_path, index=False)
+        tmp_path.replace(path)
+
+    def evaluate(self, plan, df) -> dict:
+        """
+        Вычисляет фичи плана, читая неизмененные из кеша.
+
+        Args:
+            plan: FeaturePlan
+            df: DataFrame со входными колонками плана
+
+        Returns:
+            {имя фичи: numpy-массив}, как FeaturePlan.evaluate
+        """
+        input_hashes = {col: hash_frame(df[[col]]) for col in plan.columns}
+        definitions = {}
+        keys = {}
+        for name in plan.features:
+            columns = FeaturePlan([name], plan.registry).columns
+            definition = feature_hash(name, plan.registry, definitions)
+            keys[name] = hash_text(definition,
+                                   *(input_hashes[col] for col in columns))
+
+        values, missing = {}, []
+        for name in plan.features:
+            cached = self.get(name, keys[name])
+            if cached is None:
+                missing.append(name)
+            else:
+                values[name] = cached[name].to_numpy()
+
+        if missing:
+            computed = FeaturePlan(missing, plan.registry).evaluate(df)
+            for name, column in computed.items():
+                self.put(name, keys[name], pd.DataFrame({name: column}))
+            values.update(computed)
+        return {name: values[name] for name in plan.features}
@@ -0,0 +1,139 @@
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.data.storage import read_frame, write_frame
+from src.features.cache import hash_frame
+
+STATE_VERSION = 1
+MANIFEST = 'manifest.json'
+HISTORY = 'history.parquet'
+FEATURES = 'features.parquet'
+
+
+def _file_state(path) -> list:
+    stat = Path(path).stat()
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+class IncrementalFeatures:
+    """
+    Состояние build-features для расчета признаков только новых недель.
+
+    В state_dir хранятся хвост rolling-истории (history.parquet), колонки
+    признаков всех строк train прошлого запуска (features.parquet) и
+    manifest.json с хешем параметров, хешем входа train и размерами и
+    mtime обоих файлов. Каталог не является выходом стадии: выход
+    build-features каждый раз пишется заново, а из состояния берутся
+    только признаки старых строк.
+
+    Признаки прошлого запуска подходят, если совпадают параметры и код
+    фич, файлы состояния не менялись, а строки train до последней недели
+    каждого магазина в истории совпадают (с порядком) со входом прошлого
+    запуска. Иначе признаки пересчитываются целиком.
+
+    Attributes:
+        state_dir (Path): каталог состояния
+    """
+    def __init__(self, state_dir):
+        self.state_dir = Path(state_dir)
+        self._input_hash = None
+
+    def _load_manifest(self) -> dict:
+        path = self.state_dir / MANIFEST
+        if not path.exists():
+            return {}
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _is_current(self, manifest, config) -> bool:
+        if (manifest.get('version') != STATE_VERSION
+                or manifest.get('config') != config):
+            return False
+        for name in (HISTORY, FEATURES):
+            path = self.state_dir / name
+            if (not path.exists()
+                    or manifest.get(name) != _file_state(path)):
+                return False
+        return True
+
+    def load(self, df, rolling, config):
+        """
+        Признаки старых строк df из прошлого запуска.
+
+        При успехе история rolling заменяется историей из состояния, и
+        add_features для новых строк продолжает ее. Колонка недели df
+        приводится к datetime на месте.
+
+        Args:
+            df: вход train этого запуска
+            rolling: RollingFeatures
+            config: хеш параметров и кода фич
+
+        Returns:
+            (DataFrame признаков старых строк, маска новых строк df)
+            или None
+        """
+        df[rolling.time_col] = pd.to_datetime(df[rolling.time_col])
+        self._input_hash = hash_frame(df)
+        manifest = self._load_manifest()
+        if not self._is_current(manifest, config):
+            return None
+
+        previous_state = rolling.state
+        rolling.load_state(self.state_dir / HISTORY)
+        new = rolling.new_rows(df)
+        if hash_frame(df[~new]) == manifest.get('input'):
+            features = read_frame(self.state_dir / FEATURES)
+            if len(features) == int((~new).sum()):
+                return features, new
+        rolling.state = previous_state
+        return None
+
+    def save(self, df, input_cols, rolling, config) -> None:
+        """
+        Сохраняет состояние после расчета признаков train.
+
+        Args:
+            df: train с признаками в порядке входа
+            input_cols: колонки входа (остальные колонки df — признаки)
+            rolling: RollingFeatures после обработки train
+            config: хеш параметров и кода фич
+        """
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        feature_cols = [col for col in df.columns if col not in input_cols]
+        write_frame(rolling.state, self.state_dir / HISTORY)
+        write_frame(df[feature_cols], self.state_dir / FEATURES)
+        manifest = {
+            'version': STATE_VERSION,
+            'config': config,
+            'input': self._input_hash,
+            HISTORY: _file_state(self.state_dir / HISTORY),
+            FEATURES: _file_state(self.state_dir / FEATURES),
+        }
+        with open(self.state_dir / MANIFEST, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+
+
+def assemble_rows(old, added, new) -> pd.DataFrame:
+    """
+    Строки old и added в порядке входа: new — маска строк added.
+
+    Категории колонок объединяются, чтобы тип совпал с пересчетом целиком.
+    """
+    if not len(added):
+        return old
+    for col in old.columns:
+        if (isinstance(old[col].dtype, pd.CategoricalDtype)
+                and isinstance(added[col].dtype, pd.CategoricalDtype)):
+            categories = old[col].cat.categories.union(
+                added[col].cat.categories)
+            old[col] = old[col].cat.set_categories(categories)
+            added[col] = added[col].cat.set_categories(categories)
+    frame = pd.concat([old, added[old.columns]], ignore_index=True)
+    order = np.argsort(
+        np.concatenate([np.flatnonzero(~new), np.flatnonzero(new)]),
+        kind='stable')
+    return frame.iloc[order].reset_index(drop=True)
@@ -0,0 +1,164 @@
+import numpy as np
+
+# Все объявленные фичи: {имя: Feature}
+FEATURES = {}
+
+
+class Feature:
+    """
+    Описание одной фичи.
+
+    Attributes:
+        name (str): имя колонки результата
+        inputs (tuple): имена входов — колонок DataFrame или других фич
+        func: функция от numpy-массивов входов, возвращающая массив
+        public (bool): False для промежуточных значений, которые не пишутся
+            в DataFrame
+    """
+    def __init__(self, name, inputs, func, public=True):
+        self.name = name
+        self.inputs = tuple(inputs)
+        self.func = func
+        self.public = public
+
+
+def register(name, inputs, public=True):
+    """
+    Декоратор, объявляющий фичу в FEATURES.
+
+    Args:
+        name: имя фичи
+        inputs: имена колонок или других фич, которые передаются в функцию
+        public: False для промежуточного значения
+    """
+    def decorator(func):
+        if name in FEATURES:
+            raise ValueError(f"Фича '{name}' уже объявлена")
+        FEATURES[name] = Feature(name, inputs, func, public)
+        return func
+    return decorator
+
+
+def public_features(registry=None) -> list:
+    """Имена всех публичных фич в порядке объявления."""
+    registry = FEATURES if registry is None else registry
+    return [name for name, feature in registry.items() if feature.public]
+
+
+def requested_features(params) -> list:
+    """
+    Фичи, запрошенные в секции build_features params.yaml.
+
+    Args:
+        params: разобранный params.yaml; если фичи не перечислены — все
+            публичные
+    """
+    section = (params or {}).get('build_features') or {}
+    features = (list(section.get('prediction_gap_cols') or [])
+                + list(section.get('productivity_cols') or []))
+    return features or public_features()
+
+
+class FeaturePlan:
+    """
+    Скомпилированный набор фич.
+
+    При создании зависимости запрошенных фич раскрываются в порядок
+    вычисления (каждый узел ровно один раз), и собирается список колонок
+    DataFrame, которые нужны на входе. evaluate() читает эти колонки
+    numpy-массивами один раз и вычисляет узлы по порядку; промежуточные
+    значения, общие для нескольких фич, считаются один раз.
+
+    Attributes:
+        features (list): запрошенные фичи
+        order (list): все узлы (включая промежуточные) в порядке вычисления
+        columns (list): колонки DataFrame, которые читает план
+    """
+    def __init__(self, features, registry=None):
+        self.registry = FEATURES if registry is None else registry
+        self.features = list(features)
+        self.order = []
+        self.columns = []
+
+        visiting = set()
+        for name in self.features:
+            if name not in self.registry:
+                raise ValueError(f"Неизвестная фича '{name}', объявлены: "
+                                 f"{public_features(self.registry)}")
+            self._visit(name, visiting)
+
+    def _visit(self, name, visiting) -> None:
+        if name in self.order or name in self.columns:
+            return
+        feature = self.registry.get(name)
+        if feature is None:
+            self.columns.append(name)
+            return
+        if name in visiting:
+            raise ValueError(f"Циклическая зависимость фичи '{name}'")
+
+        visiting.add(name)
+        for dependency in feature.inputs:
+            self._visit(dependency, visiting)
+        visiting.discard(name)
+        self.order.append(name)
+
+    def evaluate(self, df) -> dict:
+        """
+        Вычисляет запрошенные фичи.
+
+        Args:
+            df: DataFrame со всеми колонками из self.columns
+
+        Returns:
+            {имя фичи: numpy-массив} для запрошенных фич
+        """
+        values = {col: df[col].to_numpy() for col in self.columns}
+        for name in self.order:
+            feature = self.registry[name]
+            values[name] = feature.func(*(values[dependency]
+                                          for dependency in feature.inputs))
+        return {name: values[name] for name in self.features}
+
+
+def nonzero(values) -> np.ndarray:
+    """Заменяет нули на 1, чтобы делить без inf."""
+    return np.where(values == 0, values.dtype.type(1), values)
+
+
+# Промежуточные значения
+@register('_fact_staff_nonzero', ['fact_staff_value_lag_1'], public=False)
+def _fact_staff_nonzero(fact_staff):
+    return nonzero(fact_staff)
+
+
+@register('_predicted_staff_nonzero', ['predicted_staff_value'], public=False)
+def _predicted_staff_nonzero(predicted_staff):
+    return nonzero(predicted_staff)
+
+
+# Разница между прогнозом и реальностью прошлой недели
+@register('staff_prediction_gap',
+          ['predicted_staff_value', 'fact_staff_value_lag_1'])
+def staff_prediction_gap(predicted_staff, fact_staff):
+    return predicted_staff - fact_staff
+
+
+@register('orders_prediction_gap',
+          ['predicted_num_orders', 'fact_num_orders_lag_1'])
+def orders_prediction_gap(predicted_orders, fact_orders):
+    return predicted_orders - fact_orders
+
+
+# Сколько заказов на одного курьера в прошлой неделе
+@register('past_productivity',
+          ['fact_num_orders_lag_1', '_fact_staff_nonzero'])
+def past_productivity(fact_orders, fact_staff):
+    return fact_orders / fact_staff
+
+
+# Прогнозная производительность на эту неделю
+@register('predicted_productivity',
+          ['predicted_num_orders', '_predicted_staff_nonzero'])
+def predicted_productivity(predicted_orders, predicted_staff):
+    return predicted_orders / predicted_staff
@@ -0,0 +1,235 @@
+import numpy as np
+import pandas as pd
+
+from src.data.fact_index import WEEK
+from src.data.storage import read_frame, write_frame
+from src.features.cache import hash_frame, hash_text, source_hash
+
+STATS = ('mean', 'std', 'trend')
+
+
+def _cumsum0(values) -> np.ndarray:
+    return np.concatenate(([0.0], np.cumsum(values)))
+
+
+def window_stats(keys, weeks, values, window) -> dict:
+    """
+    Скользящие статистики за последние window недель для каждой строки.
+
+    Строки должны быть отсортированы по (keys, weeks). Окно строки —
+    строки того же ключа с неделями (week - window, week]. Суммы по окну
+    берутся как разности кумулятивных сумм, границы окон находятся одним
+    searchsorted, поэтому все статистики считаются за O(n) после сортировки.
+    Пропуски в values не учитываются.
+
+    Args:
+        keys: целочисленные коды магазинов
+        weeks: целочисленные номера недель
+        values: значения колонки
+        window: ширина окна в неделях
+
+    Returns:
+        {'mean', 'std', 'trend': массивы float64}; std — выборочное (ddof=1),
+        trend — наклон МНК-прямой значения по номеру недели
+    """
+    keys = np.asarray(keys, dtype=np.int64)
+    weeks = np.asarray(weeks, dtype=np.int64)
+    values = np.asarray(values, dtype=np.float64)
+    if not len(values):
+        return {stat: np.empty(0) for stat in STATS}
+
+    # Магазины разнесены на span недель, чтобы окна не заходили
+    # в соседний магазин
+    span = int(weeks.max() - weeks.min()) + window + 1
+    composite = keys * span + (weeks - weeks.min())
+    start = np.searchsorted(composite, composite - (window - 1), side='left')
+    end = np.arange(1, len(values) + 1)
+
+    valid = ~np.isnan(values)
+    # Центрирование уменьшает потерю точности в разностях кумулятивных сумм
+    center = values[valid].mean() if valid.any() else 0.0
+    y = np.where(valid, values - center, 0.0)
+    x = np.where(valid, weeks - weeks.min(), 0).astype(np.float64)
+
+    def window_sum(a):
+        cum = _cumsum0(a)
+        return cum[end] - cum[start]
+
+    n = window_sum(valid.astype(np.float64))
+    sy, syy = window_sum(y), window_sum(y * y)
+    sx, sxx, sxy = window_sum(x), window_sum(x * x), window_sum(x * y)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = np.where(n > 0, sy / n + center, np.nan)
+        var = (syy - sy * sy / n) / (n - 1)
+        std = np.where(n > 1, np.sqrt(np.maximum(var, 0.0)), np.nan)
+        denom = n * sxx - sx * sx
+        trend = np.where((n > 1) & (denom > 0),
+                         (n * sxy - sx * sy) / denom, np.nan)
+    return {'mean': mean, 'std': std, 'trend': trend}
+
+
+class RollingFeatures:
+    """
+    Скользящие признаки истории магазина: среднее, волатильность (std)
+    и тренд колонок за последние k недель.
+
+    Окно строки недели t включает недели t-k+1..t того же магазина; для
+    колонок с лагом 1 это факты недель t-k..t-1, то есть без утечки.
+
+    Для следующего запуска хранится состояние — последние max(windows)-1
+    недель каждого магазина. transform() дописывает к новым строкам этот
+    хвост истории, поэтому признаки новой недели считаются без пересчета
+    всей истории. Строки хвоста, не более ранние, чем первая неделя
+    магазина в новых данных, не используются: повторная обработка тех же
+    недель не дублирует историю.
+
+    Attributes:
+        cols (list): колонки, по которым считаются статистики
+        windows (list): ширины окон в неделях
+        stats (list): статистики из STATS
+        key_col (str): колонка магазина
+        time_col (str): колонка недели
+        state (DataFrame): хвост истории (key_col, time_col, cols)
+    """
+    def __init__(self, cols, windows=(4,), stats=STATS, key_col='store_id',
+                 time_col='calendar_dt'):
+        unknown = set(stats) - set(STATS)
+        if unknown:
+            raise ValueError(f"Неизвестные статистики {sorted(unknown)}, "
+                             f"ожидаются {STATS}")
+        self.cols = list(cols)
+        self.windows = [int(w) for w in windows]
+        self.stats = list(stats)
+        self.key_col = key_col
+        self.time_col = time_col
+        self.state = pd.DataFrame(columns=[key_col, time_col] + self.cols)
+
+    @classmethod
+    def from_params(cls, params):
+        """
+        Создает RollingFeatures из секции build_features.rolling params.yaml.
+
+        Returns:
+            RollingFeatures или None, если скользящие признаки не настроены
+        """
+        section = (params or {}).get('build_features') or {}
+        section = section.get('rolling') or {}
+        if not section.get('cols'):
+            return None
+        return cls(section['cols'], section.get('windows', (4,)),
+                   section.get('stats', STATS))
+
+    @property
+    def feature_names(self) -> list:
+        return [f'{col}_{stat}_{window}w'
+                for col in self.cols
+                for window in self.windows
+                for stat in self.stats]
+
+    def load_state(self, path) -> 'RollingFeatures':
+        self.state = read_frame(path)
+        return self
+
+    def save_state(self, path) -> None:
+        write_frame(self.state, path)
+
+    def new_rows(self, df) -> np.ndarray:
+        """Маска строк df с неделями позже последней недели магазина."""
+        last_week = self.state.groupby(self.key_col)[self.time_col].max()
+        weeks = pd.to_datetime(df[self.time_col])
+        known = df[self.key_col].astype(object).map(last_week.to_dict())
+        return ~(weeks <= pd.to_datetime(known)).to_numpy()
+
+    def _history(self, df) -> pd.DataFrame:
+        """Хвост состояния, предшествующий первым неделям магазинов в df."""
+        if not len(self.state):
+            return self.state.iloc[:0]
+        first_week = df.groupby(self.key_col)[self.time_col].min()
+        state_first = self.state[self.key_col].map(first_week)
+        keep = state_first.isna() | (self.state[self.time_col] < state_first)
+        return self.state[keep.to_numpy()]
+
+    def transform(self, df, update=True, cache=None) -> pd.DataFrame:
+        """
+        Добавляет скользящие признаки в df на месте.
+
+        Args:
+            df: данные с key_col, time_col и cols
+            update: дописать строки df в состояние для следующих вызовов
+            cache: FeatureCache; признаки колонки и окна читаются из него,
+                если не изменились код window_stats, входная колонка и история
+
+        Returns:
+            df с колонками feature_names
+        """
+        df[self.time_col] = pd.to_datetime(df[self.time_col])
+        history = self._history(df)
+        rows = (df[[self.key_col, self.time_col] + self.cols]
+                .reset_index(drop=True))
+        if len(history):
+            rows = pd.concat([history, rows], ignore_index=True)
+            rows[self.time_col] = pd.to_datetime(rows[self.time_col])
+
+        sorted_rows = None
+        for col in self.cols:
+            dtype = (df[col].dtype
+                     if pd.api.types.is_float_dtype(df[col].dtype)
+                     else np.float64)
+            cache_key = None
+            if cache is not None:
+                cache_key = hash_text(
+                    source_hash(window_stats), self.stats, dtype,
+                    hash_frame(rows[[self.key_col, self.time_col, col]]))
+            for window in self.windows:
+                names = [f'{col}_{stat}_{window}w' for stat in self.stats]
+                entry = f'{col}_{window}w'
+                key = hash_text(cache_key, window)
+                cached = cache.get(entry, key) if cache else None
+                if cached is None:
+                    if sorted_rows is None:
+                        sorted_rows = self._sort(rows, len(history))
+                    cached = self._window_frame(rows[col], sorted_rows,
+                                                window, names, dtype)
+                    if cache is not None:
+                        cache.put(entry, key, cached)
+                for name in names:
+                    df[name] = cached[name].to_numpy()
+
+        if update:
+            self._update_state(rows)
+        return df
+
+    def _window_frame(self, values, sorted_rows, window, names, dtype):
+        """Статистики окна window для строк df (без истории)."""
+        keys, weeks, order, new_pos = sorted_rows
+        values = values.to_numpy(dtype=np.float64, na_value=np.nan)[order]
+        result = window_stats(keys, weeks, values, window)
+        return pd.DataFrame({name: result[stat][new_pos].astype(dtype)
+                             for name, stat in zip(names, self.stats)})
+
+    def _sort(self, rows, n_history) -> tuple:
+        """
+        Порядок строк по (магазин, неделя).
+
+        Returns:
+            Коды магазинов и номера недель в отсортированном порядке,
+            перестановку order и позиции строк df (без истории) в этом порядке
+        """
+        keys = pd.factorize(rows[self.key_col])[0]
+        weeks = ((rows[self.time_col] - pd.Timestamp('1970-01-05')) // WEEK
+                 ).to_numpy()
+        order = np.lexsort((weeks, keys))
+        new_pos = np.empty(len(rows), dtype=np.int64)
+        new_pos[order] = np.arange(len(rows))
+        return keys[order], weeks[order], order, new_pos[n_history:]
+
+    def _update_state(self, rows) -> None:
+        """Оставляет для каждого магазина последние max(windows)-1 недель."""
+        depth = max(self.windows) - 1
+        last_week = rows.groupby(self.key_col)[self.time_col].transform('max')
+        keep = rows[self.time_col] > last_week - depth * WEEK
+        self.state = (rows[keep.to_numpy()]
+                      .sort_values([self.key_col, self.time_col],
+                                   kind='stable')
+                      .reset_index(drop=True))
@@ -0,0 +1,226 @@
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import lightgbm as lgb
+import numpy as np
+from sklearn.model_selection import KFold
+
+from src.data.feature_matrix import FeatureMatrix
+from src.models.dataset_cache import load_dataset
+
+METRICS = ('mae', 'rmse', 'wape')
+
+# Алиасы числа потоков LightGBM: перед запуском фолда все заменяются
+# на num_threads
+THREAD_PARAMS = ('num_threads', 'num_thread', 'nthread', 'nthreads', 'n_jobs')
+
+# Алиасы числа итераций и ранней остановки: их задает не конфиг модели,
+# а запуск (бюджеты ступеней поиска, раунды дообучения)
+ITERATION_PARAMS = (
+    'num_iterations', 'num_iteration', 'n_iter', 'num_tree', 'num_trees',
+    'num_round', 'num_rounds', 'nrounds', 'num_boost_round', 'n_estimators',
+    'max_iter', 'early_stopping_round', 'early_stopping_rounds',
+    'early_stopping', 'n_iter_no_change',
+)
+
+# Данные процесса-исполнителя: матрица и построенный Dataset загружаются
+# один раз на процесс
+_WORKER = {}
+
+
+def kfold_splits(n_rows, n_splits=5, seed=42) -> list:
+    """Фолды перемешанного KFold: [(train_idx, val_idx)]."""
+    kf = KFold(n_splits=n_splits, shuffle=True, random_state=seed)
+    return list(kf.split(np.arange(n_rows)))
+
+
+def week_splits(weeks, n_splits=5, val_weeks=1, train_weeks=None,
+                gap_weeks=0) -> list:
+    """
+    Фолды по неделям: валидация — n_splits последних блоков по val_weeks
+    недель, train — недели строго до блока валидации.
+
+    В отличие от перемешанного KFold, будущие недели не попадают в train.
+    Индексы строк считаются один раз по номеру недели каждой строки и
+    отсортированы, как требует Dataset.subset.
+
+    Args:
+        weeks: неделя каждой строки (calendar_dt)
+        n_splits: число фолдов
+        val_weeks: недель в валидации фолда
+        train_weeks: недель в train (скользящее окно), None — все предыдущие
+            (расширяющееся)
+        gap_weeks: недель между train и валидацией
+
+    Returns:
+        [(train_idx, val_idx)] по возрастанию недели валидации
+    """
+    if weeks is None:
+        raise ValueError("Нет недель строк: матрица сохранена без "
+                         "drop_features.time_col")
+    unique, codes = np.unique(np.asarray(weeks), return_inverse=True)
+    first_val = len(unique) - n_splits * val_weeks
+    if first_val - gap_weeks < 1:
+        raise ValueError(f"{len(unique)} недель мало для {n_splits} фолдов "
+                         f"по {val_weeks} недель с разрывом {gap_weeks}")
+
+    splits = []
+    for fold in range(n_splits):
+        val_start = first_val + fold * val_weeks
+        train_end = val_start - gap_weeks
+        train_start = (0 if train_weeks is None
+                       else max(0, train_end - train_weeks))
+        train_idx = np.flatnonzero((codes >= train_start)
+                                   & (codes < train_end))
+        val_idx = np.flatnonzero((codes >= val_start)
+                                 & (codes < val_start + val_weeks))
+        splits.append((train_idx, val_idx))
+    return splits
+
+
+def thread_budget(workers, cpu_count=None) -> int:
+    """Потоков LightGBM на процесс, чтобы workers процессов делили ядра."""
+    return max(1, (cpu_count or os.cpu_count() or 1) // workers)
+
+
+def with_threads(params, num_threads) -> dict:
+    """Копия params, где число потоков задано только num_threads."""
+    params = {name: value for name, value in params.items()
+              if name not in THREAD_PARAMS}
+    params['num_threads'] = num_threads
+    return params
+
+
+def _init_worker(matrix_path, target_col, cat_features, params,
+                 cache_dir) -> None:
+    matrix = FeatureMatrix(matrix_path)
+    _WORKER['matrix'] = matrix
+    _WORKER['dataset'] = load_dataset(matrix_path, target_col, cat_features,
+                                      params, cache_dir=cache_dir)
+
+
+def fold_metrics(y_true, y_pred) -> dict:
+    """MAE, RMSE и WAPE предсказаний одного фолда."""
+    mae = float(np.mean(np.abs(y_true - y_pred)))
+    return {
+        'mae': mae,
+        'rmse': float(np.sqrt(np.mean((y_true - y_pred) ** 2))),
+        'wape': mae / float(np.mean(y_true)),
+    }
+
+
+def _run_fold(fold, train_idx, val_idx, params, num_boost_round,
+              early_stopping_rounds) -> dict:
+    matrix, dataset = _WORKER['matrix'], _WORKER['dataset']
+    train_data = dataset.subset(train_idx)
+    val_data = dataset.subset(val_idx)
+    model = lgb.train(
+        params=params,
+        train_set=train_data,
+        num_boost_round=num_boost_round,
+        valid_sets=[train_data, val_data],
+        valid_names=['train', 'val'],
+        callbacks=[lgb.early_stopping(early_stopping_rounds, verbose=False)],
+    )
+    y_pred = model.predict(matrix.X[val_idx],
+                           num_iteration=model.best_iteration)
+    result = fold_metrics(np.asarray(matrix.target[val_idx]), y_pred)
+    result.update(fold=fold, best_iteration=model.best_iteration)
+    return result
+
+
+def cross_validate(matrix_path,
+                   params,
+                   splits,
+                   target_col='target',
+                   cat_features=(),
+                   num_boost_round=2500,
+                   early_stopping_rounds=100,
+                   cache_dir=None,
+                   workers=None) -> list:
+    """
+    Кросс-валидация LightGBM на матрице признаков, фолды — параллельно.
+
+    Фолды обучаются в пуле из workers процессов (spawn: OpenMP
+    LightGBM не переживает fork), каждому процессу достается
+    thread_budget(workers) потоков LightGBM, поэтому ядра не
+    перегружаются. Исполнители отображают ту же матрицу в память и читают
+    построенный Dataset из cache_dir, который до запуска пула заполняет
+    родительский процесс (без cache_dir — во временный каталог), поэтому
+    бины строятся один раз; фолды — Dataset.subset. При workers=1 фолды
+    обучаются в текущем процессе на одном построенном Dataset.
+
+    Args:
+        matrix_path: матрица .npy с таргетом
+        params: параметры LightGBM
+        splits: [(train_idx, val_idx)]
+        target_col: колонка таргета
+        cat_features: категориальные колонки
+        num_boost_round: максимум итераций
+        early_stopping_rounds: остановка без улучшения на валидации
+        cache_dir: каталог DatasetCache
+        workers: число процессов, по умолчанию min(число фолдов, число ядер)
+
+    Returns:
+        Метрики фолдов по порядку:
+        [{'fold', 'mae', 'rmse', 'wape', 'best_iteration'}]
+    """
+    workers = workers or min(len(splits), os.cpu_count() or 1)
+    fold_params = with_threads(params, thread_budget(workers))
+    dataset_args = (str(matrix_path), target_col, list(cat_features),
+                    fold_params)
+    tasks = [(fold, train_idx, val_idx, fold_params, num_boost_round,
+              early_stopping_rounds)
+             for fold, (train_idx, val_idx) in enumerate(splits, 1)]
+
+    if workers == 1:
+        _init_worker(*dataset_args, cache_dir)
+        try:
+            return [_run_fold(*task) for task in tasks]
+        finally:
+            _WORKER.clear()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Бины строятся один раз здесь, исполнители только читают их из кеша
+        cache_dir = str(cache_dir or tmp_dir)
+        load_dataset(*dataset_args, cache_dir=cache_dir)
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=_init_worker,
+                                 initargs=(*dataset_args, cache_dir)) as pool:
+            futures = [pool.submit(_run_fold, *task) for task in tasks]
+            return [future.result() for future in futures]
+
+
+def summarize(results) -> dict:
+    """
+    Среднее и стандартное отклонение метрик по фолдам: cv_mean_<метрика>,
+    cv_std_<метрика>.
+    """
+    summary = {}
+    for kind, func in (('mean', np.mean), ('std', np.std)):
+        for name in METRICS:
+            values = [result[name] for result in results]
+            summary[f'cv_{kind}_{name}'] = float(func(values))
+    return summary
+
+
+def log_cv_results(results) -> dict:
+    """
+    Логирует метрики фолдов и итоговые метрики в текущий run MLflow,
+    возвращает итоговые.
+    """
+    import mlflow
+
+    for result in results:
+        fold = result['fold']
+        for name in (*METRICS, 'best_iteration'):
+            mlflow.log_metric(f'fold_{fold}_{name}', result[name])
+        print(f"Fold {fold}: MAE={result['mae']:.3f}, "
+              f"RMSE={result['rmse']:.3f}, WAPE={result['wape']:.3f}")
+
+    summary = summarize(results)
+    mlflow.log_metrics(summary)
+    return summary
@@ -0,0 +1,170 @@
+import json
+import os
+from pathlib import Path
+
+import lightgbm as lgb
+
+from src.data.artifact_index import hash_files
+from src.data.feature_matrix import (FeatureMatrix, is_matrix, metadata_path,
+                                     target_path)
+from src.data.storage import read_frame
+from src.features.cache import hash_text
+
+# Версия формата кеша: увеличивается, если меняется способ построения Dataset
+CACHE_VERSION = 1
+
+# Параметры LightGBM, от которых зависит построенный Dataset: бины, отбор
+# признаков до обучения, бандлинг и обработка пропусков (вместе с алиасами)
+DATASET_PARAMS = (
+    'max_bin', 'max_bins', 'max_bin_by_feature', 'min_data_in_bin',
+    'bin_construct_sample_cnt', 'subsample_for_bin', 'data_random_seed',
+    'data_seed', 'seed', 'random_seed', 'random_state', 'feature_pre_filter',
+    'min_data_in_leaf', 'min_data_per_leaf', 'min_data', 'min_child_samples',
+    'min_samples_leaf', 'use_missing', 'zero_as_missing', 'enable_bundle',
+    'is_enable_bundle', 'bundle', 'max_conflict_rate', 'is_enable_sparse',
+    'enable_sparse', 'sparse', 'linear_tree', 'linear_trees',
+    'forcedbins_filename', 'two_round', 'two_round_loading',
+    'use_two_round_loading',
+)
+
+
+def dataset_params(params) -> dict:
+    """Параметры из params, которые влияют на построение Dataset."""
+    return {name: params[name] for name in DATASET_PARAMS if name in params}
+
+
+def data_files(path) -> list:
+    """
+    Файлы, из которых строится Dataset: таблица или матрица с метаданными
+    и таргетом.
+    """
+    if is_matrix(path):
+        files = [Path(path), metadata_path(path)]
+        if target_path(path).exists():
+            files.append(target_path(path))
+        return files
+    return [Path(path)]
+
+
+def build_dataset(path, target_col, categorical, params,
+                  rows=None) -> lgb.Dataset:
+    """
+    Строит lgb.Dataset из итоговой таблицы (CSV, Parquet, Feather) или
+    матрицы .npy.
+
+    Категориальные колонки таблицы приводятся к category; у Dataset из
+    матрицы pandas_categorical берется из ее метаданных, поэтому модель
+    кодирует категории DataFrame при predict так же, как матрица. rows —
+    номера строк матрицы, если Dataset нужен не по всем строкам.
+    """
+    if is_matrix(path):
+        matrix = FeatureMatrix(path)
+        if matrix.target is None:
+            raise ValueError(f"В матрице {path} нет целевой переменной")
+        X, y = matrix.X, matrix.target
+        if rows is not None:
+            X, y = X[rows], y[rows]
+        dataset = lgb.Dataset(
+            X, label=y, feature_name=matrix.columns,
+            categorical_feature=matrix.categorical_features(categorical),
+            params=params)
+        dataset.pandas_categorical = matrix.pandas_categorical()
+        return dataset
+
+    df = read_frame(path)
+    if target_col not in df.columns:
+        raise ValueError(
+            f"Целевая переменная '{target_col}' не найдена в данных")
+    X = df.drop(columns=[target_col])
+    for col in categorical:
+        if col in X.columns:
+            X[col] = X[col].astype('category')
+    return lgb.Dataset(X, label=df[target_col],
+                       categorical_feature=categorical, params=params)
+
+
+class DatasetCache:
+    """
+    Дисковый кеш построенных (разбитых на бины) lgb.Dataset.
+
+    Dataset хранится в бинарном формате LightGBM cache_dir/<ключ>.bin,
+    рядом — <ключ>.json с pandas_categorical, который бинарный формат не
+    сохраняет. Ключ — хеш содержимого файлов данных, списка категориальных
+    колонок, параметров из DATASET_PARAMS и версии LightGBM, поэтому
+    при изменении данных или бинов Dataset строится заново. Старые
+    версии не удаляются: каталог можно очистить в любой момент.
+
+    Attributes:
+        cache_dir (Path): каталог кеша
+        hits (list): ключи, прочитанные из кеша последними вызовами
+        misses (list): ключи, построенные заново
+    """
+    def __init__(self, cache_dir):
+        self.cache_dir = Path(cache_dir)
+        self.hits = []
+        self.misses = []
+
+    def key(self, path, target_col, categorical, params) -> str:
+        files = data_files(path)
+        hashes = hash_files(files)
+        return hash_text(CACHE_VERSION, lgb.__version__, target_col,
+                         *(hashes[file] for file in files),
+                         json.dumps(list(categorical)),
+                         json.dumps(dataset_params(params), sort_keys=True,
+                                    default=str))
+
+    def _path(self, key) -> Path:
+        return self.cache_dir / f'{key}.bin'
+
+    def get(self, key, params):
+        """Построенный Dataset из кеша или None."""
+        path = self._path(key)
+        if not path.exists():
+            return None
+        self.hits.append(key)
+        with open(path.with_suffix('.json'), 'r', encoding='utf-8') as f:
+            metadata = json.load(f)
+        dataset = lgb.Dataset(str(path), params=params).construct()
+        dataset.pandas_categorical = metadata['pandas_categorical']
+        return dataset
+
+    def put(self, key, dataset) -> None:
+        self.misses.append(key)
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Временные файлы с pid: параллельные эксперименты не пишут в один файл
+        tmp_path = path.with_name(f'{key}.{os.getpid()}.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'pandas_categorical': dataset.pandas_categorical}, f,
+                      ensure_ascii=False)
+        tmp_path.replace(path.with_suffix('.json'))
+        dataset.save_binary(str(tmp_path))
+        tmp_path.replace(path)
+
+    def load(self, path, target_col, categorical, params) -> lgb.Dataset:
+        """
+        Построенный Dataset для файла path: из кеша или через build_dataset
+        с записью в кеш.
+
+        Args:
+            path: итоговая таблица или матрица .npy
+            target_col: колонка таргета таблицы
+            categorical: категориальные колонки
+            params: параметры модели
+        """
+        key = self.key(path, target_col, categorical, params)
+        dataset = self.get(key, params)
+        if dataset is None:
+            dataset = build_dataset(path, target_col, categorical,
+                                    params).construct()
+            self.put(key, dataset)
+        return dataset
+
+
+def load_dataset(path, target_col, categorical, params,
+                 cache_dir=None) -> lgb.Dataset:
+    """Построенный Dataset для path; с cache_dir — через DatasetCache."""
+    if cache_dir:
+        cache = DatasetCache(cache_dir)
+        return cache.load(path, target_col, categorical, params)
+    return build_dataset(path, target_col, categorical, params).construct()
@@ -1,12 +1,17 @@
-import pandas as pd
 import click
-import joblib
+
+from src.data.artifact_index import index_option
+from src.stage_metrics import metrics_option
 
 
 @click.command()
 @click.argument('model_path', type=click.Path(exists=True))
 @click.argument('data_path', type=click.Path(exists=True))
 @click.argument('output_path', type=click.Path())
+@metrics_option('predict')
+@index_option('predict',
+              inputs=('model_path', 'data_path'),
+              outputs=('output_path',))
 def predict_model(model_path, data_path, output_path):
     """
     Предсказание с использованием обученной LightGBM модели.
@@ -14,16 +19,37 @@ def predict_model(model_path, data_path, output_path):
 
     Args:
         model_path: Путь к сохранённой модели (.joblib)
-        data_path: Путь к готовым данным для предсказания (CSV)
+        data_path: Путь к готовым данным для предсказания (CSV, Parquet,
+            Feather или матрица .npy)
         output_path: Путь для сохранения предсказаний (CSV)
     """
+    # Импорт здесь: joblib, lightgbm (его тянет модель), pandas и pyarrow
+    # не нужны для `courier predict --help`
+    import joblib
+    import pandas as pd
+
+    from src.data.feature_matrix import FeatureMatrix, is_matrix
+    from src.data.storage import read_frame, write_frame
+
     model = joblib.load(model_path)
 
-    X = pd.read_csv(data_path)
+    if is_matrix(data_path):
+        matrix = FeatureMatrix(data_path)
+        # Колонки матрицы передаются по позиции, поэтому порядок должен
+        # совпасть с обучением
+        if model.feature_name() != matrix.columns:
+            raise ValueError(
+                f"Колонки {data_path} не совпадают с признаками модели")
+        X = matrix.X
+    else:
+        X = read_frame(data_path)
+        # Как в train_model: текстовые колонки — категориальные признаки модели
+        for col in X.select_dtypes(include='object').columns:
+            X[col] = X[col].astype('category')
 
     predictions = model.predict(X)
 
-    pd.DataFrame({'prediction': predictions}).to_csv(output_path, index=False)
+    write_frame(pd.DataFrame({'prediction': predictions}), output_path, 'csv')
 
 
 if __name__ == "__main__":
@@ -0,0 +1,421 @@
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import click
+import numpy as np
+import yaml
+
+PROJECT_DIR = Path(__file__).resolve().parents[2]
+
+# Данные процесса-исполнителя: Dataset, фолды и таблица ступеней загружаются
+# один раз на процесс
+_WORKER = {}
+
+
+class TrialPruned(Exception):
+    """Испытание остановлено на ступени: его оценка не в лучшей 1/eta доле."""
+    def __init__(self, rounds, score):
+        super().__init__(f'pruned after {rounds} rounds with score {score}')
+        self.rounds = rounds
+        self.score = score
+
+
+def load_space(path) -> dict:
+    """
+    Пространство поиска из YAML: {параметр: {'type', 'low', 'high', 'log'}
+    или {'type': 'choice', 'values'}}.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        space = yaml.safe_load(f) or {}
+    for name, spec in space.items():
+        if spec.get('type') not in ('float', 'int', 'choice'):
+            raise ValueError(f"Неизвестный тип '{spec.get('type')}' "
+                             f"параметра {name}, "
+                             "ожидается float, int или choice")
+    return space
+
+
+def sample_params(space, rng) -> dict:
+    """Случайные значения параметров из пространства поиска."""
+    params = {}
+    for name, spec in space.items():
+        if spec['type'] == 'choice':
+            params[name] = spec['values'][rng.integers(len(spec['values']))]
+            continue
+        low, high = float(spec['low']), float(spec['high'])
+        if spec.get('log'):
+            value = math.exp(rng.uniform(math.log(low), math.log(high)))
+        else:
+            value = rng.uniform(low, high)
+        params[name] = (int(round(value)) if spec['type'] == 'int'
+                        else float(value))
+    return params
+
+
+def rung_rounds(min_rounds, max_rounds, eta) -> list:
+    """
+    Бюджеты ступеней в итерациях: min_rounds, min_rounds*eta, ... меньше
+    max_rounds.
+    """
+    rounds = []
+    budget = min_rounds
+    while budget < max_rounds:
+        rounds.append(budget)
+        budget *= eta
+    return rounds
+
+
+class RungTable:
+    """
+    Оценки испытаний на ступенях successive halving, общие для всех
+    процессов.
+
+    Испытание проходит ступень, если его лучшая оценка к этой итерации
+    входит в лучшую 1/eta долю оценок, уже записанных на ступени его
+    скобки (асинхронный вариант: решение принимается сразу, без ожидания
+    остальных испытаний). В пуле процессов scores и lock — прокси
+    multiprocessing.Manager.
+
+    Attributes:
+        scores: {'<скобка>:<итерация>': [оценки]}
+        lock: блокировка для записи в scores
+        eta: во сколько раз сокращается число испытаний на каждой ступени
+    """
+    def __init__(self, scores=None, lock=None, eta=3):
+        self.scores = {} if scores is None else scores
+        self.lock = threading.Lock() if lock is None else lock
+        self.eta = eta
+
+    def report(self, bracket, rounds, score, higher_better=False) -> bool:
+        """Записывает оценку испытания; True, если оно проходит ступень."""
+        key = f'{bracket}:{rounds}'
+        with self.lock:
+            values = list(self.scores.get(key, [])) + [score]
+            self.scores[key] = values
+        ranked = sorted(values, reverse=higher_better)
+        threshold = ranked[max(1, len(values) // self.eta) - 1]
+        return score >= threshold if higher_better else score <= threshold
+
+
+def pruning_callback(table, bracket, rungs):
+    """
+    Callback для lgb.cv: на итерациях rungs сообщает таблице лучшую оценку
+    валидации и останавливает испытание (TrialPruned), если она слабая.
+    """
+    rungs = set(rungs)
+    state = {'best': None, 'rounds': 0}
+
+    def _callback(env):
+        name, metric, value, higher_better = env.evaluation_result_list[0][:4]
+        best = state['best']
+        if best is None or (value > best if higher_better else value < best):
+            state['best'] = best = value
+        state['rounds'] = rounds = env.iteration + 1
+        if (rounds in rungs
+                and not table.report(bracket, rounds, best, higher_better)):
+            raise TrialPruned(rounds, best)
+
+    # Раньше ранней остановки (order=30); state — сколько итераций пройдено
+    _callback.order = 20
+    _callback.state = state
+    return _callback
+
+
+def _init_worker(matrix_path, target_col, cat_features, params, cache_dir,
+                 splits, scores, lock, eta) -> None:
+    from src.models.dataset_cache import load_dataset
+
+    _WORKER['dataset'] = load_dataset(matrix_path, target_col, cat_features,
+                                      params, cache_dir=cache_dir)
+    _WORKER['splits'] = splits
+    _WORKER['table'] = RungTable(scores, lock, eta)
+
+
+def _run_trial(trial, bracket, params, rungs, max_rounds,
+               early_stopping_rounds) -> dict:
+    import lightgbm as lgb
+
+    result = {'trial': trial, 'bracket': bracket, 'params': params}
+    pruner = pruning_callback(_WORKER['table'], bracket, rungs)
+    callbacks = [pruner,
+                 lgb.early_stopping(early_stopping_rounds, verbose=False)]
+    try:
+        history = lgb.cv(params, _WORKER['dataset'],
+                         num_boost_round=max_rounds,
+                         folds=_WORKER['splits'], callbacks=callbacks)
+    except TrialPruned as pruned:
+        result.update(status='pruned', score=float(pruned.score),
+                      rounds=pruned.rounds, best_iteration=None)
+        return result
+
+    metric = next(key for key in history if key.endswith('-mean'))
+    values = np.asarray(history[metric])
+    # lgb.cv обрезает историю по лучшей итерации, если сработала ранняя
+    # остановка
+    best = (int(np.argmin(values)) if not _higher_better(metric)
+            else int(np.argmax(values)))
+    result.update(status='complete', score=float(values[best]),
+                  rounds=pruner.state['rounds'], best_iteration=best + 1)
+    return result
+
+
+def _higher_better(metric) -> bool:
+    return any(name in metric
+               for name in ('auc', 'ndcg', 'map', 'average_precision'))
+
+
+def run_trials(matrix_path, base_params, trials, splits, target_col='target',
+               cat_features=(), min_rounds=50, max_rounds=2500, eta=3,
+               early_stopping_rounds=100, cache_dir=None, workers=None):
+    """
+    Запускает испытания successive halving / Hyperband и возвращает их
+    результаты по мере готовности.
+
+    Испытание i попадает в скобку trials[i][1]; скобка b начинает отсев
+    с min_rounds * eta**b итераций (b=0 — ASHA, несколько скобок —
+    Hyperband). Каждое испытание — lgb.cv по фолдам splits на одном
+    построенном Dataset со своей ранней остановкой; слабые испытания
+    останавливает pruning_callback. Испытания идут параллельно в workers
+    процессах с thread_budget(workers) потоками LightGBM в каждом, таблица
+    ступеней общая через Manager.
+
+    Args:
+        matrix_path: матрица .npy с таргетом
+        base_params: параметры построения Dataset (без выбираемых параметров)
+        trials: [(номер, скобка, параметры LightGBM)]
+        splits: [(train_idx, val_idx)]
+        target_col: колонка таргета
+        cat_features: категориальные колонки
+        min_rounds: бюджет первой ступени скобки 0
+        max_rounds: максимум итераций испытания
+        eta: доля 1/eta испытаний проходит каждую ступень
+        early_stopping_rounds: остановка без улучшения на валидации
+        cache_dir: каталог DatasetCache
+        workers: число процессов
+
+    Yields:
+        {'trial', 'bracket', 'params', 'status', 'score', 'rounds',
+         'best_iteration'}
+    """
+    import tempfile
+
+    from src.models.cv import thread_budget, with_threads
+    from src.models.dataset_cache import load_dataset
+
+    workers = workers or min(len(trials), os.cpu_count() or 1)
+    num_threads = thread_budget(workers)
+    dataset_args = (str(matrix_path), target_col, list(cat_features),
+                    with_threads(base_params, num_threads))
+    tasks = [(trial, bracket, with_threads(params, num_threads),
+              rung_rounds(min_rounds * eta ** bracket, max_rounds, eta),
+              max_rounds, early_stopping_rounds)
+             for trial, bracket, params in trials]
+
+    if workers == 1:
+        _init_worker(*dataset_args, cache_dir, splits, None, None, eta)
+        try:
+            for task in tasks:
+                yield _run_trial(*task)
+        finally:
+            _WORKER.clear()
+        return
+
+    context = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory() as tmp_dir, \
+            context.Manager() as manager:
+        # Бины строятся один раз здесь, исполнители только читают их из кеша
+        cache_dir = str(cache_dir or tmp_dir)
+        load_dataset(*dataset_args, cache_dir=cache_dir)
+        init_args = (*dataset_args, cache_dir, splits, manager.dict(),
+                     manager.Lock(), eta)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=_init_worker,
+                                 initargs=init_args) as pool:
+            futures = [pool.submit(_run_trial, *task) for task in tasks]
+            for future in as_completed(futures):
+                yield future.result()
+
+
+def best_trial(results, higher_better=False) -> dict:
+    """
+    Лучшее завершенное испытание (если завершенных нет — лучшее из всех).
+    """
+    complete = [result for result in results
+                if result['status'] == 'complete'] or results
+    if higher_better:
+        return min(complete, key=lambda result: -result['score'])
+    return min(complete, key=lambda result: result['score'])
+
+
+@click.command()
+@click.argument('matrix_path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--config', 'config_path', type=click.Path(exists=True),
+              default=str(PROJECT_DIR / 'configs' / 'lgbm_parameters.yaml'),
+              help='Base LightGBM config; '
+                   'sampled params override its model_params.')
+@click.option('--space', 'space_path', type=click.Path(exists=True),
+              default=str(PROJECT_DIR / 'configs' / 'search_space.yaml'),
+              help='Search space.')
+@click.option('--trials', 'n_trials', type=click.IntRange(min=1), default=40,
+              help='Number of sampled configurations.')
+@click.option('--min-rounds', type=click.IntRange(min=1), default=50,
+              help='Boosting rounds of the first rung.')
+@click.option('--max-rounds', type=click.IntRange(min=1), default=2500,
+              help='Maximum boosting rounds of a trial.')
+@click.option('--eta', type=click.IntRange(min=2), default=3,
+              help='Only 1/eta of the trials pass each rung.')
+@click.option('--brackets', type=click.IntRange(min=1), default=1,
+              help='Hyperband brackets; '
+                   '1 is plain asynchronous successive halving.')
+@click.option('--folds', type=click.IntRange(min=1), default=5,
+              help='Number of week-based CV folds.')
+@click.option('--early-stopping', 'early_stopping_rounds',
+              type=click.IntRange(min=1), default=100,
+              help='Stop a trial after this many rounds without improvement.')
+@click.option('--workers', type=click.IntRange(min=1), default=None,
+              help='Trials run in parallel, the number of CPUs by default.')
+@click.option('--seed', type=int, default=0,
+              help='Random seed of the sampler.')
+@click.option('--dataset-cache', type=click.Path(file_okay=False),
+              default='.dataset_cache',
+              help='Directory of binned LightGBM datasets.')
+@click.option('--tracking-uri',
+              default=f"sqlite:///{PROJECT_DIR / 'mlflow.db'}",
+              help='MLflow tracking URI.')
+@click.option('--experiment', default='courier_deficit_search',
+              help='MLflow experiment.')
+@click.option('--output', type=click.Path(dir_okay=False), default=None,
+              help='Save the config with the best params '
+                   '(and n_estimators) to this YAML file.')
+def run_search(matrix_path,
+               config_path='configs/lgbm_parameters.yaml',
+               space_path='configs/search_space.yaml',
+               n_trials=40,
+               min_rounds=50,
+               max_rounds=2500,
+               eta=3,
+               brackets=1,
+               folds=5,
+               early_stopping_rounds=100,
+               workers=None,
+               seed=0,
+               dataset_cache='.dataset_cache',
+               tracking_uri='sqlite:///mlflow.db',
+               experiment='courier_deficit_search',
+               output=None) -> None:
+    """
+    Tune LightGBM params with successive halving on week-based CV.
+
+    Configurations are sampled from the search space and evaluated with
+    lgb.cv on the feature matrix (drop-features --train-matrix). At rungs of
+    min-rounds * eta^k rounds a trial is pruned unless it is in the best
+    1/eta of the trials that reached the rung; with --brackets > 1 the
+    trials are spread over Hyperband brackets with later first rungs.
+    Trials run in parallel, every trial is logged to MLflow as a nested
+    run of one search run.
+
+    Args:
+        matrix_path: feature matrix with target and weeks
+        config_path: base LightGBM config
+        space_path: search space YAML
+        n_trials: number of configurations
+        min_rounds: boosting rounds of the first rung
+        max_rounds: maximum boosting rounds
+        eta: reduction factor of successive halving
+        brackets: number of Hyperband brackets
+        folds: number of CV folds
+        early_stopping_rounds: early stopping of a trial
+        workers: number of parallel trials
+        seed: random seed
+        dataset_cache: directory of DatasetCache
+        tracking_uri: MLflow tracking URI
+        experiment: MLflow experiment name
+        output: path of the YAML config with the best params
+    """
+    import mlflow
+
+    from src.data.feature_matrix import FeatureMatrix
+    from src.models.cv import ITERATION_PARAMS, week_splits
+
+    with open(config_path, 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+    model_params = config.get('model_params', {})
+    # Один Dataset на все испытания: без предварительного отбора признаков
+    # min_child_samples можно менять у уже построенного Dataset
+    base_params = {name: value for name, value in model_params.items()
+                   if name not in ITERATION_PARAMS}
+    base_params['feature_pre_filter'] = False
+
+    matrix = FeatureMatrix(matrix_path)
+    splits = week_splits(matrix.time, n_splits=folds)
+    cat_features = matrix.categorical_features(
+        config.get('categorical_features', []))
+    space = load_space(space_path)
+    rng = np.random.default_rng(seed)
+    trials = [(trial, trial % brackets,
+               {**base_params, **sample_params(space, rng)})
+              for trial in range(n_trials)]
+
+    mlflow.set_tracking_uri(tracking_uri)
+    mlflow.set_experiment(experiment)
+    results = []
+    with mlflow.start_run(run_name='lgbm_search'):
+        mlflow.log_params({'trials': n_trials, 'min_rounds': min_rounds,
+                           'max_rounds': max_rounds, 'eta': eta,
+                           'brackets': brackets, 'folds': folds,
+                           'early_stopping': early_stopping_rounds,
+                           'seed': seed})
+        for result in run_trials(matrix_path, base_params, trials, splits,
+                                 target_col=matrix.target_col,
+                                 cat_features=cat_features,
+                                 min_rounds=min_rounds,
+                                 max_rounds=max_rounds, eta=eta,
+                                 early_stopping_rounds=early_stopping_rounds,
+                                 cache_dir=dataset_cache, workers=workers):
+            results.append(result)
+            sampled = {name: result['params'][name] for name in space}
+            with mlflow.start_run(run_name=f"trial_{result['trial']}",
+                                  nested=True):
+                mlflow.log_params({**sampled, 'bracket': result['bracket']})
+                mlflow.log_metrics({'cv_score': result['score'],
+                                    'rounds': result['rounds']})
+                if result['best_iteration']:
+                    mlflow.log_metric('best_iteration',
+                                      result['best_iteration'])
+                mlflow.set_tag('status', result['status'])
+            click.echo(f"trial {result['trial']:>3} "
+                       f"bracket {result['bracket']} "
+                       f"{result['status']:<8} "
+                       f"rounds {result['rounds']:>5} "
+                       f"score {result['score']:.4f}")
+
+        best = best_trial(results)
+        best_params = {name: best['params'][name] for name in space}
+        pruned = sum(result['status'] == 'pruned' for result in results)
+        mlflow.log_metrics({'best_cv_score': best['score'],
+                            'pruned_trials': pruned})
+        mlflow.log_params({f'best_{name}': value
+                           for name, value in best_params.items()})
+
+    click.echo(f"Лучшее испытание {best['trial']}: "
+               f"score {best['score']:.4f}, "
+               f"остановлено на ступенях {pruned} из {len(results)}")
+    click.echo(yaml.safe_dump(best_params, allow_unicode=True,
+                              sort_keys=False))
+    if output:
+        model_params = {**model_params, **best_params}
+        if best['best_iteration']:
+            model_params['n_estimators'] = best['best_iteration']
+        Path(output).parent.mkdir(parents=True, exist_ok=True)
+        with open(output, 'w', encoding='utf-8') as f:
+            yaml.safe_dump({**config, 'model_params': model_params}, f,
+                           allow_unicode=True, sort_keys=False)
+        click.echo(f'Конфиг: {output}')
+
+
+if __name__ == "__main__":
+    run_search()
@@ -1,24 +1,87 @@
-import pandas as pd
 import click
 import yaml
-import joblib
-import lightgbm as lgb
 from pathlib import Path
 
+from src.data.artifact_index import index_option
+from src.stage_metrics import metrics_option
+
 
 @click.command()
 @click.argument('dataset_path', type=click.Path(exists=True))
 @click.argument('model_output_path', type=click.Path())
 @click.argument('config_path', type=click.Path(exists=True))
-def train_lgbm_model(dataset_path, model_output_path, config_path):
+@click.option('--dataset-cache', type=click.Path(file_okay=False),
+              default=None,
+              help='Directory of binned LightGBM datasets; the data is '
+                   'binned only once per file and params.')
+@click.option('--init-model', type=click.Path(exists=True, dir_okay=False),
+              default=None,
+              help="Last week's model to warm start from; needs a .npy "
+                   "matrix with row weeks.")
+@click.option('--warm-start', 'warm_mode',
+              type=click.Choice(['continue', 'refit']), default='continue',
+              help='continue: add --warm-rounds trees to the model; '
+                   'refit: refit the leaf values of its trees.')
+@click.option('--warm-weeks', type=click.IntRange(min=1), default=4,
+              help='Warm start on the rows of the last this many weeks only: '
+                   'the old model has to predict every row it is warm '
+                   'started on.')
+@click.option('--warm-rounds', type=click.IntRange(min=1), default=200,
+              help='Boosting rounds added by --warm-start continue.')
+@click.option('--refit-decay', type=click.FloatRange(0, 1), default=0.9,
+              help='Weight of the old leaf values in --warm-start refit.')
+@click.option('--guard-tolerance', type=click.FloatRange(min=0), default=0.05,
+              help='Retrain from scratch if the RMSE on the new weeks is '
+                   'worse than the reference of the last full retrain by '
+                   'more than this share.')
+@click.option('--drift-threshold', type=click.FloatRange(min=0), default=0.5,
+              help='Retrain from scratch if a feature or target mean of the '
+                   'new weeks moved by more than this many stds of the last '
+                   'full retrain.')
+@metrics_option('train')
+@index_option('train',
+              inputs=('dataset_path', 'config_path', 'init_model'),
+              outputs=('model_output_path',))
+def train_lgbm_model(dataset_path, model_output_path, config_path,
+                     dataset_cache=None, init_model=None, warm_mode='continue',
+                     warm_weeks=4, warm_rounds=200, refit_decay=0.9,
+                     guard_tolerance=0.05, drift_threshold=0.5):
     """
     Обучение LightGBM модели.
 
+    С --init-model прошлая модель дообучается на последних неделях матрицы
+    (init_model LightGBM или refit листьев), если ее ошибка на новых
+    неделях не хуже эталона полного переобучения и нет дрейфа признаков;
+    иначе модель обучается заново. Решение и эталон пишутся в секцию
+    retrain файла info.yaml.
+
     Args:
-        dataset_path: Путь к обучающему датасету (CSV)
+        dataset_path: Путь к обучающему датасету (CSV, Parquet, Feather или
+            матрица .npy)
         model_output_path: Путь для сохранения модели
         config_path: Путь к YAML файлу с параметрами модели
+        dataset_cache: Каталог кеша построенных lgb.Dataset
+        init_model: Прошлая модель для дообучения
+        warm_mode: continue — добавить деревья, refit — пересчитать значения
+            листьев
+        warm_weeks: Число последних недель, на которых модель дообучается
+        warm_rounds: Число добавляемых деревьев
+        refit_decay: Вес старых значений листьев при refit
+        guard_tolerance: Допустимое ухудшение RMSE относительно эталона
+        drift_threshold: Порог дрейфа средних в std
     """
+    # lightgbm, joblib и pandas импортируются здесь: `courier train --help`
+    # не ждет их загрузки
+    import joblib
+    import lightgbm as lgb
+    import pandas as pd
+
+    from src.data.feature_matrix import FeatureMatrix, is_matrix
+    from src.models.dataset_cache import load_dataset
+    from src.models.warm_start import (plan_retrain, previous_retrain,
+                                       recent_rows, retrain_info,
+                                       validate_candidate, validation_rows)
+
     # Загрузка конфигурации из YAML
     with open(config_path, 'r') as f:
         config = yaml.safe_load(f)
@@ -28,32 +91,63 @@ def train_lgbm_model(dataset_path, model_output_path, config_path):
     target_col = config.get('target_col', 'target')
     cat_features = config.get('categorical_features', [])
 
-    # Загрузка данных
-    df = pd.read_csv(dataset_path)
-
-    # Проверка наличия таргета
-    if target_col not in df.columns:
-        raise ValueError(f"Целевая переменная '{target_col}' не найдена в данных")
-
-    # Подготовка данных
-    X = df.drop(columns=[target_col])
-    y = df[target_col]
-
-    for col in cat_features:
-        if col in X.columns:
-            X[col] = X[col].astype('category')
-
-    train_data = lgb.Dataset(
-        X,
-        label=y,
-        categorical_feature=cat_features
-    )
-
-    model = lgb.train(
-        model_params,
-        train_data,
-        num_boost_round=2500,
-    )
+    # Недели строк матрицы нужны для дообучения и для его эталона
+    matrix = FeatureMatrix(dataset_path) if is_matrix(dataset_path) else None
+    if init_model and (matrix is None or matrix.time is None):
+        raise click.ClickException("--init-model требует матрицу .npy с "
+                                   "неделями строк (drop_features.time_col)")
+
+    mode, plan, previous, rows = 'full', None, None, None
+    if init_model:
+        previous_model = joblib.load(init_model)
+        previous = previous_retrain(init_model)
+        try:
+            plan = plan_retrain(matrix, previous_model, previous,
+                                guard_tolerance, drift_threshold)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        warm = dict(mode=warm_mode, previous_model=previous_model,
+                    matrix=matrix, dataset_path=dataset_path,
+                    target_col=target_col, cat_features=cat_features,
+                    model_params=model_params, warm_rounds=warm_rounds,
+                    refit_decay=refit_decay)
+        if not plan['full']:
+            # Кандидат дообучается без последней недели и проверяется на ней
+            fit_rows, holdout_rows = validation_rows(matrix, warm_weeks)
+            candidate = (_warm_model(rows=fit_rows, **warm) if len(fit_rows)
+                         else None)
+            plan = validate_candidate(plan, matrix, candidate, holdout_rows,
+                                      guard_tolerance)
+        if plan['full']:
+            print(f"Полное переобучение: {plan['reason']}")
+        else:
+            mode = warm_mode
+            # Прогноз прошлой модели по всем строкам дороже нового обучения,
+            # поэтому дообучение идет только на последних неделях
+            rows = recent_rows(matrix, warm_weeks)
+
+    if mode == 'full':
+        # Таблица или матрица .npy, с --dataset-cache бины читаются из кеша
+        train_data = load_dataset(dataset_path, target_col, cat_features,
+                                  model_params, cache_dir=dataset_cache)
+
+        model = lgb.train(
+            model_params,
+            train_data,
+            num_boost_round=2500,
+        )
+        y = pd.Series(train_data.get_label(), name=target_col,
+                      dtype='float64')
+        shape = (train_data.num_data(), train_data.num_feature())
+    else:
+        model = _warm_model(rows=rows, **warm)
+        y = pd.Series(matrix.target[rows], name=target_col, dtype='float64')
+        shape = (len(rows), len(matrix.columns))
+        print(f"Дообучение ({mode}) на {len(rows)} строках: RMSE на новых "
+              f"неделях {plan['holdout']['rmse']:.4f}, кандидата на "
+              f"отложенной неделе {plan['validation']['rmse']:.4f}, "
+              f"эталон {plan['reference_rmse']:.4f}, "
+              f"дрейф {plan['holdout']['drift']:.3f}")
 
     joblib.dump(model, model_output_path, compress=3)
 
@@ -61,11 +155,15 @@ def train_lgbm_model(dataset_path, model_output_path, config_path):
     model_info = _get_model_info(
         model_params,
         dataset_path,
-        X,
+        shape,
         y,
         target_col,
         cat_features
     )
+    if matrix is not None and matrix.time is not None:
+        model_info['retrain'] = retrain_info(
+            matrix, mode, plan, previous, init_model,
+            None if rows is None else len(rows))
 
     info_path = Path(model_output_path).with_suffix('.info.yaml')
     with open(info_path, 'w') as f:
@@ -76,12 +174,42 @@ def train_lgbm_model(dataset_path, model_output_path, config_path):
     print(f"Среднее целевой переменной: {y.mean():.2f}")
 
 
+def _warm_model(mode, previous_model, matrix, dataset_path, rows, target_col,
+                cat_features, model_params, warm_rounds, refit_decay):
+    """Прошлая модель, дообученная на строках rows (continue или refit)."""
+    import lightgbm as lgb
+
+    from src.models.cv import ITERATION_PARAMS
+    from src.models.dataset_cache import build_dataset
+
+    if mode == 'continue':
+        # Dataset строится без кеша: init_score считается прогнозом прошлой
+        # модели по исходным данным, а у Dataset из кеша их нет
+        warm_params = {name: value for name, value in model_params.items()
+                       if name not in ITERATION_PARAMS}
+        return lgb.train(
+            warm_params,
+            build_dataset(dataset_path, target_col, cat_features, warm_params,
+                          rows=rows),
+            num_boost_round=warm_rounds,
+            init_model=previous_model,
+        )
+    # Категориальные колонки refit берет из параметров прошлой модели
+    model = previous_model.refit(matrix.X[rows], matrix.target[rows],
+                                 decay_rate=refit_decay,
+                                 feature_name=matrix.columns)
+    model.pandas_categorical = previous_model.pandas_categorical
+    return model
+
+
 def _get_model_info(model_params,
                     dataset_path,
-                    X_train,
+                    shape,
                     y_train,
                     target_col,
                     cat_features) -> dict:
+    import pandas as pd
+
     model_info: dict = {
         'model': {
             'type': 'LightGBM',
@@ -89,7 +217,7 @@ def _get_model_info(model_params,
         },
         'data': {
             'source': dataset_path,
-            'shape': list(X_train.shape),
+            'shape': list(shape),
             'target': target_col,
             'categorical_features': cat_features
         },
@@ -0,0 +1,195 @@
+import warnings
+from pathlib import Path
+
+import numpy as np
+import yaml
+
+
+def previous_retrain(model_path) -> dict:
+    """Секция retrain из info.yaml модели; пустая, если ее там нет."""
+    info_path = Path(model_path).with_suffix('.info.yaml')
+    if not info_path.exists():
+        return {}
+    with open(info_path, 'r', encoding='utf-8') as f:
+        info = yaml.safe_load(f) or {}
+    return info.get('retrain') or {}
+
+
+def rmse(y_true, y_pred) -> float:
+    errors = np.asarray(y_true) - np.asarray(y_pred)
+    return float(np.sqrt(np.mean(errors ** 2)))
+
+
+def column_stats(matrix, rows=None) -> dict:
+    """
+    Среднее и std числовых признаков и таргета матрицы (по строкам rows):
+    {колонка: [mean, std]}.
+    """
+    names = [name for name in matrix.columns if name not in matrix.categories]
+    X, target = matrix.X, matrix.target
+    if rows is not None:
+        X, target = X[rows], target[rows]
+    positions = [matrix.columns.index(name) for name in names]
+    values = np.asarray(X[:, positions], dtype=np.float64)
+    target = np.asarray(target, dtype=np.float64)
+    # Полностью пустая колонка дает NaN, а не ошибку
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        means, stds = np.nanmean(values, axis=0), np.nanstd(values, axis=0)
+    stats = {name: [float(mean), float(std)]
+             for name, mean, std in zip(names, means, stds)}
+    stats[matrix.target_col] = [float(target.mean()), float(target.std())]
+    return stats
+
+
+def drift_score(reference, stats) -> float:
+    """Наибольший сдвиг среднего колонки относительно эталона в его std."""
+    shifts = [abs(stats[name][0] - mean) / std
+              for name, (mean, std) in reference.items()
+              if name in stats and np.isfinite(stats[name][0])
+              and np.isfinite(mean) and std > 0]
+    return float(max(shifts, default=0.0))
+
+
+def recent_rows(matrix, weeks) -> np.ndarray:
+    """Номера строк последних weeks недель матрицы."""
+    unique = np.unique(matrix.time)
+    return np.flatnonzero(matrix.time >= unique[max(0, len(unique) - weeks)])
+
+
+def plan_retrain(matrix, model, previous, tolerance=0.05,
+                 drift_threshold=0.5) -> dict:
+    """
+    Решает, можно ли дообучить прошлую модель или нужно полное переобучение.
+
+    Новые строки — недели матрицы после last_week прошлой модели: модель их
+    не видела, поэтому ее RMSE на них — честная ошибка на отложенной выборке.
+    Эталон — такая же ошибка модели последнего полного переобучения на
+    первой неделе после него (пока модель полная, эталоном становится
+    текущая ошибка). Полное переобучение нужно, если ошибка хуже эталона
+    больше чем на tolerance или если средние признаков или таргета новых
+    строк сдвинулись относительно полного переобучения больше чем на
+    drift_threshold его std.
+
+    Args:
+        matrix: FeatureMatrix с неделями строк
+        model: прошлая модель
+        previous: секция retrain из info.yaml прошлой модели
+        tolerance: допустимое ухудшение RMSE относительно эталона (доля)
+        drift_threshold: порог дрейфа
+
+    Returns:
+        {'full': bool, 'reason': str или None,
+         'holdout': {'rows', 'rmse', 'drift'} или None,
+         'reference_rmse': эталонная ошибка или None}
+    """
+    if matrix.time is None:
+        raise ValueError("Для дообучения нужна матрица с неделями строк "
+                         "(drop_features.time_col)")
+    if not previous:
+        return {'full': True,
+                'reason': 'у прошлой модели нет истории переобучения',
+                'holdout': None, 'reference_rmse': None}
+
+    last_week = np.datetime64(previous['last_week'], 'D')
+    rows = np.flatnonzero(matrix.time > last_week)
+    if not len(rows):
+        raise ValueError("В матрице нет недель после "
+                         f"{previous['last_week']}, до которой обучена "
+                         "прошлая модель")
+    holdout_rmse = rmse(matrix.target[rows], model.predict(matrix.X[rows]))
+    drift = drift_score(previous['reference']['stats'],
+                        column_stats(matrix, rows))
+    reference = previous['reference']['rmse']
+    if reference is None:
+        reference = holdout_rmse
+
+    reason = None
+    if drift > drift_threshold:
+        reason = f'дрейф {drift:.3f} выше порога {drift_threshold}'
+    elif holdout_rmse > reference * (1 + tolerance):
+        reason = (f'RMSE на новых неделях {holdout_rmse:.4f} хуже эталона '
+                  f'{reference:.4f} больше чем на {tolerance:.0%}')
+    return {'full': reason is not None, 'reason': reason,
+            'holdout': {'rows': int(len(rows)), 'rmse': holdout_rmse,
+                        'drift': drift},
+            'reference_rmse': reference}
+
+
+def validation_rows(matrix, weeks) -> tuple:
+    """
+    Строки проверки дообучения: последняя неделя матрицы откладывается,
+    а модель-кандидат дообучается на weeks неделях перед ней.
+
+    Returns:
+        (номера строк дообучения, номера строк отложенной недели)
+    """
+    unique = np.unique(matrix.time)
+    last = unique[-1]
+    first = unique[max(0, len(unique) - 1 - weeks)]
+    fit = np.flatnonzero((matrix.time < last) & (matrix.time >= first))
+    return fit, np.flatnonzero(matrix.time == last)
+
+
+def validate_candidate(plan, matrix, model, rows, tolerance=0.05) -> dict:
+    """
+    Проверяет дообученную модель-кандидата на отложенной неделе.
+
+    Кандидат должен быть не хуже эталона полного переобучения больше чем
+    на tolerance, иначе нужно полное переобучение.
+
+    Args:
+        plan: результат plan_retrain без полного переобучения
+        matrix: FeatureMatrix с неделями строк
+        model: кандидат или None, если дообучать не на чем
+        rows: строки отложенной недели
+        tolerance: допустимое ухудшение RMSE относительно эталона (доля)
+
+    Returns:
+        plan с 'validation': {'rows', 'rmse'} или None и новым решением
+    """
+    if model is None:
+        return {**plan, 'full': True, 'validation': None,
+                'reason': 'нет недель для проверки дообученной модели'}
+    score = rmse(matrix.target[rows], model.predict(matrix.X[rows]))
+    validation = {'rows': int(len(rows)), 'rmse': score}
+    reference = plan['reference_rmse']
+    if score > reference * (1 + tolerance):
+        reason = (f'RMSE дообученной модели на отложенной неделе '
+                  f'{score:.4f} хуже эталона {reference:.4f} '
+                  f'больше чем на {tolerance:.0%}')
+        return {**plan, 'full': True, 'reason': reason,
+                'validation': validation}
+    return {**plan, 'validation': validation}
+
+
+def retrain_info(matrix, mode, plan=None, previous=None, init_model=None,
+                 rows=None) -> dict:
+    """
+    Секция retrain для info.yaml новой модели.
+
+    После полного переобучения эталоном становятся статистики всей матрицы,
+    эталонная ошибка измеряется при следующем дообучении; дообученная
+    модель наследует эталон прошлой. rows — число строк, на которых
+    модель дообучалась.
+    """
+    plan = plan or {}
+    last_week = str(matrix.time.max())
+    if mode == 'full':
+        reference = {'week': last_week, 'rmse': None,
+                     'stats': column_stats(matrix)}
+        warm_starts = 0
+    else:
+        reference = {**previous['reference'], 'rmse': plan['reference_rmse']}
+        warm_starts = previous.get('warm_starts', 0) + 1
+    return {
+        'mode': mode,
+        'reason': plan.get('reason'),
+        'init_model': str(init_model) if init_model else None,
+        'last_week': last_week,
+        'warm_starts': warm_starts,
+        'rows': int(len(matrix) if rows is None else rows),
+        'holdout': plan.get('holdout'),
+        'validation': plan.get('validation'),
+        'reference': reference,
+    }
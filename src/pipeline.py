@@ -0,0 +1,223 @@
+from pathlib import Path
+
+import click
+import yaml
+
+from src.data.artifact_index import index_option
+from src.data.drop_features import drop_columns, row_time
+from src.data.fact_index import FactIndex
+from src.data.feature_matrix import matrix_categories, write_matrix
+from src.data.merge_data import (TEST_DATE, lag_options, merge_test,
+                                 merge_train)
+from src.data.nan_filling import fill_train, load_or_fit_filler
+from src.data.projection import dead_columns, prune, read_exclude
+from src.data.schema import load_schema
+from src.data.storage import FORMATS, read_frame, write_frame
+from src.features.build_features import add_features, load_rolling
+from src.features.cache import FeatureCache
+from src.features.registry import FeaturePlan, requested_features
+from src.stage_metrics import metrics_option
+
+
+@click.command()
+@click.argument('facts_filepath', type=click.Path(exists=True))
+@click.argument('shifts_filepath', type=click.Path(exists=True))
+@click.argument('train_filepath', type=click.Path(exists=True))
+@click.argument('test_filepath', type=click.Path())
+@click.argument('train_output_path', type=click.Path())
+@click.argument('test_output_path', type=click.Path())
+@click.argument('params_file', type=click.Path(exists=True))
+@click.option('--filler-path', type=click.Path(), default=None,
+              help='Already fitted NanFiller. '
+                   'A new one is fitted if it does not exist.')
+@click.option('--filler-output-path', type=click.Path(), default=None,
+              help='Where to save a newly fitted NanFiller.')
+@click.option('--rolling-state', type=click.Path(), default=None,
+              help='Rolling history saved by a previous run. '
+                   'Ignored if it does not exist.')
+@click.option('--rolling-state-output', type=click.Path(), default=None,
+              help='Where to save the rolling history after the train data.')
+@click.option('--feature-cache', type=click.Path(file_okay=False),
+              default=None,
+              help='Directory of cached feature columns; '
+                   'only changed features are recomputed.')
+@click.option('--interim-dir', type=click.Path(file_okay=False),
+              default=None,
+              help='Also save intermediate artifacts of every stage '
+                   'to this directory.')
+@click.option('--interim-format', type=click.Choice(FORMATS),
+              default='parquet',
+              help='Format of the intermediate artifacts.')
+@click.option('--format', 'fmt', type=click.Choice(FORMATS), default=None,
+              help='Output format. '
+                   'By default it is taken from the file extension.')
+@click.option('--train-matrix', type=click.Path(dir_okay=False),
+              default=None,
+              help='Also save the train features as a memory-mapped '
+                   'float32 .npy matrix.')
+@click.option('--test-matrix', type=click.Path(dir_okay=False),
+              default=None,
+              help='Also save the test features as a .npy matrix '
+                   'with the train categories.')
+@metrics_option('pipeline')
+@index_option('pipeline',
+              inputs=('facts_filepath', 'shifts_filepath', 'train_filepath',
+                      'test_filepath', 'params_file', 'filler_path',
+                      'rolling_state'),
+              outputs=('train_output_path', 'test_output_path',
+                       'filler_output_path', 'rolling_state_output',
+                       'train_matrix', 'test_matrix'))
+def run_pipeline(facts_filepath,
+                 shifts_filepath,
+                 train_filepath,
+                 test_filepath,
+                 train_output_path,
+                 test_output_path,
+                 params_file,
+                 filler_path=None,
+                 filler_output_path=None,
+                 rolling_state=None,
+                 rolling_state_output=None,
+                 feature_cache=None,
+                 interim_dir=None,
+                 interim_format='parquet',
+                 fmt=None,
+                 train_matrix=None,
+                 test_matrix=None) -> None:
+    """
+    Runs merge-data, fill-nan, build-features and drop-features in one
+    process.
+
+    Stages exchange in-memory DataFrames, intermediate files are written only
+    when --interim-dir is given. The final outputs are the same as the ones
+    produced by the DVC stages.
+
+    Args:
+        facts_filepath: real data for the PREVIOUS week
+        shifts_filepath: forecast for the CURRENT week
+        train_filepath: target - shortage of couriers for the CURRENT week
+        test_filepath: stores to forecast (optional)
+        train_output_path: path to save the final train data
+        test_output_path: path to save the final test data
+        params_file: path to yaml file with parameters of the stages
+        filler_path: path to an already fitted NanFiller
+        filler_output_path: path where a newly fitted NanFiller will be saved
+        rolling_state: rolling history of the previous run to continue from
+        rolling_state_output: path to save the rolling history for the next
+            run
+        feature_cache: directory of the per-feature cache
+        interim_dir: directory for intermediate artifacts
+        interim_format: format of intermediate artifacts
+        fmt: output format (csv, parquet or feather)
+        train_matrix: path to save the train features as a .npy matrix
+        test_matrix: path to save the test features as a .npy matrix
+    """
+    with open(params_file, 'r', encoding='utf-8') as f:
+        params = yaml.safe_load(f)
+
+    save_interim = _interim_writer(interim_dir, interim_format)
+    # Колонки из drop_features.cols удаляются сразу после последнего этапа,
+    # который их читает
+    dead = {stage: dead_columns(params, stage)
+            for stage in ('merge_data', 'fill_nan', 'build_features')}
+
+    train_df, test_df = _merge(params, dead['merge_data'], facts_filepath,
+                               shifts_filepath, train_filepath,
+                               test_filepath, save_interim)
+    train_df, test_df = _fill(params, dead['fill_nan'], train_df, test_df,
+                              filler_path, filler_output_path, save_interim)
+    train_df, test_df = _build(params, dead['build_features'], train_df,
+                               test_df, rolling_state, rolling_state_output,
+                               feature_cache, save_interim)
+    _drop(params, train_df, test_df, train_output_path, test_output_path,
+          fmt, train_matrix, test_matrix)
+
+
+def _interim_writer(interim_dir, interim_format):
+    """Saves an intermediate artifact if interim_dir is given."""
+    def save_interim(df, name):
+        if interim_dir:
+            Path(interim_dir).mkdir(parents=True, exist_ok=True)
+            path = Path(interim_dir) / f'{name}.{interim_format}'
+            write_frame(df, path, interim_format)
+    return save_interim
+
+
+def _merge(params, dead, facts_filepath, shifts_filepath, train_filepath,
+           test_filepath, save_interim) -> tuple:
+    """merge-data: train and test (None without test_filepath)."""
+    schema = load_schema(params)
+    skip = read_exclude(params, 'merge_data')
+    fact_index = FactIndex(read_frame(facts_filepath, schema=schema,
+                                      exclude=skip))
+    shifts_df = read_frame(shifts_filepath, schema=schema, exclude=skip)
+    lag_params = lag_options(params)
+
+    train_df = merge_train(
+        read_frame(train_filepath, schema=schema, exclude=skip),
+        fact_index, shifts_df, exclude=dead, **lag_params)
+    save_interim(train_df, 'train_merged')
+    test_df = None
+    if test_filepath:
+        test_date = params.get('merge_data', {}).get('test_date', TEST_DATE)
+        test_df = merge_test(
+            read_frame(test_filepath, schema=schema, exclude=skip),
+            fact_index, shifts_df, test_date, exclude=dead, **lag_params)
+        save_interim(test_df, 'test_merged')
+    return train_df, test_df
+
+
+def _fill(params, dead, train_df, test_df, filler_path, filler_output_path,
+          save_interim) -> tuple:
+    """fill-nan: the filler is fitted on train (or loaded) and applied."""
+    filler = load_or_fit_filler(train_df, params, filler_path,
+                                filler_output_path)
+    train_df = prune(fill_train(filler, train_df, inplace=True), dead)
+    save_interim(train_df, 'train_filled')
+    if test_df is not None:
+        test_df = prune(filler.transform(test_df, inplace=True), dead)
+        save_interim(test_df, 'test_filled')
+    return train_df, test_df
+
+
+def _build(params, dead, train_df, test_df, rolling_state,
+           rolling_state_output, feature_cache, save_interim) -> tuple:
+    """build-features: test continues the rolling history of train."""
+    plan = FeaturePlan(requested_features(params))
+    rolling = load_rolling(params, rolling_state)
+    cache = FeatureCache(feature_cache) if feature_cache else None
+    train_df = prune(add_features(train_df, plan, rolling, cache=cache),
+                     dead)
+    save_interim(train_df, 'train_features')
+    if rolling and rolling_state_output:
+        rolling.save_state(rolling_state_output)
+    if test_df is not None:
+        test_df = prune(add_features(test_df, plan, rolling,
+                                     update_rolling=False, cache=cache),
+                        dead)
+        save_interim(test_df, 'test_features')
+    return train_df, test_df
+
+
+def _drop(params, train_df, test_df, train_output_path, test_output_path,
+          fmt, train_matrix, test_matrix) -> None:
+    """drop-features: writes the final outputs and the .npy matrices."""
+    drop_cols = params['drop_features']['cols']
+    time_col = params['drop_features'].get('time_col')
+    train_time = row_time(train_df, time_col if train_matrix else None)
+    write_frame(drop_columns(train_df, drop_cols), train_output_path, fmt)
+    categories = (matrix_categories(train_df)
+                  if train_matrix or test_matrix else None)
+    if train_matrix:
+        write_matrix(train_df, train_matrix, categories=categories,
+                     time=train_time)
+    if test_df is not None:
+        drop_columns(test_df, drop_cols)
+        if test_output_path:
+            write_frame(test_df, test_output_path, fmt)
+        if test_matrix:
+            write_matrix(test_df, test_matrix, categories=categories)
+
+
+if __name__ == "__main__":
+    run_pipeline()
@@ -0,0 +1,159 @@
+import functools
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import click
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Открытые замеры; storage сообщает им о прочитанных и записанных файлах
+_ACTIVE = []
+
+
+def peak_rss_mb():
+    """Пиковый RSS процесса в мегабайтах или None без модуля resource."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # В Linux ru_maxrss в килобайтах, в macOS — в байтах
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+
+
+def _file_size(path) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def record_read(path, rows) -> None:
+    """Учитывает полное чтение файла path во всех открытых замерах."""
+    for metrics in _ACTIVE:
+        metrics._record(metrics.inputs, path, rows)
+
+
+def record_write(path, rows) -> None:
+    """Учитывает запись файла path во всех открытых замерах."""
+    for metrics in _ACTIVE:
+        metrics._record(metrics.outputs, path, rows)
+
+
+def measuring() -> bool:
+    """Открыт ли хотя бы один замер."""
+    return bool(_ACTIVE)
+
+
+def record_memory(path, before, after) -> None:
+    """Учитывает размер файла path в памяти до и после приведения к схеме."""
+    for metrics in _ACTIVE:
+        metrics.memory[str(path)] = {'before': round(before, 2),
+                                     'after': round(after, 2)}
+
+
+class StageMetrics:
+    """
+    Замер одного этапа пайплайна: время, память и объем данных.
+
+    Используется как контекстный менеджер. Пока он открыт, read_frame,
+    iter_frames, write_frame и FrameWriter сообщают ему число строк и
+    размер каждого прочитанного и записанного файла. Если один файл
+    читается несколько раз (обучение и заполнение кусками), строки и байты
+    считаются один раз, а число проходов — в passes. Размеры берутся при
+    выходе; временные файлы, которых к этому моменту уже нет (бакеты
+    --partitions), в отчет не попадают.
+
+    Attributes:
+        stage (str): имя этапа
+        path (Path): куда записать JSON при выходе, None — не записывать
+        inputs (dict): {файл: {'rows', 'bytes', 'passes'}}
+        outputs (dict): {файл: {'rows', 'bytes', 'passes'}}
+        memory (dict): {файл: {'before', 'after'}} — МБ в памяти до и после
+            приведения к схеме (только файлы, которые пришлось приводить)
+        result (dict): итоговые метрики после выхода
+    """
+    def __init__(self, stage, path=None):
+        self.stage = stage
+        self.path = Path(path) if path else None
+        self.inputs = {}
+        self.outputs = {}
+        self.memory = {}
+        self.result = None
+
+    @staticmethod
+    def _record(files, path, rows) -> None:
+        entry = files.setdefault(str(path),
+                                 {'rows': 0, 'bytes': 0, 'passes': 0})
+        entry['rows'] = max(entry['rows'], int(rows))
+        entry['passes'] += 1
+
+    @staticmethod
+    def _finalize(files) -> dict:
+        result = {}
+        for path, entry in files.items():
+            if os.path.exists(path):
+                result[path] = dict(entry, bytes=_file_size(path))
+        return result
+
+    def __enter__(self):
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        _ACTIVE.append(self)
+        return self
+
+    def __exit__(self, *exc):
+        _ACTIVE.remove(self)
+        self.inputs = self._finalize(self.inputs)
+        self.outputs = self._finalize(self.outputs)
+        peak = peak_rss_mb()
+        self.result = {
+            'stage': self.stage,
+            'wall_seconds': round(time.perf_counter() - self._wall, 3),
+            'cpu_seconds': round(time.process_time() - self._cpu, 3),
+            'peak_rss_mb': None if peak is None else round(peak, 1),
+            'rows_read': sum(f['rows'] for f in self.inputs.values()),
+            'rows_written': sum(f['rows'] for f in self.outputs.values()),
+            'bytes_read': sum(f['bytes'] for f in self.inputs.values()),
+            'bytes_written': sum(f['bytes'] for f in self.outputs.values()),
+            'inputs': self.inputs,
+            'outputs': self.outputs,
+            'schema_memory_mb': self.memory,
+        }
+        # Упавший этап не перезаписывает метрики последнего успешного запуска
+        if self.path and exc[0] is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump(self.result, f, indent=2)
+        return False
+
+
+def metrics_option(stage):
+    """
+    Добавляет click-команде опцию --metrics и замер StageMetrics всего ее тела.
+
+    После команды печатается размер в памяти входов, приведенных к схеме.
+
+    Args:
+        stage: имя этапа в отчете
+    """
+    def decorator(command):
+        @functools.wraps(command)
+        def wrapper(*args, metrics=None, **kwargs):
+            with StageMetrics(stage, metrics) as measured:
+                result = command(*args, **kwargs)
+            for path, size in measured.memory.items():
+                click.echo(f"{Path(path).name}: {size['before']:.2f} MB -> "
+                           f"{size['after']:.2f} MB")
+            return result
+
+        option = click.option(
+            '--metrics', type=click.Path(dir_okay=False), default=None,
+            help='Write wall/CPU time, peak memory, rows and bytes '
+                 'read and written by the stage to this JSON file.')
+        return option(wrapper)
+    return decorator
@@ -0,0 +1,113 @@
+import json
+import pandas as pd
+import tempfile
+import os
+import shutil
+import yaml
+from click.testing import CliRunner
+from src import drop_features
+from src.data.artifact_index import ArtifactIndex, hash_files, index_artifacts
+
+
+class TestArtifactIndex:
+    """Тесты для индекса артефактов и пропуска неизмененных этапов."""
+
+    def setup_method(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.index_path = os.path.join(self.temp_dir, 'index.json')
+        self.data_path = os.path.join(self.temp_dir, 'data.bin')
+        with open(self.data_path, 'wb') as f:
+            f.write(os.urandom(100_000))
+
+    def teardown_method(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_hash_independent_of_workers(self):
+        """Хеш не зависит от числа потоков, пустой файл тоже хешируется."""
+        empty_path = os.path.join(self.temp_dir, 'empty.bin')
+        open(empty_path, 'wb').close()
+
+        paths = [self.data_path, empty_path]
+        serial = hash_files(paths, workers=1, chunk_size=4096)
+        parallel = hash_files(paths, workers=8, chunk_size=4096)
+
+        assert serial == parallel
+        assert serial[self.data_path] != serial[empty_path]
+        other = hash_files([self.data_path], chunk_size=1000)
+        assert other[self.data_path] != serial[self.data_path]
+
+    def test_unchanged_files_are_not_read(self):
+        """Файл с теми же размером и mtime не хешируется повторно."""
+        index = ArtifactIndex(self.index_path)
+        first = index.hashes([self.data_path])
+        index.save()
+
+        index = ArtifactIndex(self.index_path)
+        assert index.hashes([self.data_path]) == first
+        assert index.hashed == []
+
+        with open(self.data_path, 'ab') as f:
+            f.write(b'x')
+        assert index.hashes([self.data_path]) != first
+        assert index.hashed == [self.data_path]
+
+    def test_check(self):
+        """--check завершается с кодом 1 при изменениях, индекс не меняется."""
+        runner = CliRunner()
+        args = [self.data_path, '--index', self.index_path]
+        result = runner.invoke(index_artifacts, args)
+        assert result.exit_code == 0, result.output
+        result = runner.invoke(index_artifacts, args + ['--check'])
+        assert result.exit_code == 0
+
+        with open(self.data_path, 'ab') as f:
+            f.write(b'x')
+        for _ in range(2):
+            result = runner.invoke(index_artifacts, args + ['--check'])
+            assert result.exit_code == 1
+            assert 'changed' in result.output
+
+    def test_stage_is_skipped(self):
+        """
+        Повторный запуск этапа с теми же входами пропускается, после
+        изменения входа — выполняется.
+        """
+        input_path = os.path.join(self.temp_dir, 'train.parquet')
+        pd.DataFrame({'store_id': [1, 2, 3], 'value': [1.0, 2.0, 3.0]}
+                     ).to_parquet(input_path, index=False)
+        params_path = os.path.join(self.temp_dir, 'params.yaml')
+        with open(params_path, 'w', encoding='utf-8') as f:
+            yaml.dump({'drop_features': {'cols': ['value']}}, f)
+        output_path = os.path.join(self.temp_dir, 'train_final.csv')
+        args = [input_path, '', output_path, '', params_path,
+                '--artifact-index', self.index_path]
+        runner = CliRunner()
+
+        assert runner.invoke(drop_features, args).exit_code == 0
+        mtime = os.stat(output_path).st_mtime_ns
+        with open(self.index_path, 'r', encoding='utf-8') as f:
+            record = json.load(f)['stages']['drop-features']
+        source = os.path.join('data', 'drop_features.py')
+        assert any(path.endswith(source) for path in record['inputs'])
+
+        result = runner.invoke(drop_features, args)
+        assert result.exit_code == 0
+        assert 'пропущен' in result.output
+        assert os.stat(output_path).st_mtime_ns == mtime
+
+        # Другие аргументы — другой запуск
+        result = runner.invoke(drop_features, args + ['--format', 'csv'])
+        assert 'пропущен' not in result.output
+
+        pd.DataFrame({'store_id': [4], 'value': [4.0]}).to_parquet(
+            input_path, index=False)
+        result = runner.invoke(drop_features, args)
+        assert result.exit_code == 0
+        assert 'пропущен' not in result.output
+        assert list(pd.read_csv(output_path)['store_id']) == [4]
+
+        # Удаленный выход пересоздается
+        os.remove(output_path)
+        result = runner.invoke(drop_features, args)
+        assert 'пропущен' not in result.output
+        assert os.path.exists(output_path)
@@ -0,0 +1,79 @@
+import pandas as pd
+import subprocess
+import sys
+import tempfile
+import os
+import shutil
+import yaml
+from click.testing import CliRunner
+from src.cli import COMMANDS, main
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestCli:
+    """Тесты для единой команды courier."""
+
+    def setup_method(self):
+        self.runner = CliRunner()
+        self.temp_dir = tempfile.mkdtemp()
+
+    def teardown_method(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_help_lists_all_stages(self):
+        result = self.runner.invoke(main, ['--help'])
+
+        assert result.exit_code == 0
+        for name in COMMANDS:
+            assert name in result.output
+
+    def test_help_does_not_import_stages(self):
+        """`courier --help` не загружает pandas и lightgbm."""
+        code = ("import sys\nfrom src.cli import main\n"
+                "try:\n    main(['--help'])\nexcept SystemExit:\n    pass\n"
+                "print(sorted(m for m in ('pandas', 'lightgbm', "
+                "'src.data.merge_data') if m in sys.modules))")
+        result = subprocess.run([sys.executable, '-c', code],
+                                capture_output=True, text=True, cwd=ROOT)
+
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.strip().endswith('[]')
+
+    def test_command_help_does_not_import_pandas(self):
+        """
+        `courier train --help` и `courier predict --help` не загружают
+        pandas, pyarrow и lightgbm.
+        """
+        for command in ('train', 'predict'):
+            code = ("import sys\nfrom src.cli import main\n"
+                    f"try:\n    main(['{command}', '--help'])\n"
+                    "except SystemExit:\n    pass\n"
+                    "print(sorted(m for m in ('pandas', 'pyarrow', "
+                    "'lightgbm') if m in sys.modules))")
+            result = subprocess.run([sys.executable, '-c', code],
+                                    capture_output=True, text=True, cwd=ROOT)
+
+            assert result.returncode == 0, result.stderr
+            assert result.stdout.strip().endswith('[]'), command
+
+    def test_runs_stage(self):
+        """Подкоманда вызывает click-команду этапа."""
+        train_path = os.path.join(self.temp_dir, 'train.csv')
+        output_path = os.path.join(self.temp_dir, 'train_final.csv')
+        params_path = os.path.join(self.temp_dir, 'params.yaml')
+        pd.DataFrame({'store_id': [1, 2], 'target': [0.0, 1.0]}).to_csv(
+            train_path, index=False)
+        with open(params_path, 'w', encoding='utf-8') as f:
+            yaml.dump({'drop_features': {'cols': ['store_id']}}, f)
+
+        result = self.runner.invoke(main, ['drop-features', train_path, '',
+                                           output_path, '', params_path])
+
+        assert result.exit_code == 0, result.output
+        assert list(pd.read_csv(output_path).columns) == ['target']
+
+    def test_unknown_command(self):
+        result = self.runner.invoke(main, ['no-such-stage'])
+
+        assert result.exit_code != 0
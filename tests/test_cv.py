@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import tempfile
+import os
+import shutil
+import pytest
+from src.data.feature_matrix import write_matrix
+from src.models.cv import (cross_validate, kfold_splits, summarize,
+                           thread_budget, week_splits, with_threads)
+
+
+class TestCrossValidation:
+    """Тесты для параллельной кросс-валидации."""
+
+    def setup_method(self):
+        self.temp_dir = tempfile.mkdtemp()
+        rng = np.random.default_rng(0)
+        x = rng.normal(size=300)
+        df = pd.DataFrame({
+            'target': 10 + 3 * x + rng.normal(size=300),
+            'x': x,
+            'city_nm': rng.choice(['Москва', 'Казань'], 300),
+        })
+        self.matrix_path = os.path.join(self.temp_dir, 'train.npy')
+        write_matrix(df, self.matrix_path)
+        self.params = {'objective': 'regression', 'verbosity': -1,
+                       'seed': 1, 'n_jobs': 8,
+                       'deterministic': True, 'force_col_wise': True}
+
+    def teardown_method(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_thread_budget(self):
+        """Ядра делятся между процессами, алиасы потоков — num_threads."""
+        assert thread_budget(4, cpu_count=16) == 4
+        assert thread_budget(5, cpu_count=16) == 3
+        assert thread_budget(8, cpu_count=2) == 1
+        assert with_threads(self.params, 2)['num_threads'] == 2
+        assert 'n_jobs' not in with_threads(self.params, 2)
+
+    def test_week_splits(self):
+        """Валидация — последние недели, train — только недели раньше нее."""
+        dates = pd.date_range('2025-01-06', periods=8, freq='7D')
+        weeks = np.repeat(dates.values, 3)[::-1]
+
+        splits = week_splits(weeks, n_splits=3)
+        assert len(splits) == 3
+        for fold, (train_idx, val_idx) in enumerate(splits):
+            assert len(np.unique(weeks[val_idx])) == 1
+            assert weeks[train_idx].max() < weeks[val_idx].min()
+            assert len(train_idx) == 3 * (5 + fold)
+            assert (np.diff(train_idx) > 0).all()
+
+        train_idx, val_idx = week_splits(weeks, n_splits=2, train_weeks=2,
+                                         gap_weeks=1)[0]
+        assert (sorted(np.unique(weeks[train_idx]))
+                == sorted(np.unique(weeks)[3:5]))
+        assert np.unique(weeks[val_idx])[0] == np.unique(weeks)[6]
+
+        with pytest.raises(ValueError):
+            week_splits(weeks, n_splits=8)
+
+    def test_parallel_equals_sequential(self):
+        """Фолды в пуле процессов дают те же метрики, что и по очереди."""
+        splits = kfold_splits(300, n_splits=3)
+        kwargs = dict(cat_features=['city_nm'], num_boost_round=50,
+                      early_stopping_rounds=10,
+                      cache_dir=os.path.join(self.temp_dir, 'cache'))
+
+        sequential = cross_validate(self.matrix_path, self.params, splits,
+                                    workers=1, **kwargs)
+        parallel = cross_validate(self.matrix_path, self.params, splits,
+                                  workers=2, **kwargs)
+
+        assert [result['fold'] for result in parallel] == [1, 2, 3]
+        for left, right in zip(sequential, parallel):
+            assert left['best_iteration'] == right['best_iteration']
+            np.testing.assert_allclose([left['mae'], left['rmse']],
+                                       [right['mae'], right['rmse']],
+                                       rtol=1e-6)
+
+        summary = summarize(parallel)
+        assert summary['cv_mean_mae'] == np.mean(
+            [result['mae'] for result in parallel])
+        assert summary['cv_mean_rmse'] < 2
@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+import tempfile
+import os
+import shutil
+import yaml
+import joblib
+import lightgbm as lgb
+from click.testing import CliRunner
+from src import train_lgbm_model
+from src.data.feature_matrix import write_matrix
+from src.models.dataset_cache import DatasetCache, build_dataset
+
+
+class TestDatasetCache:
+    """Тесты для кеша построенных lgb.Dataset."""
+
+    def setup_method(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.temp_dir, 'cache')
+        rng = np.random.default_rng(0)
+        self.df = pd.DataFrame({
+            'target': rng.integers(0, 10, 200).astype(float),
+            'feature1': rng.normal(size=200),
+            'city_nm': rng.choice(['Москва', 'Казань', 'Пермь'], 200),
+        })
+        self.csv_path = os.path.join(self.temp_dir, 'train.csv')
+        self.df.to_csv(self.csv_path, index=False)
+        self.params = {'objective': 'regression', 'verbosity': -1,
+                       'min_child_samples': 5, 'seed': 1}
+
+    def teardown_method(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _predict(self, dataset):
+        model = lgb.train(self.params, dataset, num_boost_round=20)
+        X = self.df.drop(columns=['target']).astype({'city_nm': 'category'})
+        return model.predict(X)
+
+    def test_cached_dataset_trains_same_model(self):
+        """Dataset из кеша дает ту же модель, что новый, и помнит категории."""
+        cache = DatasetCache(self.cache_dir)
+        first = cache.load(self.csv_path, 'target', ['city_nm'], self.params)
+        second = DatasetCache(self.cache_dir).load(self.csv_path, 'target',
+                                                   ['city_nm'], self.params)
+
+        assert cache.misses and not cache.hits
+        assert second.pandas_categorical == [['Казань', 'Москва', 'Пермь']]
+        expected = self._predict(build_dataset(self.csv_path, 'target',
+                                               ['city_nm'], self.params))
+        np.testing.assert_allclose(self._predict(first), expected)
+        np.testing.assert_allclose(self._predict(second), expected)
+
+    def test_key(self):
+        """
+        Ключ меняют данные, категориальные колонки и параметры бинов,
+        но не параметры обучения.
+        """
+        cache = DatasetCache(self.cache_dir)
+        key = cache.key(self.csv_path, 'target', ['city_nm'], self.params)
+
+        assert cache.key(self.csv_path, 'target', ['city_nm'],
+                         dict(self.params, learning_rate=0.3)) == key
+        assert cache.key(self.csv_path, 'target', ['city_nm'],
+                         dict(self.params, max_bin=63)) != key
+        assert cache.key(self.csv_path, 'target', [], self.params) != key
+
+        self.df.loc[0, 'feature1'] = 100.0
+        self.df.to_csv(self.csv_path, index=False)
+        assert cache.key(self.csv_path, 'target', ['city_nm'],
+                         self.params) != key
+
+    def test_matrix_key_includes_target(self):
+        """У матрицы в ключ входит и файл таргета."""
+        matrix_path = os.path.join(self.temp_dir, 'train.npy')
+        write_matrix(self.df, matrix_path)
+        cache = DatasetCache(self.cache_dir)
+        key = cache.key(matrix_path, 'target', ['city_nm'], self.params)
+
+        write_matrix(self.df.assign(target=self.df['target'] + 1), matrix_path)
+        assert cache.key(matrix_path, 'target', ['city_nm'],
+                         self.params) != key
+
+    def test_train_cli(self):
+        """train с --dataset-cache строит Dataset один раз, модель та же."""
+        config_path = os.path.join(self.temp_dir, 'config.yaml')
+        with open(config_path, 'w', encoding='utf-8') as f:
+            yaml.dump({'model_params': self.params, 'target_col': 'target',
+                       'categorical_features': ['city_nm']}, f)
+        runner = CliRunner()
+        predictions = []
+        for name, extra in (('plain', []),
+                            ('first', ['--dataset-cache', self.cache_dir]),
+                            ('cached', ['--dataset-cache', self.cache_dir])):
+            model_path = os.path.join(self.temp_dir, f'{name}.joblib')
+            result = runner.invoke(train_lgbm_model, [
+                self.csv_path, model_path, config_path, *extra])
+            assert result.exit_code == 0, result.output
+            X = (self.df.drop(columns=['target'])
+                 .astype({'city_nm': 'category'}))
+            predictions.append(joblib.load(model_path).predict(X))
+
+        binaries = [name for name in os.listdir(self.cache_dir)
+                    if name.endswith('.bin')]
+        assert len(binaries) == 1
+        for values in predictions[1:]:
+            np.testing.assert_allclose(values, predictions[0])
+        info_path = os.path.join(self.temp_dir, 'cached.info.yaml')
+        with open(info_path, 'r', encoding='utf-8') as f:
+            info = yaml.safe_load(f)
+        assert info['data']['shape'] == [200, 2]
+        assert info['metrics']['target_mean'] == self.df['target'].mean()
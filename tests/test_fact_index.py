@@ -0,0 +1,98 @@
+import pandas as pd
+import numpy as np
+import pytest
+from src.data.fact_index import FactIndex, attach_fact_lags
+
+
+class TestFactIndex:
+    """Тесты для as-of индекса по facts."""
+
+    def setup_method(self):
+        # У магазина 1 пропущена неделя 2025-11-10
+        self.facts = pd.DataFrame({
+            'store_id': [1, 2, 1, 2, 2],
+            'calendar_dt': ['2025-11-17', '2025-11-03', '2025-11-03',
+                            '2025-11-10', '2025-11-17'],
+            'fact_num_orders_lag_1': [30, 21, 10, 22, 23],
+            'city_nm': ['Москва', 'Казань', 'Москва', 'Казань', 'Казань'],
+        })
+        self.df = pd.DataFrame({
+            'store_id': [1, 2, 1, 3],
+            'calendar_dt': pd.to_datetime(['2025-11-24', '2025-11-24',
+                                           '2025-11-17', '2025-11-24']),
+            'target': [1.0, 2.0, 3.0, 4.0],
+        })
+        self.index = FactIndex(self.facts)
+
+    def test_same_as_merge_for_lag_1(self):
+        """Лаг 1 совпадает с прежним merge по предыдущей неделе."""
+        data = self.df.copy()
+        data['prev_week'] = data['calendar_dt'] - pd.Timedelta(days=7)
+        facts = self.facts.assign(
+            calendar_dt=pd.to_datetime(self.facts['calendar_dt']))
+        expected = data.merge(
+            facts,
+            left_on=['store_id', 'prev_week'],
+            right_on=['store_id', 'calendar_dt'],
+            how='left',
+            suffixes=('', '_facts')
+        ).drop(columns=['prev_week'])
+
+        result = attach_fact_lags(self.df, self.index)
+        pd.testing.assert_frame_equal(result, expected)
+
+    def test_multiple_lags(self):
+        """Несколько лагов одним поиском, имена колонок *_lag_k."""
+        result = attach_fact_lags(self.df, self.index, lags=(1, 2, 3),
+                                  lag_cols=['fact_num_orders_lag_1'])
+
+        values = result.fillna(-1)
+        assert list(values['fact_num_orders_lag_1']) == [30, 23, -1, -1]
+        assert list(values['fact_num_orders_lag_2']) == [-1, 22, 10, -1]
+        assert list(values['fact_num_orders_lag_3']) == [10, 21, -1, -1]
+        assert 'city_nm_lag_2' not in result.columns
+
+    def test_exclude(self):
+        """Исключенные колонки результата не добавляются."""
+        result = attach_fact_lags(self.df, self.index, lags=(1, 2),
+                                  exclude=['calendar_dt_facts', 'city_nm',
+                                           'city_nm_lag_2'])
+
+        assert list(result.columns) == ['store_id', 'calendar_dt', 'target',
+                                        'fact_num_orders_lag_1',
+                                        'fact_num_orders_lag_2']
+        values = result['fact_num_orders_lag_1'].fillna(-1)
+        assert list(values) == [30, 23, -1, -1]
+
+    def test_asof_tolerance(self):
+        """
+        С допуском берется ближайшая более ранняя неделя того же магазина.
+        """
+        dates = pd.Series(pd.to_datetime(['2025-11-10', '2025-11-10',
+                                          '2025-12-08', '2025-10-27']))
+        stores = [1, 1, 2, 1]
+
+        exact = self.index.lookup(stores, dates)
+        assert (exact == -1).all()
+
+        positions = self.index.lookup(stores, dates, tolerance_weeks=1)
+        values = self.index.take(
+            positions, ['fact_num_orders_lag_1'])['fact_num_orders_lag_1']
+        assert list(values.fillna(-1)) == [10, 10, -1, -1]
+
+        positions = self.index.lookup(stores, dates, tolerance_weeks=3)
+        values = self.index.take(
+            positions, ['fact_num_orders_lag_1'])['fact_num_orders_lag_1']
+        assert list(values.fillna(-1)) == [10, 10, 23, -1]
+
+    def test_duplicate_facts(self):
+        """Дубликаты (store_id, calendar_dt) в facts не допускаются."""
+        with pytest.raises(ValueError):
+            FactIndex(pd.concat([self.facts, self.facts.iloc[[0]]]))
+
+    def test_empty_facts(self):
+        """Пустые facts дают только пропуски."""
+        index = FactIndex(self.facts.iloc[:0])
+        dates = pd.to_datetime(['2025-11-10', '2025-11-17'])
+        positions = index.lookup([1, 2], dates)
+        assert np.array_equal(positions, [-1, -1])
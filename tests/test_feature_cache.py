@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+import tempfile
+import shutil
+from src.features.build_features import add_features
+from src.features.cache import FeatureCache
+from src.features.registry import Feature, FeaturePlan
+from src.features.rolling import RollingFeatures
+
+
+def double(a):
+    return a * 2
+
+
+def triple(a):
+    return a * 3
+
+
+def total(a, b):
+    return a + b
+
+
+class TestFeatureCache:
+    """Тесты для дискового кеша фич."""
+
+    def setup_method(self):
+        self.df = pd.DataFrame({
+            'store_id': ['a', 'a', 'b', 'b'],
+            'calendar_dt': pd.to_datetime(['2025-01-06', '2025-01-13'] * 2),
+            'a': [1.0, 2.0, 3.0, 4.0],
+            'b': [10.0, 20.0, 30.0, 40.0],
+        })
+        self.registry = {
+            'f_double': Feature('f_double', ['a'], double),
+            'f_total': Feature('f_total', ['a', 'b'], total),
+        }
+        self.temp_dir = tempfile.mkdtemp()
+
+    def teardown_method(self):
+        shutil.rmtree(self.temp_dir)
+
+    def run(self, registry, df=None):
+        cache = FeatureCache(self.temp_dir)
+        plan = FeaturePlan(list(registry), registry)
+        return cache, cache.evaluate(plan, self.df if df is None else df)
+
+    def test_second_run_is_cached(self):
+        """Повторный запуск читает все фичи из кеша и дает тот же результат."""
+        first_cache, first = self.run(self.registry)
+        second_cache, second = self.run(self.registry)
+
+        assert first_cache.misses == ['f_double', 'f_total']
+        assert second_cache.hits == ['f_double', 'f_total']
+        assert second_cache.misses == []
+        for name in first:
+            np.testing.assert_array_equal(first[name], second[name])
+
+    def test_changed_definition(self):
+        """Изменение кода одной фичи пересчитывает только ее."""
+        self.run(self.registry)
+        changed = dict(self.registry,
+                       f_double=Feature('f_double', ['a'], triple))
+        cache, values = self.run(changed)
+
+        assert cache.misses == ['f_double']
+        assert cache.hits == ['f_total']
+        assert values['f_double'].tolist() == [3.0, 6.0, 9.0, 12.0]
+
+    def test_changed_input(self):
+        """Изменение входной колонки пересчитывает только зависящие фичи."""
+        self.run(self.registry)
+        changed = self.df.assign(b=self.df['b'] + 1)
+        cache, values = self.run(self.registry, changed)
+
+        assert cache.misses == ['f_total']
+        assert cache.hits == ['f_double']
+        assert values['f_total'].tolist() == [12.0, 23.0, 34.0, 45.0]
+
+    def test_rolling_features_cached(self):
+        """Скользящие признаки тоже читаются из кеша, состояние обновляется."""
+        expected = RollingFeatures(['a'], [2]).transform(self.df.copy())
+
+        for run in range(2):
+            cache = FeatureCache(self.temp_dir)
+            rolling = RollingFeatures(['a'], [2])
+            result = add_features(self.df.copy(),
+                                  FeaturePlan([], self.registry), rolling,
+                                  cache=cache)
+            pd.testing.assert_frame_equal(result, expected)
+            assert len(rolling.state) == 2
+
+        assert cache.hits == ['a_2w']
@@ -0,0 +1,135 @@
+import numpy as np
+import pandas as pd
+import tempfile
+import os
+import shutil
+import yaml
+from click.testing import CliRunner
+from src import drop_features, train_lgbm_model
+from src.data.feature_matrix import (FeatureMatrix, matrix_categories,
+                                     write_matrix)
+from src.models.predict_model import predict_model
+
+
+class TestFeatureMatrix:
+    """Тесты для матрицы признаков, отображаемой в память."""
+
+    def setup_method(self):
+        self.temp_dir = tempfile.mkdtemp()
+        rng = np.random.default_rng(0)
+        self.train = pd.DataFrame({
+            'target': rng.integers(0, 10, 60).astype(float),
+            'feature1': rng.normal(size=60),
+            'city_nm': rng.choice(['Москва', 'Казань', 'Пермь'], 60),
+            'feature2': rng.integers(0, 5, 60),
+        })
+        self.train.loc[3, 'feature1'] = np.nan
+        self.test = pd.DataFrame({
+            'feature1': [0.5, np.nan],
+            'city_nm': ['Казань', 'Самара'],
+            'feature2': [1, 2],
+        })
+
+    def teardown_method(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_round_trip(self):
+        """Матрица float32 в памяти восстанавливает значения и категории."""
+        path = os.path.join(self.temp_dir, 'train.npy')
+        write_matrix(self.train, path)
+
+        matrix = FeatureMatrix(path)
+        assert isinstance(matrix.X, np.memmap)
+        assert matrix.X.dtype == np.float32 and matrix.X.flags['C_CONTIGUOUS']
+        assert matrix.columns == ['feature1', 'city_nm', 'feature2']
+        assert matrix.categories == {'city_nm': ['Казань', 'Москва', 'Пермь']}
+        np.testing.assert_array_equal(matrix.target, self.train['target'])
+
+        df = matrix.to_frame()
+        np.testing.assert_allclose(df['feature1'],
+                                   self.train['feature1'].astype(np.float32),
+                                   equal_nan=True)
+        assert list(df['city_nm'].astype(str)) == list(self.train['city_nm'])
+
+    def test_time(self):
+        """drop-features сохраняет неделю строк рядом с матрицей, не в X."""
+        weeks = pd.date_range('2025-01-06', periods=60,
+                              freq='7D').strftime('%Y-%m-%d')
+        input_path = os.path.join(self.temp_dir, 'train_features.parquet')
+        self.train.assign(calendar_dt=weeks, store_id='a').to_parquet(
+            input_path, index=False)
+        params_path = os.path.join(self.temp_dir, 'params.yaml')
+        with open(params_path, 'w', encoding='utf-8') as f:
+            yaml.dump({'drop_features': {'cols': ['calendar_dt', 'store_id'],
+                                         'time_col': 'calendar_dt'}}, f)
+        matrix_path = os.path.join(self.temp_dir, 'train.npy')
+        output_path = os.path.join(self.temp_dir, 'train.csv')
+
+        result = CliRunner().invoke(drop_features, [
+            input_path, '', output_path, '', params_path,
+            '--train-matrix', matrix_path])
+
+        assert result.exit_code == 0, result.output
+        matrix = FeatureMatrix(matrix_path)
+        assert matrix.columns == ['feature1', 'city_nm', 'feature2']
+        expected = pd.to_datetime(weeks).values.astype('datetime64[D]')
+        np.testing.assert_array_equal(matrix.time, expected)
+        assert 'calendar_dt' not in pd.read_csv(output_path).columns
+
+    def test_test_codes_follow_train(self):
+        """Коды test берутся из категорий train, новый город — пропуск."""
+        path = os.path.join(self.temp_dir, 'test.npy')
+        write_matrix(self.test, path, categories=matrix_categories(self.train))
+
+        matrix = FeatureMatrix(path)
+        assert matrix.target is None
+        assert matrix.X[0, 1] == 0
+        assert np.isnan(matrix.X[1, 1])
+
+    def test_train_and_predict(self):
+        """Модели на CSV и на матрице одинаково предсказывают CSV и матрицу."""
+        train_features = os.path.join(self.temp_dir, 'train_features.parquet')
+        test_features = os.path.join(self.temp_dir, 'test_features.parquet')
+        self.train.to_parquet(train_features, index=False)
+        self.test.to_parquet(test_features, index=False)
+        params_path = os.path.join(self.temp_dir, 'params.yaml')
+        with open(params_path, 'w', encoding='utf-8') as f:
+            yaml.dump({'drop_features': {'cols': []}}, f)
+        config_path = os.path.join(self.temp_dir, 'config.yaml')
+        with open(config_path, 'w', encoding='utf-8') as f:
+            yaml.dump({'model_params': {'objective': 'regression',
+                                        'verbosity': -1,
+                                        'min_child_samples': 5},
+                       'target_col': 'target',
+                       'categorical_features': ['city_nm']}, f)
+        paths = {name: os.path.join(self.temp_dir, name)
+                 for name in ('train.csv', 'test.csv',
+                              'train.npy', 'test.npy')}
+        runner = CliRunner()
+
+        result = runner.invoke(drop_features, [
+            train_features, test_features, paths['train.csv'],
+            paths['test.csv'], params_path,
+            '--train-matrix', paths['train.npy'],
+            '--test-matrix', paths['test.npy'],
+        ])
+        assert result.exit_code == 0, result.output
+
+        predictions = {}
+        for train_name in ('train.csv', 'train.npy'):
+            model_path = os.path.join(self.temp_dir, f'{train_name}.joblib')
+            result = runner.invoke(train_lgbm_model, [paths[train_name],
+                                                      model_path, config_path])
+            assert result.exit_code == 0, result.output
+            for test_name in ('test.csv', 'test.npy'):
+                output_path = os.path.join(
+                    self.temp_dir, f'{train_name}_{test_name}_pred.csv')
+                result = runner.invoke(predict_model, [
+                    model_path, paths[test_name], output_path])
+                assert result.exit_code == 0, result.output
+                prediction = pd.read_csv(output_path)['prediction']
+                predictions[train_name, test_name] = prediction
+
+        expected = predictions['train.csv', 'test.csv']
+        for values in predictions.values():
+            np.testing.assert_allclose(values, expected)
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.features.build_features import add_features, requested_features
+from src.features.registry import (FEATURES, Feature, FeaturePlan,
+                                   public_features)
+
+
+class TestFeatureRegistry:
+    """Тесты для реестра фич."""
+
+    def setup_method(self):
+        self.df = pd.DataFrame({
+            'predicted_staff_value': [10.0, 0.0, 5.0],
+            'fact_staff_value_lag_1': [8.0, 4.0, 0.0],
+            'predicted_num_orders': [100.0, 50.0, np.nan],
+            'fact_num_orders_lag_1': [80.0, 40.0, 30.0],
+        })
+
+    def test_add_features(self):
+        """Все фичи считаются так же, как раньше считались в build_features."""
+        result = add_features(self.df.copy())
+
+        assert result['staff_prediction_gap'].tolist() == [2.0, -4.0, 5.0]
+        assert result['orders_prediction_gap'].tolist()[:2] == [20.0, 10.0]
+        # Деление на ноль заменяется делением на 1
+        assert result['past_productivity'].tolist() == [10.0, 10.0, 30.0]
+        assert result['predicted_productivity'].tolist()[:2] == [10.0, 50.0]
+        assert np.isnan(result['predicted_productivity'].iloc[2])
+        assert '_fact_staff_nonzero' not in result.columns
+
+    def test_only_requested(self):
+        """План читает только нужные колонки и считает только нужные узлы."""
+        plan = FeaturePlan(['past_productivity'])
+
+        assert plan.columns == ['fact_num_orders_lag_1',
+                                'fact_staff_value_lag_1']
+        assert plan.order == ['_fact_staff_nonzero', 'past_productivity']
+        result = add_features(self.df[plan.columns].copy(), plan)
+        assert list(result.columns) == plan.columns + ['past_productivity']
+
+    def test_shared_intermediate(self):
+        """Промежуточное значение, общее для двух фич, вычисляется один раз."""
+        calls = []
+
+        def half(x):
+            calls.append(1)
+            return x / 2
+
+        registry = {
+            'half': Feature('half', ['a'], half, public=False),
+            'plus': Feature('plus', ['half', 'b'], lambda h, b: h + b),
+            'minus': Feature('minus', ['half', 'b'], lambda h, b: h - b),
+        }
+        plan = FeaturePlan(['plus', 'minus'], registry)
+        values = plan.evaluate(pd.DataFrame({'a': [4.0], 'b': [1.0]}))
+
+        assert len(calls) == 1
+        assert values['plus'].tolist() == [3.0]
+        assert values['minus'].tolist() == [1.0]
+
+    def test_unknown_feature(self):
+        with pytest.raises(ValueError):
+            FeaturePlan(['no_such_feature'])
+
+    def test_cycle(self):
+        registry = {
+            'a': Feature('a', ['b'], lambda b: b),
+            'b': Feature('b', ['a'], lambda a: a),
+        }
+        with pytest.raises(ValueError):
+            FeaturePlan(['a'], registry)
+
+    def test_requested_features(self):
+        """Список фич берется из params.yaml, без него — все публичные фичи."""
+        params = {'build_features': {
+            'prediction_gap_cols': ['staff_prediction_gap'],
+            'productivity_cols': ['past_productivity']}}
+
+        assert requested_features(params) == ['staff_prediction_gap',
+                                              'past_productivity']
+        assert requested_features({}) == public_features()
+        assert all(FEATURES[name].public for name in public_features())
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import tempfile
+import os
+import shutil
+import yaml
+from click.testing import CliRunner
+from src.features.build_features import build_features
+
+
+class TestIncrementalFeatures:
+    """Тесты для расчета признаков только новых недель."""
+
+    def setup_method(self):
+        rng = np.random.default_rng(0)
+        rows = []
+        for store in ['a', 'b', 'c']:
+            weeks = pd.date_range('2025-01-06', periods=12, freq='7D')
+            for week in weeks[rng.random(12) < 0.85]:
+                rows.append((store, week, rng.normal(100, 20)))
+        df = (pd.DataFrame(rows, columns=['store_id', 'calendar_dt', 'orders'])
+              .sample(frac=1, random_state=0).reset_index(drop=True))
+        self.df = df.assign(predicted_staff_value=5.0,
+                            fact_staff_value_lag_1=df['orders'] / 20)
+        self.last = self.df['calendar_dt'].max()
+        self.temp_dir = tempfile.mkdtemp()
+        self.params_path = os.path.join(self.temp_dir, 'params.yaml')
+        with open(self.params_path, 'w', encoding='utf-8') as f:
+            yaml.dump({'build_features': {
+                'prediction_gap_cols': ['staff_prediction_gap'],
+                'rolling': {'cols': ['orders'], 'windows': [2, 4]},
+            }}, f)
+
+    def teardown_method(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _build(self, df, state=None):
+        """build-features по df; возвращает выход train и вывод команды."""
+        input_path = os.path.join(self.temp_dir, 'train.parquet')
+        output_path = os.path.join(self.temp_dir, 'train_features.parquet')
+        df.to_parquet(input_path)
+        args = [input_path, '', output_path, '',
+                '--params-file', self.params_path]
+        if state:
+            args += ['--feature-state', os.path.join(self.temp_dir, state)]
+        result = CliRunner().invoke(build_features, args)
+        assert result.exit_code == 0, result.output
+        return pd.read_parquet(output_path), result.output
+
+    def test_new_week(self):
+        """Новая неделя считается по состоянию и совпадает с пересчетом."""
+        expected, _ = self._build(self.df)
+
+        self._build(self.df[self.df['calendar_dt'] < self.last], 'state')
+        result, output = self._build(self.df, 'state')
+        new_rows = (self.df['calendar_dt'] == self.last).sum()
+        assert f'{new_rows} new rows computed' in output
+        pd.testing.assert_frame_equal(result, expected, atol=1e-6)
+
+        # Повторный запуск без новых недель берет все строки из состояния
+        result, output = self._build(self.df, 'state')
+        assert f'{len(self.df)} rows reused, 0 new' in output
+        pd.testing.assert_frame_equal(result, expected, atol=1e-6)
+
+    def test_changed_history(self):
+        """Изменение старой недели или состояния требует полного пересчета."""
+        self._build(self.df[self.df['calendar_dt'] < self.last], 'state')
+        changed = self.df.copy()
+        changed.loc[changed['calendar_dt'] < self.last, 'orders'] += 1
+        expected, _ = self._build(changed)
+
+        result, output = self._build(changed, 'state')
+        assert 'rows reused' not in output
+        pd.testing.assert_frame_equal(result, expected)
+
+        # Файл признаков состояния изменен вне build-features
+        features_path = os.path.join(self.temp_dir, 'state',
+                                     'features.parquet')
+        features = pd.read_parquet(features_path)
+        features.iloc[:, 0] = 0.0
+        features.to_parquet(features_path)
+        result, output = self._build(changed, 'state')
+        assert 'rows reused' not in output
+        pd.testing.assert_frame_equal(result, expected)
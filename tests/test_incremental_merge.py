@@ -0,0 +1,127 @@
+import pandas as pd
+import numpy as np
+import tempfile
+import shutil
+from src.data.incremental_merge import IncrementalMerge, week_hashes
+from src.data.merge_data import merge_train
+
+
+class TestIncrementalMerge:
+    """Тесты для инкрементального merge с кешем по неделям."""
+
+    def setup_method(self):
+        self.cache_dir = tempfile.mkdtemp()
+        rng = np.random.default_rng(1)
+
+        stores = ['a', 'b', 'c']
+        weeks = pd.date_range('2025-10-27', '2025-11-17', freq='7D')
+        self.facts = pd.DataFrame([
+            {'calendar_dt': w, 'store_id': s,
+             'fact_num_orders_lag_1': int(rng.integers(0, 100))}
+            for w in weeks for s in stores if rng.random() > 0.2
+        ])
+        self.shifts = pd.DataFrame([
+            {'calendar_dt': w, 'store_id': s,
+             'predicted_num_orders': float(rng.integers(0, 100))}
+            for w in weeks for s in stores
+        ])
+        # Порядок строк как в исходных данных: по магазинам, внутри — по
+        # неделям
+        self.train = pd.DataFrame([
+            {'calendar_dt': w, 'store_id': s,
+             'target': float(rng.integers(0, 5))}
+            for s in stores for w in weeks[1:]
+        ])
+
+    def teardown_method(self):
+        shutil.rmtree(self.cache_dir)
+
+    def _expected(self, train, facts, shifts):
+        return merge_train(train.copy(), facts.copy(), shifts.copy())
+
+    def _merge(self, train, facts, shifts):
+        merger = IncrementalMerge(self.cache_dir)
+        result = merger.merge(train.copy(), facts.copy(), shifts.copy())
+        return merger, result
+
+    def test_same_as_full_merge(self):
+        """Результат совпадает с полным merge_train, включая порядок строк."""
+        merger, result = self._merge(self.train, self.facts, self.shifts)
+
+        expected = self._expected(self.train, self.facts, self.shifts)
+        pd.testing.assert_frame_equal(result, expected)
+        assert len(merger.updated_weeks) == 3
+
+    def test_only_changed_weeks_are_recomputed(self):
+        """
+        Повторный запуск пересчитывает только недели с изменившимися входами.
+        """
+        self._merge(self.train, self.facts, self.shifts)
+
+        merger, _ = self._merge(self.train, self.facts, self.shifts)
+        assert merger.updated_weeks == []
+
+        # Новая неделя: строки train и shifts за 2025-11-24, факты за
+        # 2025-11-17 уже есть
+        new_week = pd.Timestamp('2025-11-24')
+        train = pd.concat([self.train, pd.DataFrame({
+            'calendar_dt': [new_week] * 3, 'store_id': ['a', 'b', 'c'],
+            'target': [1.0, 2.0, 3.0]
+        })], ignore_index=True)
+        shifts = pd.concat([self.shifts, pd.DataFrame({
+            'calendar_dt': [new_week] * 3, 'store_id': ['a', 'b', 'c'],
+            'predicted_num_orders': [5.0, 6.0, 7.0]
+        })], ignore_index=True)
+
+        merger, result = self._merge(train, self.facts, shifts)
+        assert merger.updated_weeks == [new_week]
+        pd.testing.assert_frame_equal(
+            result, self._expected(train, self.facts, shifts))
+
+        # Исправленный факт меняет только неделю, для которой он лаг
+        facts = self.facts.copy()
+        week = facts['calendar_dt'] == pd.Timestamp('2025-11-03')
+        facts.loc[week, 'fact_num_orders_lag_1'] += 1
+
+        merger, result = self._merge(train, facts, shifts)
+        assert merger.updated_weeks == [pd.Timestamp('2025-11-10')]
+        pd.testing.assert_frame_equal(result,
+                                      self._expected(train, facts, shifts))
+
+    def test_reordered_rows(self):
+        """
+        Перестановка строк train (и внутри недели) пересчитывает недели,
+        результат как у merge_train.
+        """
+        self._merge(self.train, self.facts, self.shifts)
+        shuffled = (self.train.sample(frac=1, random_state=0)
+                    .reset_index(drop=True))
+        assert week_hashes(shuffled) != week_hashes(self.train)
+
+        merger, result = self._merge(shuffled, self.facts, self.shifts)
+        assert merger.updated_weeks
+        pd.testing.assert_frame_equal(
+            result, self._expected(shuffled, self.facts, self.shifts))
+
+    def test_current_output_is_not_rebuilt(self):
+        """
+        Без изменений партиции не читаются, пока записанный выход не трогали.
+        """
+        output = f'{self.cache_dir}/train_merged.parquet'
+
+        def merge(train, *options):
+            return IncrementalMerge(self.cache_dir).merge(
+                train.copy(), self.facts.copy(), self.shifts.copy(), output,
+                *options)
+
+        merger = IncrementalMerge(self.cache_dir)
+        merger.merge(self.train.copy(), self.facts.copy(), self.shifts.copy(),
+                     output).to_parquet(output)
+        merger.record_output(output)
+
+        assert merge(self.train) is None
+        # Другие настройки записи или другой порядок строк требуют сборки
+        assert merge(self.train, {'format': 'csv'}) is not None
+        reordered = (self.train.sort_values(['calendar_dt', 'store_id'])
+                     .reset_index(drop=True))
+        assert merge(reordered) is not None
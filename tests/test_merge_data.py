@@ -90,4 +90,46 @@ class TestMergeData:
         assert 'shifts_value' in test_result.columns
         assert 'calendar_dt' in test_result.columns
         # Дата должна быть 2025-11-24
-        assert (test_result['calendar_dt'] == '2025-11-24').all()
\ No newline at end of file
+        assert (test_result['calendar_dt'] == '2025-11-24').all()
+
+    def test_multiple_test_weeks(self):
+        """Тест сразу на несколько недель прогноза."""
+        result = self.runner.invoke(
+            merge_data,
+            [
+                self.facts_path,
+                self.shifts_path,
+                self.train_path,
+                self.test_path,
+                self.train_output,
+                self.test_output,
+                '--test-date', '2025-12-01',
+                '--test-date', '2025-11-24'
+            ]
+        )
+
+        assert result.exit_code == 0
+
+        test_result = pd.read_csv(self.test_output)
+        # Сначала все магазины первой недели, потом второй
+        assert list(test_result['calendar_dt']) == ['2025-11-24', '2025-11-24',
+                                                    '2025-12-01', '2025-12-01']
+        assert list(test_result['store_id']) == [1, 2, 1, 2]
+        # Факты за предыдущую неделю каждой недели прогноза
+        assert list(test_result['facts_value']) == [100, 200, 300, 400]
+        assert list(test_result['shifts_value']) == [50, 60, 70, 80]
+
+    def test_forecast_weeks(self):
+        """Недели прогноза задаются датой, списком или диапазоном."""
+        from src.data.merge_data import forecast_weeks
+
+        weeks = forecast_weeks('2025-11-24')
+        assert list(weeks.strftime('%Y-%m-%d')) == ['2025-11-24']
+        weeks = forecast_weeks(['2025-12-01', '2025-11-24', '2025-12-01'])
+        assert len(weeks) == 2
+        weeks = forecast_weeks({'start': '2025-11-24', 'periods': 3})
+        assert list(weeks.strftime('%Y-%m-%d')) == ['2025-11-24',
+                                                    '2025-12-01',
+                                                    '2025-12-08']
+        weeks = forecast_weeks({'start': '2025-11-24', 'end': '2025-12-08'})
+        assert len(weeks) == 3
\ No newline at end of file
@@ -1,5 +1,10 @@
 import pandas as pd
 import numpy as np
+import pytest
+import tempfile
+import os
+import json
+import shutil
 from src import NanFiller
 
 
@@ -124,4 +129,228 @@ class TestNanFiller:
         )
 
         # Не должно упасть, просто игнорирует
-        assert 'non_existent_col' not in filler.medians
\ No newline at end of file
+        assert 'non_existent_col' not in filler.medians
+
+    def test_keeps_compact_dtypes(self):
+        """float32 и категориальные колонки из схемы сохраняют свой тип."""
+        df = self.df.astype({'numeric_col': 'float32', 'flag_col': 'float32',
+                             'cat_col': 'category'})
+        result = self.filler.fit_transform(df, self.nan_cols, self.flag_cols,
+                                           self.cat_cols)
+
+        assert result['numeric_col'].dtype == np.float32
+        assert result['flag_col'].dtype == np.float32
+        assert result.loc[2, 'numeric_col'] == 2.0
+        assert result.loc[3, 'cat_col'] == 'пусто'
+        assert result.loc[0, 'cat_col'] == 'A'
+
+    def test_inplace(self):
+        """
+        inplace=True заполняет сам DataFrame и дает тот же результат, что и
+        копия.
+        """
+        self.filler.fit(self.df, self.nan_cols, self.flag_cols, self.cat_cols)
+        expected = self.filler.transform(self.df)
+
+        df = self.df.copy()
+        result = self.filler.transform(df, inplace=True)
+
+        assert result is df
+        pd.testing.assert_frame_equal(result, expected)
+        assert self.df['numeric_col'].isna().sum() == 2
+
+    def test_int_column_with_fractional_median(self):
+        """
+        Целая колонка без пропусков повышается до float, как при
+        поэлементном заполнении.
+        """
+        df = pd.DataFrame({'store_lifetime_in_days': [10, 10],
+                           'int_col': [1, 2]})
+        result = self.filler.fit_transform(df, ['int_col'], [], [])
+
+        assert result['int_col'].dtype == np.float64
+        assert result['int_col'].tolist() == [1.0, 2.0]
+
+    def test_partial_fit_matches_fit(self):
+        """Обучение по кускам дает те же медианы и моды, что и fit."""
+        self.filler.fit(self.df, self.nan_cols, self.flag_cols, self.cat_cols)
+
+        chunked = NanFiller()
+        for start in range(0, len(self.df), 2):
+            chunked.partial_fit(self.df.iloc[start:start + 2], self.nan_cols,
+                                self.flag_cols, self.cat_cols)
+
+        assert chunked.medians == self.filler.medians
+        assert chunked.modes == self.filler.modes
+        assert chunked.cat_fill == self.filler.cat_fill
+
+    def test_merge_shards(self):
+        """Fillers, обученные на разных шардах, объединяются в один."""
+        cols = (self.nan_cols, self.flag_cols, self.cat_cols)
+        first = NanFiller().partial_fit(self.df.iloc[:2], *cols)
+        second = NanFiller().partial_fit(self.df.iloc[2:], *cols)
+        merged = first.merge(second)
+
+        assert merged.medians['numeric_col'] == 2.0
+        assert merged.modes['flag_col'] == 1
+        pd.testing.assert_frame_equal(
+            merged.transform(self.df),
+            NanFiller().fit_transform(self.df, *cols))
+
+
+class TestGroupNanFiller:
+    """Тесты для NanFiller с медианами и модами по группам."""
+
+    def setup_method(self):
+        self.df = pd.DataFrame({
+            'store_lifetime_in_days': [30, 30, 30, 30, 30, 30, 3],
+            'city_nm': ['A', 'A', 'A', 'B', 'B', 'B', 'A'],
+            'numeric_col': [1.0, 3.0, np.nan, 10.0, 20.0, np.nan, np.nan],
+            'flag_col': [1, 1, np.nan, 0, 0, np.nan, np.nan],
+        })
+        self.filler = NanFiller(group_col='city_nm')
+
+    def test_fit_groups(self):
+        """Медианы и моды считаются по каждой группе."""
+        self.filler.fit(self.df, ['numeric_col'], ['flag_col'])
+
+        assert self.filler.group_keys == ['A', 'B']
+        assert self.filler.group_medians['numeric_col'].tolist() == [2.0, 15.0]
+        assert self.filler.group_modes['flag_col'].tolist() == [1.0, 0.0]
+        assert self.filler.medians['numeric_col'] == 6.5
+
+    def test_transform_groups(self):
+        """
+        Старые магазины заполняются значением своей группы, новые — нулем.
+        """
+        result = self.filler.fit_transform(self.df, ['numeric_col'],
+                                           ['flag_col'], [])
+
+        assert result['numeric_col'].tolist() == [1.0, 3.0, 2.0, 10.0, 20.0,
+                                                  15.0, 0.0]
+        assert result['flag_col'].tolist() == [1, 1, 1, 0, 0, 0, 0]
+
+    def test_unseen_group_uses_global(self):
+        """
+        Для группы, которой не было при fit, и для пустой группы берется
+        глобальное значение.
+        """
+        self.filler.fit(self.df, ['numeric_col'], ['flag_col'])
+        test = pd.DataFrame({
+            'store_lifetime_in_days': [30, 30],
+            'city_nm': ['C', np.nan],
+            'numeric_col': [np.nan, np.nan],
+            'flag_col': [np.nan, np.nan],
+        })
+        result = self.filler.transform(test)
+
+        assert result['numeric_col'].tolist() == [6.5, 6.5]
+        mode = self.filler.modes['flag_col']
+        assert result['flag_col'].tolist() == [mode] * 2
+
+    def test_group_bins(self):
+        """Числовая колонка группы разбивается на интервалы [a, b)."""
+        filler = NanFiller(group_col='store_lifetime_in_days',
+                           group_bins=[0, 7, np.inf])
+        df = self.df.assign(store_lifetime_in_days=[30, 30, 30, 5, 5, 5, 100])
+        result = filler.fit_transform(df, ['numeric_col'], [], [])
+
+        assert filler.group_keys == [0, 1]
+        # Новые магазины (интервал 0) заполняются нулем, старые — медианой
+        # интервала 1
+        assert result['numeric_col'].tolist() == [1.0, 3.0, 2.0, 10.0, 20.0,
+                                                  0.0, 2.0]
+
+    def test_partial_fit_groups_matches_fit(self):
+        """
+        Обучение по кускам и слияние шардов дают те же значения групп и
+        заполнение, что и fit.
+        """
+        args = (['numeric_col'], ['flag_col'], [])
+        expected = self.filler.fit_transform(self.df, *args)
+
+        chunked = NanFiller(group_col='city_nm')
+        for start in range(0, len(self.df), 2):
+            chunked.partial_fit(self.df.iloc[start:start + 2], *args)
+        first = NanFiller(group_col='city_nm').partial_fit(self.df.iloc[:4],
+                                                           *args)
+        second = NanFiller(group_col='city_nm').partial_fit(self.df.iloc[4:],
+                                                            *args)
+        merged = first.merge(second)
+
+        for filler in (chunked, merged):
+            assert filler.group_keys == self.filler.group_keys
+            assert filler.group_medians['numeric_col'].tolist() == [2.0, 15.0]
+            assert filler.group_modes['flag_col'].tolist() == [1.0, 0.0]
+            pd.testing.assert_frame_equal(filler.transform(self.df), expected)
+
+    def test_partial_fit_group_bins(self):
+        """
+        Интервалы group_bins при обучении по кускам совпадают с fit, пустая
+        группа — глобальное значение.
+        """
+        df = self.df.assign(store_lifetime_in_days=[30, 30, 30, 5, 5, 5, 100])
+        filler = NanFiller(group_col='store_lifetime_in_days',
+                           group_bins=[0, 7, np.inf])
+        expected = filler.fit_transform(df, ['numeric_col'], ['flag_col'], [])
+
+        chunked = NanFiller(group_col='store_lifetime_in_days',
+                            group_bins=[0, 7, np.inf])
+        for start in range(0, len(df), 3):
+            chunked.partial_fit(df.iloc[start:start + 3], ['numeric_col'],
+                                ['flag_col'], [])
+
+        assert chunked.group_keys == filler.group_keys
+        pd.testing.assert_frame_equal(chunked.transform(df), expected)
+
+
+@pytest.mark.filterwarnings('ignore:Mean of empty slice:RuntimeWarning')
+class TestNanFillerSerialization:
+    """Тесты сохранения NanFiller в json."""
+
+    def setup_method(self):
+        self.df = pd.DataFrame({
+            'store_lifetime_in_days': [3, 10, 15, 2, 30, 40],
+            'city_nm': ['A', 'A', 'B', 'B', 'B', None],
+            'numeric_col': [1.0, 2.0, np.nan, np.nan, 5.0, 7.0],
+            'empty_col': [np.nan] * 6,
+            'flag_col': [1, 0, np.nan, np.nan, 1, 1],
+            'cat_col': ['A', 'B', np.nan, np.nan, 'C', 'C'],
+        }).astype({'numeric_col': 'float32'})
+        self.args = (['numeric_col', 'empty_col'], ['flag_col'], ['cat_col'])
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'filler.json')
+
+    def teardown_method(self):
+        shutil.rmtree(self.temp_dir)
+
+    @pytest.mark.parametrize('group_col', [None, 'city_nm'])
+    def test_roundtrip(self, group_col):
+        """Загруженный filler заполняет данные так же, как исходный."""
+        filler = NanFiller(group_col=group_col).fit(self.df, *self.args)
+        filler.save(self.path)
+        loaded = NanFiller.load(self.path)
+
+        assert loaded.cat_fill == filler.cat_fill
+        assert np.isnan(loaded.medians['empty_col'])
+        pd.testing.assert_frame_equal(loaded.transform(self.df),
+                                      filler.transform(self.df))
+
+    def test_plain_json(self):
+        """Файл — обычный json с версией формата, без pickle."""
+        NanFiller().fit(self.df, *self.args).save(self.path)
+        with open(self.path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+
+        assert state['format'] == 'nan_filler'
+        assert state['version'] == 1
+        assert state['medians'] == {'numeric_col': 3.5, 'empty_col': None}
+        assert state['modes'] == {'flag_col': 1.0}
+
+    def test_unknown_version(self):
+        """Файл неизвестной версии не загружается."""
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({'format': 'nan_filler', 'version': 999}, f)
+
+        with pytest.raises(ValueError):
+            NanFiller.load(self.path)
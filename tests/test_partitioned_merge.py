@@ -0,0 +1,96 @@
+import pandas as pd
+import numpy as np
+import pytest
+import tempfile
+import os
+import shutil
+from click.testing import CliRunner
+from src import merge_data
+from src.data.partitioned_merge import bucket_of
+
+
+class TestPartitionedMerge:
+    """Тесты для out-of-core merge_data по бакетам store_id."""
+
+    def setup_method(self):
+        self.runner = CliRunner()
+        self.temp_dir = tempfile.mkdtemp()
+        rng = np.random.default_rng(0)
+
+        stores = [f'store_{i}' for i in range(12)]
+        weeks = pd.date_range('2025-10-06', '2025-11-17',
+                              freq='7D').strftime('%Y-%m-%d')
+        facts = pd.DataFrame([
+            {'calendar_dt': w, 'store_id': s,
+             'fact_num_orders_lag_1': int(rng.integers(0, 100)),
+             'city_nm': 'Москва' if i % 2 else 'Казань'}
+            for i, s in enumerate(stores) for w in weeks if rng.random() > 0.2
+        ])
+        shifts = pd.DataFrame([
+            {'calendar_dt': w, 'store_id': s,
+             'predicted_num_orders': float(rng.integers(0, 100))}
+            for s in stores for w in list(weeks) + ['2025-11-24']
+        ])
+        train = pd.DataFrame([
+            {'calendar_dt': w, 'store_id': s,
+             'target': float(rng.integers(0, 5))}
+            for w in weeks[1:] for s in rng.permutation(stores)
+        ])
+        test = pd.DataFrame(
+            {'store_id': list(rng.permutation(stores)) + ['unknown']})
+
+        self.inputs = []
+        frames = [('facts', facts), ('shifts', shifts), ('train', train),
+                  ('test', test)]
+        for name, df in frames:
+            path = os.path.join(self.temp_dir, f'{name}.csv')
+            df.to_csv(path, index=False)
+            self.inputs.append(path)
+
+    def teardown_method(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _merge(self, prefix, ext, *options):
+        outputs = [os.path.join(self.temp_dir, f'{prefix}_{part}.{ext}')
+                   for part in ('train', 'test')]
+        result = self.runner.invoke(merge_data,
+                                    self.inputs + outputs + list(options))
+        assert result.exit_code == 0, result.output
+        return outputs
+
+    @pytest.mark.parametrize('ext', ['csv', 'parquet'])
+    def test_same_as_in_memory(self, ext):
+        """
+        Результат по бакетам совпадает с обычным merge, включая порядок
+        строк.
+        """
+        expected = self._merge('memory', ext)
+        result = self._merge('buckets', ext, '--partitions', '5',
+                             '--chunksize', '7', '--tmp-dir', self.temp_dir)
+
+        for expected_path, result_path in zip(expected, result):
+            if ext == 'csv':
+                with open(expected_path, 'rb') as f1, \
+                        open(result_path, 'rb') as f2:
+                    assert f1.read() == f2.read()
+            else:
+                pd.testing.assert_frame_equal(pd.read_parquet(expected_path),
+                                              pd.read_parquet(result_path))
+
+    def test_multiple_test_weeks(self):
+        """
+        Порядок строк теста по нескольким неделям совпадает с обычным merge.
+        """
+        weeks = ['--test-date', '2025-11-17', '--test-date', '2025-11-24']
+        expected = self._merge('memory', 'csv', *weeks)
+        result = self._merge('buckets', 'csv', '--partitions', '3',
+                             '--chunksize', '5', *weeks)
+
+        with open(expected[1], 'rb') as f1, open(result[1], 'rb') as f2:
+            assert f1.read() == f2.read()
+
+    def test_bucket_is_stable(self):
+        """Магазин всегда попадает в один и тот же бакет."""
+        buckets = bucket_of(['a', 'b', 'a', 'c'], 4)
+        assert buckets[0] == buckets[2]
+        assert ((buckets >= 0) & (buckets < 4)).all()
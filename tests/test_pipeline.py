@@ -0,0 +1,162 @@
+import pandas as pd
+import numpy as np
+import tempfile
+import os
+import shutil
+import yaml
+from click.testing import CliRunner
+from src import merge_data, drop_features
+from src.data.nan_filling import fill_nan
+from src.features.build_features import build_features
+from src.pipeline import run_pipeline
+
+
+class TestRunPipeline:
+    """Тесты для единого запуска пайплайна в одном процессе."""
+
+    def setup_method(self):
+        self.runner = CliRunner()
+        self.temp_dir = tempfile.mkdtemp()
+
+        stores = ['a', 'b', 'c']
+        weeks = ['2025-11-10', '2025-11-17']
+        facts = pd.DataFrame({
+            'calendar_dt': [w for w in weeks for _ in stores],
+            'store_id': stores * 2,
+            'fact_staff_value_lag_1': [3, 0, 5, 4, 2, 6],
+            'fact_num_orders_lag_1': [30, 10, 52, 41, 22, 61],
+            'fact_load_factor_lag_1': [1.1, np.nan, 2.3, 1.7, 0.9, np.nan],
+            'flag_high_load_lag_1': [1, 0, 1, np.nan, 0, 1],
+            'city_nm': ['Москва', 'Казань', np.nan,
+                        'Москва', 'Казань', 'Казань'],
+            'store_lifetime_in_days': [3, 400, 20, 10, 407, 27],
+        })
+        shifts = pd.DataFrame({
+            'calendar_dt': [w for w in weeks + ['2025-11-24']
+                            for _ in stores],
+            'store_id': stores * 3,
+            'predicted_staff_value': [4, 2, 6, 5, 0, 7, 5, 3, 8],
+            'predicted_num_orders': [40, 20, 60, 45, 25, 65, 50, 30, 70],
+            'predicted_load_factor': [1.0, 1.5, 2.0, 1.1, 1.6, 2.1,
+                                      1.2, 1.7, 2.2],
+        })
+        train = pd.DataFrame({
+            'calendar_dt': ['2025-11-17'] * 3 + ['2025-11-24'] * 3,
+            'store_id': stores * 2,
+            'target': [1.0, 2.0, 0.0, 3.0, 1.0, 2.0],
+        })
+        test = pd.DataFrame({'store_id': ['c', 'a', 'd']})
+
+        self.paths = {}
+        frames = [('facts', facts), ('shifts', shifts), ('train', train),
+                  ('test', test)]
+        for name, df in frames:
+            self.paths[name] = os.path.join(self.temp_dir, f'{name}.csv')
+            df.to_csv(self.paths[name], index=False)
+
+        self.params_path = os.path.join(self.temp_dir, 'params.yaml')
+        with open(self.params_path, 'w', encoding='utf-8') as f:
+            yaml.dump({
+                'schema': {
+                    'target': 'float32',
+                    'fact_staff_value_lag_1': 'float32',
+                    'fact_num_orders_lag_1': 'float32',
+                    'fact_load_factor_lag_1': 'float32',
+                    'flag_high_load_lag_1': 'float32',
+                    'city_nm': 'category',
+                    'store_lifetime_in_days': 'float32',
+                    'predicted_staff_value': 'float32',
+                },
+                'nan_filling': {
+                    'numeric_cols': ['fact_staff_value_lag_1',
+                                     'fact_num_orders_lag_1',
+                                     'fact_load_factor_lag_1',
+                                     'store_lifetime_in_days'],
+                    'flag_cols': ['flag_high_load_lag_1'],
+                    'cat_cols': ['city_nm'],
+                },
+                'build_features': {
+                    'rolling': {'cols': ['fact_num_orders_lag_1'],
+                                'windows': [2]},
+                },
+                'drop_features': {'cols': ['calendar_dt', 'store_id',
+                                           'calendar_dt_facts']},
+            }, f, allow_unicode=True)
+
+    def teardown_method(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _path(self, name):
+        return os.path.join(self.temp_dir, name)
+
+    def _run_stages(self):
+        """Запуск цепочки отдельных этапов, как в dvc.yaml."""
+        p = self._path
+        params = ['--params-file', self.params_path]
+        stages = [
+            (merge_data, [self.paths['facts'], self.paths['shifts'],
+                          self.paths['train'], self.paths['test'],
+                          p('train_merged.parquet'),
+                          p('test_merged.parquet')] + params),
+            (fill_nan, [p('train_merged.parquet'), p('test_merged.parquet'),
+                        p('train_filled.parquet'), p('test_filled.parquet'),
+                        p('missing.json'), p('stages_filler.json'),
+                        self.params_path]),
+            (build_features, [p('train_filled.parquet'),
+                              p('test_filled.parquet'),
+                              p('train_features.parquet'),
+                              p('test_features.parquet')] + params),
+            (drop_features, [p('train_features.parquet'),
+                             p('test_features.parquet'),
+                             p('stages_train.csv'), p('stages_test.csv'),
+                             self.params_path]),
+        ]
+        for command, args in stages:
+            result = self.runner.invoke(command, args)
+            assert result.exit_code == 0, result.output
+
+    def _run_pipeline(self, *options):
+        """Запуск пайплайна одним процессом."""
+        result = self.runner.invoke(run_pipeline, [
+            self.paths['facts'], self.paths['shifts'], self.paths['train'],
+            self.paths['test'], self._path('fused_train.csv'),
+            self._path('fused_test.csv'), self.params_path, *options,
+        ])
+        assert result.exit_code == 0, result.output
+
+    def test_same_outputs_as_stages(self):
+        """Итоговые файлы совпадают с результатом цепочки этапов."""
+        self._run_stages()
+        self._run_pipeline()
+
+        pairs = [('stages_train.csv', 'fused_train.csv'),
+                 ('stages_test.csv', 'fused_test.csv')]
+        for stages_name, fused_name in pairs:
+            with open(self._path(stages_name), 'rb') as f1, \
+                    open(self._path(fused_name), 'rb') as f2:
+                assert f1.read() == f2.read()
+
+        # Скользящие признаки и схема действительно участвуют в сравнении
+        fused = pd.read_csv(self._path('fused_train.csv'))
+        assert 'fact_num_orders_lag_1_mean_2w' in fused.columns
+
+        # Промежуточные файлы не пишутся без --interim-dir
+        assert not os.path.exists(self._path('interim'))
+
+    def test_interim_dir(self):
+        """С --interim-dir сохраняются артефакты всех этапов."""
+        interim_dir = self._path('interim')
+        self._run_pipeline('--interim-dir', interim_dir)
+
+        for stage in ['merged', 'filled', 'features']:
+            for part in ['train', 'test']:
+                assert os.path.exists(
+                    os.path.join(interim_dir, f'{part}_{stage}.parquet'))
+
+        train_merged = pd.read_parquet(
+            os.path.join(interim_dir, 'train_merged.parquet'))
+        # Типы из секции schema применяются уже при чтении входов
+        assert train_merged['fact_num_orders_lag_1'].dtype == np.float32
+        train_filled = pd.read_parquet(
+            os.path.join(interim_dir, 'train_filled.parquet'))
+        assert isinstance(train_filled['city_nm'].dtype, pd.CategoricalDtype)
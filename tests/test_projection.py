@@ -0,0 +1,106 @@
+import pandas as pd
+import tempfile
+import os
+import shutil
+import yaml
+from click.testing import CliRunner
+from src.data.projection import dead_columns, prune, read_exclude, stage_uses
+from src.pipeline import run_pipeline
+
+
+class TestProjection:
+    """Тесты для раннего удаления колонок из drop_features.cols."""
+
+    def setup_method(self):
+        self.params = {
+            'nan_filling': {'numeric_cols': ['fact_num_orders_lag_1'],
+                            'flag_cols': [], 'cat_cols': []},
+            'drop_features': {'cols': ['calendar_dt', 'store_id',
+                                       'calendar_dt_facts', 'city_nm']},
+            'build_features': {
+                'prediction_gap_cols': ['orders_prediction_gap']},
+        }
+        self.temp_dir = tempfile.mkdtemp()
+
+    def teardown_method(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_dead_columns(self):
+        """Колонка мертва после этапа, если ее не читают следующие этапы."""
+        assert dead_columns(self.params, 'merge_data') == {
+            'calendar_dt', 'store_id', 'calendar_dt_facts', 'city_nm'}
+        assert read_exclude(self.params, 'merge_data') == {
+            'calendar_dt_facts', 'city_nm'}
+        assert stage_uses(self.params)['build_features'] == {
+            'predicted_num_orders', 'fact_num_orders_lag_1'}
+
+    def test_later_stages_keep_their_inputs(self):
+        """Ключи нужны скользящим фичам, группа — NanFiller."""
+        self.params['build_features']['rolling'] = {
+            'cols': ['fact_num_orders_lag_1']}
+        self.params['nan_filling']['group_col'] = 'city_nm'
+
+        assert dead_columns(self.params, 'merge_data') == {'calendar_dt_facts'}
+        assert dead_columns(self.params, 'fill_nan') == {
+            'calendar_dt_facts', 'city_nm'}
+        assert dead_columns(self.params, 'build_features') == set(
+            self.params['drop_features']['cols'])
+
+    def test_time_col_reaches_drop_features(self):
+        """Колонка недели для матрицы признаков доживает до drop-features."""
+        self.params['drop_features']['time_col'] = 'calendar_dt'
+
+        assert dead_columns(self.params, 'build_features') == {
+            'store_id', 'calendar_dt_facts', 'city_nm'}
+        assert 'calendar_dt' not in read_exclude(self.params, 'drop_features')
+
+    def test_prune(self):
+        df = pd.DataFrame({'a': [1], 'b': [2]})
+        assert list(prune(df, {'b', 'c'}).columns) == ['a']
+
+    def test_pipeline_interim_without_dead_columns(self):
+        """Промежуточные артефакты пайплайна не содержат мертвых колонок."""
+        paths = {name: os.path.join(self.temp_dir, f'{name}.csv')
+                 for name in ('facts', 'shifts', 'train')}
+        pd.DataFrame({
+            'calendar_dt': ['2025-11-10', '2025-11-17'],
+            'store_id': ['a', 'a'],
+            'fact_num_orders_lag_1': [10.0, None],
+            'city_nm': ['Москва', 'Москва'],
+            'store_lifetime_in_days': [100.0, 107.0],
+        }).to_csv(paths['facts'], index=False)
+        pd.DataFrame({
+            'calendar_dt': ['2025-11-17', '2025-11-24'],
+            'store_id': ['a', 'a'],
+            'predicted_staff_value': [3.0, 4.0],
+            'predicted_num_orders': [12.0, 14.0],
+            'predicted_load_factor': [1.0, 1.0],
+        }).to_csv(paths['shifts'], index=False)
+        pd.DataFrame({
+            'calendar_dt': ['2025-11-17', '2025-11-24'],
+            'store_id': ['a', 'a'],
+            'target': [1.0, 0.0],
+        }).to_csv(paths['train'], index=False)
+        params_path = os.path.join(self.temp_dir, 'params.yaml')
+        with open(params_path, 'w', encoding='utf-8') as f:
+            yaml.dump(self.params, f)
+
+        interim_dir = os.path.join(self.temp_dir, 'interim')
+        output = os.path.join(self.temp_dir, 'train_final.csv')
+        result = CliRunner().invoke(run_pipeline, [
+            paths['facts'], paths['shifts'], paths['train'], '', output, '',
+            params_path,
+            '--interim-dir', interim_dir,
+        ])
+
+        assert result.exit_code == 0, result.output
+        merged = pd.read_parquet(
+            os.path.join(interim_dir, 'train_merged.parquet'))
+        assert list(merged.columns) == [
+            'target', 'fact_num_orders_lag_1', 'store_lifetime_in_days',
+            'predicted_staff_value', 'predicted_num_orders',
+            'predicted_load_factor']
+        final = pd.read_csv(output)
+        assert list(final.columns) == (list(merged.columns)
+                                       + ['orders_prediction_gap'])
+        assert list(final['orders_prediction_gap']) == [2.0, 4.0]
@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+import pytest
+import tempfile
+import os
+import shutil
+from src.features.rolling import RollingFeatures, window_stats
+
+
+class TestRollingFeatures:
+    """Тесты для скользящих признаков истории магазина."""
+
+    def setup_method(self):
+        rng = np.random.default_rng(0)
+        rows = []
+        for store in ['a', 'b', 'c']:
+            weeks = pd.date_range('2025-01-06', periods=20, freq='7D')
+            # Пропуски недель и значений
+            for week in weeks[rng.random(20) < 0.85]:
+                value = (rng.normal(100, 20) if rng.random() < 0.9
+                         else np.nan)
+                rows.append((store, week, value))
+        self.df = (pd.DataFrame(rows,
+                                columns=['store_id', 'calendar_dt', 'orders'])
+                   .sample(frac=1, random_state=0).reset_index(drop=True))
+        self.temp_dir = tempfile.mkdtemp()
+
+    def teardown_method(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_matches_pandas_rolling(self):
+        """mean и std совпадают с groupby().rolling по окну в 4 недели."""
+        rolling = RollingFeatures(['orders'], [4], ['mean', 'std'])
+        result = rolling.transform(self.df.copy())
+
+        grouped = (self.df.sort_values('calendar_dt')
+                   .set_index('calendar_dt')
+                   .groupby('store_id')['orders'])
+        expected = pd.DataFrame({
+            'mean': grouped.rolling('28D', min_periods=1).mean(),
+            'std': grouped.rolling('28D', min_periods=1).std(),
+        }).reset_index()
+        merged = result.merge(expected, on=['store_id', 'calendar_dt'])
+
+        assert len(merged) == len(self.df)
+        np.testing.assert_allclose(merged['orders_mean_4w'], merged['mean'])
+        np.testing.assert_allclose(merged['orders_std_4w'], merged['std'])
+
+    def test_trend(self):
+        """trend — наклон МНК-прямой по номеру недели без учета пропусков."""
+        weeks = np.array([0, 1, 2, 3, 5, 6])
+        values = np.array([1.0, 3.0, 2.0, np.nan, 7.0, 4.0])
+        trend = window_stats(np.zeros(6), weeks, values, 4)['trend']
+
+        assert np.isnan(trend[0])
+        for i in range(1, 6):
+            mask = ((weeks > weeks[i] - 4) & (weeks <= weeks[i])
+                    & ~np.isnan(values))
+            slope = np.polyfit(weeks[mask], values[mask], 1)[0]
+            assert trend[i] == pytest.approx(slope)
+
+    def test_incremental_update(self):
+        """Новые недели по сохраненному состоянию совпадают с пересчетом."""
+        full = RollingFeatures(['orders'], [2, 4]).transform(self.df.copy())
+
+        cut = pd.Timestamp('2025-04-01')
+        rolling = RollingFeatures(['orders'], [2, 4])
+        rolling.transform(self.df[self.df['calendar_dt'] < cut].copy())
+        state_path = os.path.join(self.temp_dir, 'state.parquet')
+        rolling.save_state(state_path)
+
+        # Состояние хранит только последние 3 недели каждого магазина
+        assert rolling.state.groupby('store_id').size().max() <= 3
+
+        restored = RollingFeatures(['orders'], [2, 4]).load_state(state_path)
+        new = restored.transform(self.df[self.df['calendar_dt'] >= cut].copy())
+
+        expected = full[full['calendar_dt'] >= cut]
+        pd.testing.assert_frame_equal(new.sort_index(), expected.sort_index())
+
+    def test_reprocessing_does_not_duplicate(self):
+        """Повторная обработка тех же недель не удваивает историю."""
+        rolling = RollingFeatures(['orders'], [4])
+        first = rolling.transform(self.df.copy())
+        second = rolling.transform(self.df.copy())
+
+        pd.testing.assert_frame_equal(first, second)
+
+    def test_from_params(self):
+        params = {'build_features': {'rolling': {
+            'cols': ['orders'], 'windows': [4], 'stats': ['mean']}}}
+
+        rolling = RollingFeatures.from_params(params)
+        assert rolling.feature_names == ['orders_mean_4w']
+        assert RollingFeatures.from_params({}) is None
+        with pytest.raises(ValueError):
+            RollingFeatures(['orders'], stats=['median'])
@@ -0,0 +1,61 @@
+import pandas as pd
+import numpy as np
+import tempfile
+import os
+import shutil
+from src.data.schema import apply_schema, load_schema, memory_mb
+from src.data.storage import read_frame
+from src.stage_metrics import StageMetrics
+
+
+class TestSchema:
+    """Тесты для схемы типов из params.yaml."""
+
+    def setup_method(self):
+        self.df = pd.DataFrame({
+            'store_id': ['a', 'b', 'c', 'd'],
+            'fact_num_orders_lag_1': [10, 20, 30, 40],
+            'predicted_load_factor': [1.5, np.nan, 2.5, 3.0],
+            'city_nm': ['Москва', 'Казань', 'Москва', 'Москва'],
+        })
+        self.schema = {
+            'fact_num_orders_lag_1': 'float32',
+            'predicted_load_factor': 'float32',
+            'city_nm': 'category',
+            'not_in_frame': 'float32',
+        }
+        self.temp_dir = tempfile.mkdtemp()
+
+    def teardown_method(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_load_schema(self):
+        """Схема берется из секции schema, без нее — пустая."""
+        assert load_schema({'schema': {'a': 'float32'}}) == {'a': 'float32'}
+        assert load_schema({}) == {}
+        assert load_schema(None) == {}
+
+    def test_apply_schema(self):
+        """Объявленные колонки приводятся к типам, остальные не меняются."""
+        result = apply_schema(self.df, self.schema)
+
+        assert result['fact_num_orders_lag_1'].dtype == np.float32
+        assert result['predicted_load_factor'].dtype == np.float32
+        assert isinstance(result['city_nm'].dtype, pd.CategoricalDtype)
+        assert result['store_id'].dtype == object
+        assert memory_mb(result) < memory_mb(self.df)
+
+    def test_memory_report(self):
+        """Размер до и после приведения попадает в замер этапа."""
+        path = os.path.join(self.temp_dir, 'train.parquet')
+        pd.concat([self.df] * 20000, ignore_index=True).to_parquet(path)
+        with StageMetrics('test') as metrics:
+            result = read_frame(path, schema=self.schema)
+        size = metrics.result['schema_memory_mb'][path]
+        assert size['after'] < size['before']
+
+        # Уже приведенный файл не приводится и не попадает в отчет
+        result.to_parquet(path)
+        with StageMetrics('test') as metrics:
+            read_frame(path, schema=self.schema)
+        assert metrics.result['schema_memory_mb'] == {}
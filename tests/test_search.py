@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+import tempfile
+import os
+import shutil
+import yaml
+import mlflow
+from click.testing import CliRunner
+from src.data.feature_matrix import write_matrix
+from src.models.search import (RungTable, load_space, rung_rounds,
+                               run_search, sample_params)
+
+
+class TestSearch:
+    """Тесты для подбора параметров successive halving."""
+
+    def setup_method(self):
+        self.temp_dir = tempfile.mkdtemp()
+        rng = np.random.default_rng(0)
+        x = rng.normal(size=400)
+        df = pd.DataFrame({
+            'target': 10 + 3 * x + rng.normal(size=400),
+            'x': x,
+            'city_nm': rng.choice(['Москва', 'Казань'], 400),
+        })
+        self.matrix_path = os.path.join(self.temp_dir, 'train.npy')
+        weeks = np.repeat(
+            pd.date_range('2025-01-06', periods=8, freq='7D').values, 50)
+        write_matrix(df, self.matrix_path, time=weeks)
+        self.config_path = os.path.join(self.temp_dir, 'config.yaml')
+        with open(self.config_path, 'w', encoding='utf-8') as f:
+            yaml.dump({'model_params': {'objective': 'regression',
+                                        'metric': 'rmse', 'verbose': -1,
+                                        'n_estimators': 1000,
+                                        'bagging_freq': 1,
+                                        'random_state': 1},
+                       'target_col': 'target',
+                       'categorical_features': ['city_nm']}, f)
+        self.space_path = os.path.join(self.temp_dir, 'space.yaml')
+        with open(self.space_path, 'w', encoding='utf-8') as f:
+            yaml.dump({'num_leaves': {'type': 'int', 'low': 4, 'high': 64,
+                                      'log': True},
+                       'learning_rate': {'type': 'float', 'low': 0.01,
+                                         'high': 0.3, 'log': True},
+                       'min_child_samples': {'type': 'int', 'low': 5,
+                                             'high': 50},
+                       'max_depth': {'type': 'choice',
+                                     'values': [-1, 4]}}, f)
+
+    def teardown_method(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_sample_params(self):
+        """
+        Значения лежат в границах, целые параметры — int, choice — из
+        списка.
+        """
+        space = load_space(self.space_path)
+        rng = np.random.default_rng(0)
+        for _ in range(50):
+            params = sample_params(space, rng)
+            assert isinstance(params['num_leaves'], int)
+            assert 4 <= params['num_leaves'] <= 64
+            assert 0.01 <= params['learning_rate'] <= 0.3
+            assert params['max_depth'] in (-1, 4)
+
+    def test_rungs(self):
+        """Ступени растут в eta раз и не доходят до максимума итераций."""
+        assert rung_rounds(10, 1000, 3) == [10, 30, 90, 270, 810]
+        assert rung_rounds(100, 100, 3) == []
+
+    def test_rung_table(self):
+        """Ступень проходит только лучшая 1/eta доля уже записанных оценок."""
+        table = RungTable(eta=2)
+        assert table.report(0, 10, 5.0)
+        assert not table.report(0, 10, 6.0)
+        assert table.report(0, 10, 4.0)
+        assert not table.report(0, 10, 5.5)
+        # У другой скобки своя таблица
+        assert table.report(1, 10, 9.0)
+        # Для метрик, которые растут, лучшие — большие значения
+        assert table.report(0, 20, 0.7, higher_better=True)
+        assert not table.report(0, 20, 0.6, higher_better=True)
+        assert table.report(0, 20, 0.8, higher_better=True)
+
+    def test_run_search(self):
+        """
+        Поиск останавливает часть испытаний, логирует их в MLflow и
+        сохраняет лучший конфиг.
+        """
+        tracking_uri = (
+            f"sqlite:///{os.path.join(self.temp_dir, 'mlflow.db')}")
+        runner = CliRunner()
+        for workers in ('1', '2'):
+            output_path = os.path.join(self.temp_dir, f'best_{workers}.yaml')
+            result = runner.invoke(run_search, [
+                self.matrix_path, '--config', self.config_path,
+                '--space', self.space_path, '--trials', '6',
+                '--min-rounds', '5', '--max-rounds', '200', '--eta', '2',
+                '--brackets', '2', '--folds', '2', '--early-stopping', '20',
+                '--workers', workers,
+                '--dataset-cache', os.path.join(self.temp_dir, 'cache'),
+                '--tracking-uri', tracking_uri, '--experiment', 'search',
+                '--output', output_path,
+            ])
+            assert result.exit_code == 0, result.output
+            assert 'pruned' in result.output
+
+            with open(output_path, 'r', encoding='utf-8') as f:
+                best = yaml.safe_load(f)
+            assert best['categorical_features'] == ['city_nm']
+            assert 4 <= best['model_params']['num_leaves'] <= 64
+            assert 0 < best['model_params']['n_estimators'] <= 200
+
+        mlflow.set_tracking_uri(tracking_uri)
+        runs = mlflow.search_runs(experiment_names=['search'])
+        assert len(runs) == 2 * (1 + 6)
+        assert set(runs['tags.status'].dropna()) == {'complete', 'pruned'}
+        assert runs['metrics.best_cv_score'].dropna().lt(2).all()
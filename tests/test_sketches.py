@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.data.sketches import FrequencySketch, QuantileSketch
+
+
+class TestQuantileSketch:
+    """Тесты для скетча квантилей."""
+
+    def setup_method(self):
+        rng = np.random.default_rng(0)
+        self.values = np.concatenate([rng.lognormal(3, 2, 20_000),
+                                      -rng.lognormal(1, 1, 5_000),
+                                      np.zeros(100)])
+
+    def test_exact_mode_matches_pandas(self):
+        """Пока значений немного, квантили совпадают с pandas."""
+        values = pd.Series([3, 1, np.nan, 2, 2, 7, 5, 1])
+        sketch = QuantileSketch().update(values)
+
+        assert sketch.exact is not None
+        assert sketch.count == 7
+        assert sketch.median() == values.median()
+        assert sketch.quantile(0.9) == pytest.approx(values.quantile(0.9))
+
+    def test_relative_error(self):
+        """
+        После перехода в корзины ошибка квантилей не больше
+        relative_accuracy.
+        """
+        sketch = QuantileSketch(relative_accuracy=0.01, max_exact=100)
+        sketch.update(self.values)
+
+        assert sketch.exact is None
+        for q in (0.1, 0.25, 0.5, 0.9, 0.99):
+            expected = np.quantile(self.values, q)
+            error = abs(sketch.quantile(q) - expected)
+            assert error <= 0.01 * abs(expected) + 1e-9
+
+    def test_merge_equals_single_stream(self):
+        """Скетч, слитый из кусков, совпадает со скетчем по всем данным."""
+        whole = QuantileSketch(max_exact=100).update(self.values)
+        parts = [QuantileSketch(max_exact=100).update(part)
+                 for part in np.array_split(self.values, 7)]
+        merged = parts[0]
+        for part in parts[1:]:
+            merged.merge(part)
+
+        assert merged.count == whole.count
+        for q in (0.1, 0.5, 0.9):
+            assert merged.quantile(q) == pytest.approx(whole.quantile(q))
+
+    def test_empty(self):
+        """Пустой скетч дает NaN, как медиана пустой колонки."""
+        assert np.isnan(QuantileSketch().update([np.nan]).median())
+
+    def test_merge_different_accuracy(self):
+        """Скетчи с разной точностью не сливаются."""
+        with pytest.raises(ValueError):
+            QuantileSketch(0.01).merge(QuantileSketch(0.001))
+
+
+class TestFrequencySketch:
+    """Тесты для скетча частот."""
+
+    def test_exact_mode(self):
+        """Для флагов мода точная, при равенстве берется меньшее значение."""
+        assert FrequencySketch().update([1, 0, 1, np.nan]).mode() == 1
+        assert FrequencySketch().update([1, 0]).mode() == 0
+        assert FrequencySketch().update([np.nan]).mode(default=0) == 0
+
+    def test_heavy_hitter_survives(self):
+        """
+        Частое значение остается в скетче малой емкости, ошибка частоты
+        ограничена.
+        """
+        rng = np.random.default_rng(0)
+        values = np.concatenate([np.full(3_000, 42),
+                                 rng.integers(0, 10_000, 7_000)])
+        rng.shuffle(values)
+
+        parts = [FrequencySketch(capacity=16).update(part)
+                 for part in np.array_split(values, 5)]
+        sketch = parts[0]
+        for part in parts[1:]:
+            sketch.merge(part)
+
+        assert len(sketch.counters) <= 16
+        assert sketch.mode() == 42
+        assert sketch.counters[42] >= 3_000 - len(values) / 17
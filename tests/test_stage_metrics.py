@@ -0,0 +1,77 @@
+import json
+import pandas as pd
+import tempfile
+import os
+import shutil
+import yaml
+from click.testing import CliRunner
+from src import drop_features
+from src.data.storage import FrameWriter, iter_frames, read_frame, write_frame
+from src.stage_metrics import StageMetrics
+
+
+class TestStageMetrics:
+    """Тесты для замеров времени, памяти и объема данных этапов."""
+
+    def setup_method(self):
+        self.df = pd.DataFrame({'store_id': [1, 2, 3, 4, 5],
+                                'value': [1.0, 2.0, None, 4.0, 5.0]})
+        self.temp_dir = tempfile.mkdtemp()
+        self.input_path = os.path.join(self.temp_dir, 'input.parquet')
+        self.df.to_parquet(self.input_path, index=False)
+
+    def teardown_method(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_counts_rows_and_bytes(self):
+        """Повторное чтение файла не удваивает строки, считает проходы."""
+        output_path = os.path.join(self.temp_dir, 'output.csv')
+        chunks_path = os.path.join(self.temp_dir, 'chunks.feather')
+
+        with StageMetrics('test') as metrics:
+            read_frame(self.input_path)
+            with FrameWriter(chunks_path) as writer:
+                for chunk in iter_frames(self.input_path, 2):
+                    writer.write(chunk)
+            write_frame(self.df.head(3), output_path)
+
+        result = metrics.result
+        assert result['rows_read'] == 5
+        assert result['rows_written'] == 8
+        assert result['inputs'][self.input_path]['passes'] == 2
+        assert result['bytes_read'] == os.path.getsize(self.input_path)
+        assert result['bytes_written'] == (os.path.getsize(output_path)
+                                           + os.path.getsize(chunks_path))
+        assert result['wall_seconds'] >= 0 and result['cpu_seconds'] >= 0
+        assert result['peak_rss_mb'] > 0
+
+    def test_outside_of_stage(self):
+        """Чтение вне замера нигде не учитывается."""
+        with StageMetrics('test') as metrics:
+            pass
+        read_frame(self.input_path)
+
+        assert metrics.inputs == {}
+        assert metrics.result['rows_read'] == 0
+
+    def test_cli_writes_metrics(self):
+        """Опция --metrics пишет JSON с метриками этапа."""
+        params_path = os.path.join(self.temp_dir, 'params.yaml')
+        with open(params_path, 'w', encoding='utf-8') as f:
+            yaml.dump({'drop_features': {'cols': ['value']}}, f)
+        output_path = os.path.join(self.temp_dir, 'train_final.csv')
+        metrics_path = os.path.join(self.temp_dir, 'reports',
+                                    'drop_features.json')
+
+        result = CliRunner().invoke(drop_features, [
+            self.input_path, '', output_path, '', params_path,
+            '--metrics', metrics_path,
+        ])
+
+        assert result.exit_code == 0, result.output
+        with open(metrics_path, 'r', encoding='utf-8') as f:
+            metrics = json.load(f)
+        assert metrics['stage'] == 'drop-features'
+        assert metrics['rows_read'] == 5
+        assert metrics['rows_written'] == 5
+        assert list(pd.read_csv(output_path).columns) == ['store_id']
@@ -0,0 +1,82 @@
+import pandas as pd
+import pytest
+import tempfile
+import os
+import shutil
+from src.data.storage import (infer_format, iter_frames, read_columns,
+                              read_frame, write_frame)
+
+
+class TestStorage:
+    """Тесты для чтения и записи артефактов пайплайна."""
+
+    def setup_method(self):
+        self.df = pd.DataFrame({
+            'calendar_dt': pd.to_datetime(['2025-11-17', '2025-11-24',
+                                           '2025-11-24']),
+            'store_id': [1, 2, 3],
+            'city_nm': pd.Categorical(['Москва', 'пусто', 'Москва']),
+            'value': [1.5, None, 3.0]
+        }, index=[0, 2, 5])  # индекс как после dropna
+        self.temp_dir = tempfile.mkdtemp()
+
+    def teardown_method(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_infer_format(self):
+        """Формат определяется по расширению или явному флагу."""
+        assert infer_format('data/train.csv') == 'csv'
+        assert infer_format('data/train.parquet') == 'parquet'
+        assert infer_format('data/train.feather') == 'feather'
+        assert infer_format('data/train.unknown') == 'csv'
+        assert infer_format('data/train.csv', 'parquet') == 'parquet'
+
+        with pytest.raises(ValueError):
+            infer_format('data/train.csv', 'xlsx')
+
+    @pytest.mark.parametrize('name', ['frame.parquet', 'frame.feather'])
+    def test_columnar_roundtrip_keeps_schema(self, name):
+        """Колоночные форматы сохраняют даты и категории."""
+        path = os.path.join(self.temp_dir, name)
+        write_frame(self.df, path)
+        result = read_frame(path)
+
+        assert isinstance(result['city_nm'].dtype, pd.CategoricalDtype)
+        assert pd.api.types.is_datetime64_any_dtype(result['calendar_dt'])
+        pd.testing.assert_frame_equal(result, self.df.reset_index(drop=True))
+
+    def test_format_flag_overrides_extension(self):
+        """
+        Файл, записанный в parquet под именем .csv, читается по содержимому.
+        """
+        path = os.path.join(self.temp_dir, 'frame.csv')
+        write_frame(self.df, path, 'parquet')
+        result = read_frame(path, columns=['store_id', 'city_nm'])
+
+        assert list(result.columns) == ['store_id', 'city_nm']
+        assert isinstance(result['city_nm'].dtype, pd.CategoricalDtype)
+
+    def test_csv_roundtrip(self):
+        """CSV остается форматом по умолчанию."""
+        path = os.path.join(self.temp_dir, 'frame.csv')
+        write_frame(self.df, path)
+        result = read_frame(path)
+
+        assert len(result) == 3
+        assert list(result.columns) == list(self.df.columns)
+
+    @pytest.mark.parametrize('name', ['frame.csv', 'frame.parquet',
+                                      'frame.feather'])
+    def test_exclude_columns(self, name):
+        """Исключенные колонки не читаются ни целиком, ни кусками."""
+        path = os.path.join(self.temp_dir, name)
+        write_frame(self.df, path)
+
+        assert read_columns(path) == list(self.df.columns)
+        result = read_frame(path, exclude=['city_nm', 'missing'])
+        assert list(result.columns) == ['calendar_dt', 'store_id', 'value']
+
+        chunks = list(iter_frames(path, 2, exclude=['calendar_dt']))
+        assert [len(c) for c in chunks] == [2, 1]
+        assert all(list(c.columns) == ['store_id', 'city_nm', 'value']
+                   for c in chunks)
@@ -0,0 +1,85 @@
+import json
+import pandas as pd
+import pytest
+import tempfile
+import os
+import shutil
+from click.testing import CliRunner
+from src.benchmark import parse_scale, run_benchmarks, scaling_exponents
+from src.data.fact_index import FactIndex
+from src.data.merge_data import merge_test, merge_train
+from src.data.synthetic import forecast_week, generate
+
+
+class TestSynthetic:
+    """Тесты для генератора синтетических данных и бенчмарка этапов."""
+
+    def setup_method(self):
+        self.tables = generate(n_stores=20, n_weeks=8, n_cities=3, seed=1)
+        self.temp_dir = tempfile.mkdtemp()
+
+    def teardown_method(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_schema(self):
+        """Колонки как в data/raw, город у магазина один."""
+        facts = self.tables['facts']
+        assert list(self.tables['train'].columns) == ['calendar_dt',
+                                                      'store_id', 'target']
+        assert list(self.tables['test'].columns) == ['store_id']
+        assert ({'store_lifetime_in_days', 'fact_num_orders_lag_1', 'city_nm'}
+                <= set(facts.columns))
+        assert facts.groupby('store_id')['city_nm'].nunique().max() == 1
+        assert facts['fact_percent_lateness_lag_1'].isna().any()
+        assert not facts.duplicated(['store_id', 'calendar_dt']).any()
+        assert (self.tables['train']['target'] >= 0).all()
+
+    def test_deterministic(self):
+        """Одно зерно — одинаковые данные."""
+        again = generate(n_stores=20, n_weeks=8, n_cities=3, seed=1)
+        for name, df in self.tables.items():
+            pd.testing.assert_frame_equal(df, again[name])
+
+    def test_merges_with_forecast_week(self):
+        """Прогноз есть на все недели train и на неделю теста."""
+        index = FactIndex(self.tables['facts'])
+        shifts = self.tables['shifts_prediction']
+        train = merge_train(self.tables['train'], index, shifts.copy())
+        test = merge_test(self.tables['test'], index, shifts.copy(),
+                          forecast_week(8))
+
+        assert len(train) == len(self.tables['train'])
+        assert train['predicted_num_orders'].notna().all()
+        assert len(test) == 20
+        assert test['predicted_num_orders'].notna().all()
+        assert test['fact_num_orders_lag_1'].notna().mean() > 0.5
+
+    def test_parse_scale(self):
+        assert parse_scale('1000x52') == (1000, 52)
+        with pytest.raises(Exception):
+            parse_scale('1000')
+
+    def test_scaling_exponents(self):
+        """Время, растущее пропорционально данным, дает показатель 1."""
+        runs = [{'rows': {'train_rows': n},
+                 'stages': {'merge-data': {'wall_seconds': n / 100}}}
+                for n in (100, 1000, 10000)]
+        assert scaling_exponents(runs) == {'merge-data': 1.0}
+        assert scaling_exponents(runs[:1]) == {}
+
+    def test_benchmark_cli(self):
+        """Бенчмарк прогоняет этапы данных и сохраняет метрики каждого."""
+        output = os.path.join(self.temp_dir, 'benchmarks.json')
+        result = CliRunner().invoke(run_benchmarks, [
+            '--scale', '10x4', '--scale', '20x4', '--no-model',
+            '--output', output])
+
+        assert result.exit_code == 0, result.output
+        with open(output, 'r', encoding='utf-8') as f:
+            report = json.load(f)
+        assert [run['stores'] for run in report['runs']] == [10, 20]
+        stages = report['runs'][1]['stages']
+        assert list(stages) == ['merge-data', 'fill-nan', 'build-features',
+                                'drop-features']
+        assert stages['drop-features']['rows_written'] > 0
+        assert set(report['scaling']) == set(stages)
@@ -0,0 +1,150 @@
+import numpy as np
+import pandas as pd
+import tempfile
+import os
+import shutil
+import yaml
+import joblib
+from click.testing import CliRunner
+from src import train_lgbm_model
+from src.data.feature_matrix import FeatureMatrix, write_matrix
+from src.models.warm_start import column_stats, drift_score
+
+
+class TestWarmStart:
+    """Тесты для еженедельного дообучения с прошлой модели."""
+
+    def setup_method(self):
+        self.temp_dir = tempfile.mkdtemp()
+        rng = np.random.default_rng(0)
+        x = rng.normal(size=600)
+        self.df = pd.DataFrame({
+            'target': 10 + 3 * x + rng.normal(size=600),
+            'x': x,
+            'city_nm': rng.choice(['Москва', 'Казань'], 600),
+        })
+        dates = pd.date_range('2025-01-06', periods=6, freq='7D')
+        self.weeks = np.repeat(dates.values, 100)
+        self.config_path = os.path.join(self.temp_dir, 'config.yaml')
+        with open(self.config_path, 'w', encoding='utf-8') as f:
+            yaml.dump({'model_params': {'objective': 'regression',
+                                        'verbose': -1, 'n_estimators': 50,
+                                        'random_state': 1},
+                       'target_col': 'target',
+                       'categorical_features': ['city_nm']}, f)
+
+    def teardown_method(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _matrix(self, name, weeks, df=None):
+        df = self.df if df is None else df
+        mask = self.weeks < self.weeks[0] + np.timedelta64(7 * weeks, 'D')
+        path = os.path.join(self.temp_dir, f'{name}.npy')
+        write_matrix(df[mask], path, time=self.weeks[mask])
+        return path
+
+    def _train(self, matrix_path, model_name, *extra):
+        model_path = os.path.join(self.temp_dir, f'{model_name}.joblib')
+        result = CliRunner().invoke(train_lgbm_model, [
+            matrix_path, model_path, self.config_path, *extra])
+        assert result.exit_code == 0, result.output
+        info_path = os.path.join(self.temp_dir, f'{model_name}.info.yaml')
+        with open(info_path, 'r', encoding='utf-8') as f:
+            return model_path, yaml.safe_load(f)['retrain'], result.output
+
+    def test_drift_score(self):
+        """Дрейф — наибольший сдвиг среднего в std эталона."""
+        matrix = FeatureMatrix(self._matrix('train', 6))
+        stats = column_stats(matrix)
+        assert set(stats) == {'x', 'target'}
+        assert drift_score(stats, stats) == 0
+        shifted = {**stats, 'x': [stats['x'][0] + 2 * stats['x'][1], 1.0]}
+        assert drift_score(stats, shifted) == 2
+
+    def test_continue_and_refit(self):
+        """Модель дообучается на новой неделе, эталон — от полного обучения."""
+        full_path, full, _ = self._train(self._matrix('week4', 4), 'full')
+        assert full['mode'] == 'full' and full['last_week'] == '2025-01-27'
+        assert full['reference']['rmse'] is None
+
+        week5 = self._matrix('week5', 5)
+        continue_path, warm, _ = self._train(week5, 'continue',
+                                             '--init-model', full_path,
+                                             '--warm-rounds', '10')
+        assert warm['mode'] == 'continue' and warm['warm_starts'] == 1
+        assert warm['holdout']['rows'] == 100
+        # Дообучение только на последних --warm-weeks неделях
+        assert warm['rows'] == 400
+        assert warm['reference']['rmse'] == warm['holdout']['rmse']
+        # Кандидат проверен на последней неделе, которую он не видел
+        assert warm['validation']['rows'] == 100
+        assert (joblib.load(continue_path).num_trees()
+                == joblib.load(full_path).num_trees() + 10)
+
+        refit_path, refit, _ = self._train(self._matrix('week6', 6), 'refit',
+                                           '--init-model', continue_path,
+                                           '--warm-start', 'refit',
+                                           '--warm-weeks', '2')
+        assert refit['mode'] == 'refit' and refit['warm_starts'] == 2
+        assert refit['reference'] == warm['reference']
+        assert refit['last_week'] == '2025-02-10' and refit['rows'] == 200
+        model = joblib.load(refit_path)
+        assert model.num_trees() == joblib.load(continue_path).num_trees()
+        assert model.feature_name() == ['x', 'city_nm']
+
+    def test_full_retrain_policy(self):
+        """Дрейф или рост ошибки на новых неделях — полное переобучение."""
+        full_path, _, _ = self._train(self._matrix('week4', 4), 'full')
+        shifted = self.df.assign(x=np.where(self.weeks >= self.weeks[400],
+                                            self.df['x'] + 3, self.df['x']))
+        week5 = self._matrix('week5', 5, shifted)
+
+        _, retrain, _ = self._train(week5, 'drift', '--init-model', full_path)
+        assert retrain['mode'] == 'full' and 'дрейф' in retrain['reason']
+        assert retrain['warm_starts'] == 0
+        assert retrain['reference']['rmse'] is None
+
+        _, retrain, _ = self._train(week5, 'guard', '--init-model', full_path,
+                                    '--drift-threshold', '100')
+        assert retrain['mode'] == 'continue'
+        # Эталон ниже ошибки на сдвинутой неделе: защита требует полного
+        # переобучения
+        continue_path = os.path.join(self.temp_dir, 'guard.joblib')
+        info_path = os.path.join(self.temp_dir, 'guard.info.yaml')
+        with open(info_path, 'r', encoding='utf-8') as f:
+            info = yaml.safe_load(f)
+        info['retrain']['reference']['rmse'] = 0.01
+        with open(info_path, 'w', encoding='utf-8') as f:
+            yaml.dump(info, f)
+        _, retrain, _ = self._train(self._matrix('week6', 6, shifted),
+                                    'guarded', '--init-model', continue_path,
+                                    '--drift-threshold', '100')
+        assert retrain['mode'] == 'full' and 'RMSE' in retrain['reason']
+
+    def test_candidate_validation(self):
+        """Кандидат хуже эталона на отложенной неделе: полное переобучение."""
+        full_path, _, _ = self._train(self._matrix('week4', 4), 'full')
+        # Таргет сдвинут только на последней неделе: прошлая модель в
+        # среднем по новым неделям проходит проверку, кандидат — нет
+        shifted = self.df.assign(target=np.where(
+            self.weeks >= self.weeks[500], self.df['target'] + 6,
+            self.df['target']))
+        _, retrain, _ = self._train(self._matrix('week6', 6, shifted),
+                                    'candidate', '--init-model', full_path,
+                                    '--guard-tolerance', '0.3',
+                                    '--drift-threshold', '100',
+                                    '--warm-start', 'refit')
+        assert retrain['mode'] == 'full'
+        assert 'отложенной неделе' in retrain['reason']
+        assert retrain['validation']['rows'] == 100
+
+    def test_requires_weeks(self):
+        """Без недель строк дообучение невозможно."""
+        full_path, _, _ = self._train(self._matrix('week4', 4), 'full')
+        path = os.path.join(self.temp_dir, 'no_weeks.npy')
+        write_matrix(self.df, path)
+        model_path = os.path.join(self.temp_dir, 'm.joblib')
+        result = CliRunner().invoke(train_lgbm_model, [
+            path, model_path, self.config_path, '--init-model', full_path])
+        assert result.exit_code != 0
+        assert 'неделями' in result.output